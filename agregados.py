@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados do Painel Gerencial - MPRJ
+
+Contagens por promotoria, tema, subtema, empresa e mês (e taxa de "consumidor
+vencedor") mantidas de forma incremental por gatilhos na tabela ouvidorias.
+O painel lê apenas a tabela 'agregados', sem varrer as ouvidorias. Empresas
+são contadas pelo id do registro canônico (ver registro_empresas.py).
+
+Uso:
+    python3 agregados.py --reconstruir    # recalcula tudo (após cargas/backfills)
+"""
+
+import argparse
+import os
+
+# dimensão -> expressão SQL sobre a linha da ouvidoria (prefixo {r} = new/old nos gatilhos)
+DIMENSOES = {
+    "geral": "''",
+    "promotoria": "COALESCE({r}.promotoria, '')",
+    "municipio": "COALESCE({r}.municipio, '')",
+    "tema": "COALESCE({r}.tema, '')",
+    "subtema": "COALESCE({r}.tema, '') || ' / ' || COALESCE({r}.subtema, '')",
+    "empresa": "COALESCE({r}.empresa_id, '')",
+    "mes": "COALESCE(substr({r}.data_iso, 1, 7), '')",
+}
+COLUNAS_AGREGADAS = ("promotoria", "municipio", "tema", "subtema", "empresa_id", "data_iso", "vencedor")
+# dimensões cuja chave é um id: nome exibido no lugar da chave
+ROTULOS = {"empresa": "(SELECT e.nome FROM empresas e WHERE e.id = a.chave)"}
+
+
+def _atualizacoes(linha, sinal):
+    """Comandos que somam (sinal=+1) ou subtraem (-1) a linha em todas as dimensões"""
+    vencedor = f"(CASE WHEN {linha}.vencedor = 'Sim' THEN 1 ELSE 0 END)"
+    return "\n".join(
+        f"""INSERT INTO agregados (dimensao, chave, total, vencedores)
+            VALUES ('{dimensao}', {expressao.format(r=linha)}, {sinal}, {sinal} * {vencedor})
+            ON CONFLICT (dimensao, chave) DO UPDATE SET
+                total = total + excluded.total, vencedores = vencedores + excluded.vencedores;"""
+        for dimensao, expressao in DIMENSOES.items()
+    )
+
+
+def criar_agregados(conn):
+    """Cria a tabela e os gatilhos; retorna True se a tabela acabou de ser criada (precisa de carga)"""
+    nova = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'agregados'").fetchone() is None
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS agregados (
+            dimensao TEXT,
+            chave TEXT,
+            total INTEGER DEFAULT 0,
+            vencedores INTEGER DEFAULT 0,
+            PRIMARY KEY (dimensao, chave)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_agregados_ranking ON agregados (dimensao, total DESC)')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS agregados_ai AFTER INSERT ON ouvidorias BEGIN
+            {_atualizacoes("new", 1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS agregados_ad AFTER DELETE ON ouvidorias BEGIN
+            {_atualizacoes("old", -1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS agregados_au AFTER UPDATE OF {", ".join(COLUNAS_AGREGADAS)} ON ouvidorias BEGIN
+            {_atualizacoes("old", -1)}
+            {_atualizacoes("new", 1)}
+        END
+    ''')
+    return nova
+
+
+def reconstruir_agregados(banco):
+    """Recalcula todos os agregados a partir da tabela ouvidorias (uma transação)"""
+    with banco.transacao() as conn:
+        conn.execute("DELETE FROM agregados")
+        for dimensao, expressao in DIMENSOES.items():
+            chave = expressao.format(r="o")
+            conn.execute(f'''
+                INSERT INTO agregados (dimensao, chave, total, vencedores)
+                SELECT '{dimensao}', {chave}, COUNT(*), SUM(CASE WHEN o.vencedor = 'Sim' THEN 1 ELSE 0 END)
+                FROM ouvidorias o GROUP BY {chave}
+            ''')
+
+
+def consultar_agregados(banco, dimensao, limite=None, por="total"):
+    """
+    [(chave, total, vencedores)] de uma dimensão; ordenado por total (ranking) ou por chave.
+    Na dimensão empresa a chave devolvida é o nome canônico.
+    """
+    ordem = "total DESC, chave" if por == "total" else "chave"
+    rotulo = ROTULOS.get(dimensao, "chave")
+    sql = (f"SELECT COALESCE({rotulo}, chave), total, vencedores FROM agregados a "
+           f"WHERE dimensao = ? AND total > 0 ORDER BY {ordem}")
+    if limite:
+        sql += f" LIMIT {int(limite)}"
+    return banco.consultar(sql, (dimensao,))
+
+
+def main():
+    from banco_dados import BancoDados  # import local: banco_dados importa este módulo
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Agregados do painel gerencial - MPRJ")
+    parser.add_argument("--reconstruir", action="store_true", help="recalcula os agregados a partir das ouvidorias")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    if args.reconstruir:
+        banco = BancoDados(args.banco)
+        reconstruir_agregados(banco)
+        total = consultar_agregados(banco, "geral")
+        print(f"✅ Agregados reconstruídos ({total[0][1] if total else 0} ouvidorias).")
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import sqlite3
 import os
 import json
 from datetime import datetime
-from classificador_denuncias import ClassificadorDenuncias
+from classificador_denuncias import obter_classificador
+from fila_classificacao import obter_fila, STATUS_PENDENTE, STATUS_PROCESSANDO, STATUS_ERRO, STATUS_DEGRADADO
 
 # Configuração da página
 st.set_page_config(page_title="SARO - MPRJ", layout="wide", page_icon="⚖️")
@@ -51,19 +51,40 @@ st.markdown("""
 
 # Inicializar estado e classificador
 if "resultado" not in st.session_state:
-    st.session_state.resultado = None
+    st.session_state.resultado = None      # id da última ouvidoria enviada
+if "envios" not in st.session_state:
+    st.session_state.envios = []           # ids enviados nesta sessão (mais recente primeiro)
+
+ENVIOS_EXIBIDOS = 10
+INTERVALO_ATUALIZACAO = 2                  # segundos entre consultas à fila enquanto houver pendências
+STATUS_EM_ANDAMENTO = (STATUS_PENDENTE, STATUS_PROCESSANDO)
+ICONES_STATUS = {STATUS_PENDENTE: "⏳ Na fila", STATUS_PROCESSANDO: "⚙️ Classificando",
+                 STATUS_ERRO: "❌ Erro", STATUS_DEGRADADO: "⚠️ Provisória", "concluido": "✅ Concluída"}
 
 try:
-    classificador = ClassificadorDenuncias()
+    # Instâncias compartilhadas: não são recriadas a cada interação com a página
+    classificador = obter_classificador()
+    fila = obter_fila()
 except Exception as e:
     st.error(f"Erro ao carregar classificador: {e}")
     st.stop()
 
+if not classificador.resiliencia.disponivel():
+    st.sidebar.warning("⚠️ IA indisponível no momento. As ouvidorias recebem uma classificação provisória "
+                       "e serão reclassificadas automaticamente quando a IA voltar.")
+
+ao_vivo = st.sidebar.toggle(
+    "⚡ Classificação ao vivo", value=True,
+    help="Mostra a classificação enquanto a IA responde. Desligado, o registro vai para a fila "
+         "e a classificação segue em segundo plano."
+)
+
 st.title("⚖️ Sistema Automático de Registro de Ouvidorias (SARO)")
 st.markdown("**Versão 2.2** | Banco de Dados Interno & IA OpenAI")
 st.divider()
 
 # ============ 1. FORMULÁRIO DE REGISTRO ============
+envio_ao_vivo = None
 with st.form("form_ouvidoria", clear_on_submit=True):
     st.markdown('<p class="titulo-sessao">📝 Novo Registro de Ouvidoria</p>', unsafe_allow_html=True)
     
@@ -81,21 +102,23 @@ with st.form("form_ouvidoria", clear_on_submit=True):
     consumidor_vencedor = col_f2.radio("Consumidor vencedor?", ["Sim", "Não"], horizontal=True)
     
     if st.form_submit_button("🔍 REGISTRAR OUVIDORIA", use_container_width=True):
-        if endereco and denuncia:
-            with st.spinner("IA Processando e Salvando..."):
-                res, sucesso = classificador.processar_denuncia(endereco, denuncia, num_com, num_mprj, consumidor_vencedor, responsavel)
-                st.session_state.resultado = res
-                if sucesso:
-                    st.success("✅ Registro realizado com sucesso!")
+        if endereco and denuncia and ao_vivo:
+            # Classificado logo abaixo do formulário, à medida que a resposta da IA chega
+            envio_ao_vivo = (endereco, denuncia, num_com, num_mprj, consumidor_vencedor, responsavel)
+        elif endereco and denuncia:
+            # Grava na hora como pendente; a IA classifica em segundo plano
+            try:
+                id_ouvidoria = fila.enfileirar(endereco, denuncia, num_com, num_mprj, consumidor_vencedor, responsavel)
+                st.session_state.resultado = id_ouvidoria
+                st.session_state.envios = ([id_ouvidoria] + st.session_state.envios)[:ENVIOS_EXIBIDOS]
+                st.success("✅ Registro realizado com sucesso! A classificação segue em segundo plano.")
+            except Exception as e:
+                st.error(f"Erro no banco: {e}")
         else:
             st.error("❌ Preencha Endereço e Descrição!")
 
 # ============ 2. RESULTADO DA CLASSIFICAÇÃO ATUAL ============
-if st.session_state.resultado:
-    res = st.session_state.resultado
-    st.divider()
-    st.markdown('<p class="titulo-sessao">✅ Resultado da Última Classificação</p>', unsafe_allow_html=True)
-    
+def exibir_identificacao(res):
     st.markdown(f"""
     <div class="box-destaque">
         <div style="display: flex; justify-content: space-between;">
@@ -107,52 +130,164 @@ if st.session_state.resultado:
         <p>👤 <b>Responsável:</b> {res['responsavel']} | 🏆 <b>Consumidor Vencedor:</b> {res['vencedor']}</p>
     </div>
     """, unsafe_allow_html=True)
-    
-    c1, c2, c3 = st.columns(3)
-    c1.markdown(f'<div class="badge-verde">Tema: {res["tema"]}</div>', unsafe_allow_html=True)
-    c2.markdown(f'<div class="badge-verde">Subtema: {res["subtema"]}</div>', unsafe_allow_html=True)
-    c3.markdown(f'<div class="badge-verde">Empresa: {res["empresa"]}</div>', unsafe_allow_html=True)
-    
-    st.markdown("<br>", unsafe_allow_html=True)
-    st.markdown(f'**Resumo da IA:** <div class="resumo-box">{res["resumo"]}</div>', unsafe_allow_html=True)
+
+
+def exibir_resultado(res):
+    st.divider()
+    st.markdown('<p class="titulo-sessao">✅ Resultado da Última Classificação</p>', unsafe_allow_html=True)
+    exibir_identificacao(res)
+
+    if res["status"] in STATUS_EM_ANDAMENTO:
+        st.info(f"{ICONES_STATUS[res['status']]}: a classificação pela IA aparecerá aqui assim que terminar.")
+    elif res["status"] == STATUS_ERRO:
+        st.error(res["resumo"])
+        if st.button("🔁 Tentar novamente"):
+            fila.reenfileirar([res["id"]])
+            st.rerun()
+    else:
+        if res["status"] == STATUS_DEGRADADO:
+            st.warning("⚠️ Classificação provisória (IA indisponível). Será refeita automaticamente pela IA.")
+        c1, c2, c3 = st.columns(3)
+        c1.markdown(f'<div class="badge-verde">Tema: {res["tema"]}</div>', unsafe_allow_html=True)
+        c2.markdown(f'<div class="badge-verde">Subtema: {res["subtema"]}</div>', unsafe_allow_html=True)
+        c3.markdown(f'<div class="badge-verde">Empresa: {res["empresa"]}</div>', unsafe_allow_html=True)
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown(f'**Resumo da IA:** <div class="resumo-box">{res["resumo"]}</div>', unsafe_allow_html=True)
+        if res["origem"] == "similar":
+            st.caption("♻️ Classificação reaproveitada de uma ouvidoria quase idêntica (sem nova consulta à IA).")
+
+    exibir_semelhantes(res["id"])
 
     if st.button("Limpar Tela para Novo Registro"):
         st.session_state.resultado = None
         st.rerun()
 
+
+def exibir_parcial(area, res):
+    """Cartão do resultado enquanto a IA responde: município/promotoria na hora, o resto aos poucos"""
+    with area.container():
+        st.divider()
+        st.markdown('<p class="titulo-sessao">⚙️ Classificando...</p>', unsafe_allow_html=True)
+        exibir_identificacao(res)
+        c1, c2, c3 = st.columns(3)
+        c1.markdown(f'<div class="badge-verde">Tema: {res["tema"] or "…"}</div>', unsafe_allow_html=True)
+        c2.markdown(f'<div class="badge-verde">Subtema: {res["subtema"] or "…"}</div>', unsafe_allow_html=True)
+        c3.markdown(f'<div class="badge-verde">Empresa: {res["empresa"] or "…"}</div>', unsafe_allow_html=True)
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown(f'**Resumo da IA:** <div class="resumo-box">{res["resumo"] or ""}▌</div>', unsafe_allow_html=True)
+
+
+def exibir_semelhantes(id_ouvidoria):
+    semelhantes = classificador.ouvidorias_semelhantes(id_ouvidoria)
+    if not semelhantes:
+        return
+    with st.expander(f"🔎 Ouvidorias semelhantes ({len(semelhantes)})"):
+        for reg in semelhantes:
+            st.markdown(
+                f"**{reg['similaridade']:.0%}** · {reg['data']} · {reg['municipio']} · "
+                f"{reg['empresa'] or '-'} · {reg['tema'] or '-'} / {reg['subtema'] or '-'}"
+            )
+            if reg["resumo"]:
+                st.caption(reg["resumo"])
+
+
+def exibir_envios(situacao):
+    st.markdown('<p class="titulo-sessao">📨 Envios desta sessão</p>', unsafe_allow_html=True)
+    for id_ouvidoria in st.session_state.envios:
+        reg = situacao.get(id_ouvidoria)
+        if reg:
+            st.caption(f"{ICONES_STATUS.get(reg['status'], reg['status'])} · {reg['data']} · "
+                       f"Nº {reg['num_com'] or '-'} · {reg['municipio']}")
+
+
+if envio_ao_vivo:
+    # Gravada na hora como pendente: se a página for recarregada no meio da resposta, a
+    # classificação segue pela fila. Até lá o cartão é atualizado a cada trecho
+    area_ao_vivo = st.empty()
+    try:
+        id_ouvidoria = fila.registrar(*envio_ao_vivo)
+        st.session_state.resultado = id_ouvidoria
+        st.session_state.envios = ([id_ouvidoria] + st.session_state.envios)[:ENVIOS_EXIBIDOS]
+        base = fila.situacao([id_ouvidoria])[id_ouvidoria]
+        exibir_parcial(area_ao_vivo, base)
+        for parcial in fila.classificar_em_fluxo(id_ouvidoria):
+            exibir_parcial(area_ao_vivo, dict(base, **parcial))
+        area_ao_vivo.empty()
+        st.success("✅ Registro realizado com sucesso!")
+    except Exception as e:
+        area_ao_vivo.empty()
+        st.error(f"Erro ao processar: {e}")
+
+# Enquanto houver envios na fila, só este trecho da página é reexecutado periodicamente
+ids_acompanhados = set(st.session_state.envios) | {st.session_state.resultado} - {None}
+em_andamento = any(r["status"] in STATUS_EM_ANDAMENTO for r in fila.situacao(ids_acompanhados).values())
+
+@st.fragment(run_every=INTERVALO_ATUALIZACAO if em_andamento else None)
+def acompanhar_envios():
+    situacao = fila.situacao(ids_acompanhados)
+    if st.session_state.resultado in situacao:
+        exibir_resultado(situacao[st.session_state.resultado])
+    if len(st.session_state.envios) > 1:
+        exibir_envios(situacao)
+    if em_andamento and not any(r["status"] in STATUS_EM_ANDAMENTO for r in situacao.values()):
+        # Tudo classificado: recarrega a página inteira (histórico) e encerra as consultas periódicas
+        st.rerun()
+
+acompanhar_envios()
+
 st.divider()
 
-# ============ 3. HISTÓRICO DE REGISTROS (COMO ERA ANTERIORMENTE) ============
+# ============ 3. HISTÓRICO DE REGISTROS ============
 st.markdown('<p class="titulo-sessao">📊 Histórico de Registros (Banco Local)</p>', unsafe_allow_html=True)
 
+REGISTROS_POR_PAGINA = 15
+
+busca = st.text_input("🔎 Buscar no histórico", placeholder="Empresa, palavra-chave, Nº de Comunicação ou Nº MPRJ")
+# Paginação por chave: pilha com o "antes de id" de cada página visitada (None = primeira página)
+if st.session_state.get("hist_busca") != busca:
+    st.session_state.hist_busca = busca
+    st.session_state.hist_paginas = [None]
+
 try:
-    conn = sqlite3.connect(classificador.db_path)
-    # Pegar os 10 últimos registros para não sobrecarregar a página
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM ouvidorias ORDER BY id DESC LIMIT 15")
-    colunas = [description[0] for description in cursor.description]
-    registros = [dict(zip(colunas, row)) for row in cursor.fetchall()]
-    conn.close()
+    registros = classificador.banco.buscar_historico(
+        busca, antes_de_id=st.session_state.hist_paginas[-1], limite=REGISTROS_POR_PAGINA
+    )
 
     if not registros:
-        st.info("Nenhuma ouvidoria registrada no banco de dados ainda.")
+        st.info("Nenhuma ouvidoria encontrada." if busca else "Nenhuma ouvidoria registrada no banco de dados ainda.")
     else:
         for reg in registros:
             # Card de cada registro histórico
-            with st.expander(f"📁 {reg['data']} - {reg['num_com']} | {reg['empresa']}"):
+            pendente = reg['status'] in STATUS_EM_ANDAMENTO
+            rotulo = reg['empresa']
+            if reg['status'] != "concluido":
+                rotulo = ICONES_STATUS.get(reg['status'], reg['status']) + ("" if pendente else f" {reg['empresa']}")
+            with st.expander(f"📁 {reg['data']} - {reg['num_com']} | {rotulo}"):
                 st.markdown(f"""
                 **Nº MPRJ:** {reg['num_mprj']} | **Responsável:** {reg['responsavel']}
                 
                 **Local:** {reg['municipio']} - {reg['promotoria']}
                 
-                **Classificação:** {reg['tema']} / {reg['subtema']}
+                **Classificação:** {"Aguardando a IA" if pendente else f"{reg['tema']} / {reg['subtema']}"}
                 
-                **Resumo IA:** {reg['resumo']}
+                **Resumo IA:** {"-" if pendente else reg['resumo']}
                 """)
-                st.text_area("Conteúdo Completo da Denúncia", value=reg['denuncia'], height=100, key=f"hist_{reg['id']}")
+                # O texto completo só é lido do banco quando solicitado
+                if st.checkbox("📄 Ver conteúdo completo da denúncia", key=f"ver_{reg['id']}"):
+                    st.text_area("Conteúdo Completo da Denúncia", value=classificador.banco.obter_denuncia(reg['id']),
+                                 height=100, key=f"hist_{reg['id']}")
                 st.markdown("---")
-        
-        st.caption("Exibindo os últimos 15 registros.")
+
+    col_ant, col_info, col_prox = st.columns([1, 2, 1])
+    pagina = len(st.session_state.hist_paginas)
+    if col_ant.button("⬅️ Página anterior", disabled=pagina == 1):
+        st.session_state.hist_paginas.pop()
+        st.rerun()
+    col_info.caption(f"Página {pagina} · {REGISTROS_POR_PAGINA} registros por página")
+    if col_prox.button("Próxima página ➡️", disabled=len(registros) < REGISTROS_POR_PAGINA):
+        st.session_state.hist_paginas.append(registros[-1]['id'])
+        st.rerun()
 
 except Exception as e:
     st.error(f"Erro ao carregar histórico: {e}")
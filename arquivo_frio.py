@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Arquivo Frio das Denúncias - MPRJ
+
+O texto completo das ouvidorias antigas (data além do prazo de retenção) sai
+da tabela 'ouvidorias' e vai, comprimido (zlib ou zstd), para a tabela
+'ouvidorias_arquivo'. Os metadados continuam na tabela principal, que fica só
+com linhas compactas: histórico, painel e buscas por índice leem menos
+páginas. O índice de busca por palavras (FTS) não guarda cópia do texto
+(conteúdo externo), então todo o texto arquivado vira ganho em disco após a
+compactação (VACUUM).
+
+O acesso continua transparente: quem lê a denúncia usa SQL_DENUNCIA (ver
+banco_dados.py), que devolve o texto da linha ou, se ele foi arquivado, o
+texto descomprimido pela função SQL descomprimir_denuncia. A busca por
+palavras indexa só o texto quente: uma denúncia arquivada continua sendo
+encontrada pelo resumo e pela empresa, não mais pelo texto.
+
+Uso:
+    python3 arquivo_frio.py --dias 180 --compactar     # arquiva o que tem mais de 180 dias e faz o VACUUM
+    python3 arquivo_frio.py --simular                   # só mostra quantas seriam arquivadas
+    python3 arquivo_frio.py --compactar --dias 0        # só compacta o banco
+"""
+
+import argparse
+import os
+import zlib
+from datetime import datetime, timedelta
+
+DIAS_RETENCAO = 180            # denúncias mais novas que isso ficam na tabela principal
+LOTE_ARQUIVAMENTO = 2000       # linhas por transação
+NIVEL_ZLIB = 9
+NIVEL_ZSTD = 19
+FORMATOS = ("zlib", "zstd")
+ASSINATURA_ZSTD = b"\x28\xb5\x2f\xfd"   # início de todo quadro zstd (o zlib começa com 0x78)
+
+SQL_CRIAR_ARQUIVO = '''
+    CREATE TABLE IF NOT EXISTS ouvidorias_arquivo (
+        id INTEGER PRIMARY KEY,
+        corpo BLOB,
+        arquivado_em TEXT
+    )
+'''
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Compressão zstd requer o pacote zstandard (pip install zstandard).")
+    return zstandard
+
+
+def comprimir(texto, formato="zlib"):
+    dados = texto.encode("utf-8")
+    if formato == "zstd":
+        return _zstd().ZstdCompressor(level=NIVEL_ZSTD).compress(dados)
+    return zlib.compress(dados, NIVEL_ZLIB)
+
+
+def descomprimir(corpo):
+    """Texto de um corpo arquivado; o formato é reconhecido pela assinatura. Registrada como função SQL."""
+    if corpo is None:
+        return None
+    if corpo[:4] == ASSINATURA_ZSTD:
+        return _zstd().ZstdDecompressor().decompress(corpo).decode("utf-8")
+    return zlib.decompress(corpo).decode("utf-8")
+
+
+def _filtro_arquivaveis(dias):
+    # Pendentes e em andamento ainda vão ser lidas pela fila: ficam na tabela principal
+    limite = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%dT%H:%M")
+    return ("WHERE denuncia IS NOT NULL AND data_iso < ? AND status NOT IN ('pendente', 'processando')",
+            (limite,))
+
+
+def contar_arquivaveis(banco, dias=DIAS_RETENCAO):
+    filtro, parametros = _filtro_arquivaveis(dias)
+    return banco.consultar_um(f"SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(denuncia AS BLOB))), 0) "
+                              f"FROM ouvidorias {filtro}", parametros)
+
+
+def arquivar(banco, dias=DIAS_RETENCAO, formato="zlib", lote=LOTE_ARQUIVAMENTO):
+    """
+    Move para o arquivo frio as denúncias com mais de 'dias' dias, em lotes (uma transação
+    cada: se o processo parar, o que já foi feito fica feito). Retorna {linhas, bytes_originais,
+    bytes_comprimidos}.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS)})")
+    if formato == "zstd":
+        _zstd()
+    filtro, parametros = _filtro_arquivaveis(dias)
+    agora = datetime.now().isoformat(timespec="seconds")
+    totais = {"linhas": 0, "bytes_originais": 0, "bytes_comprimidos": 0}
+    ultimo_id = 0
+    while True:
+        # Cada lote continua do último id (sem reler as linhas já arquivadas)
+        linhas = banco.consultar(f"SELECT id, denuncia FROM ouvidorias {filtro} AND id > ? ORDER BY id LIMIT ?",
+                                 parametros + (ultimo_id, lote))
+        if not linhas:
+            return totais
+        ultimo_id = linhas[-1][0]
+        # Compressão fora da transação: o lock do banco fica só com as gravações
+        corpos = [(id_ouvidoria, comprimir(denuncia, formato), agora) for id_ouvidoria, denuncia in linhas]
+        with banco.transacao() as conn:
+            conn.executemany("INSERT OR REPLACE INTO ouvidorias_arquivo (id, corpo, arquivado_em) VALUES (?, ?, ?)",
+                             corpos)
+            # O gatilho do FTS tira o texto arquivado do índice (resumo e empresa continuam)
+            conn.executemany("UPDATE ouvidorias SET denuncia = NULL WHERE id = ?", [(c[0],) for c in corpos])
+        totais["linhas"] += len(linhas)
+        totais["bytes_originais"] += sum(len(d.encode("utf-8")) for _, d in linhas)
+        totais["bytes_comprimidos"] += sum(len(c[1]) for c in corpos)
+
+
+def tamanho_banco(banco):
+    """Bytes em disco do banco (arquivo principal + WAL)"""
+    return sum(os.path.getsize(banco.db_path + sufixo) for sufixo in ("", "-wal")
+               if os.path.exists(banco.db_path + sufixo))
+
+
+def compactar(banco):
+    """
+    Devolve ao disco o espaço liberado (checkpoint do WAL + VACUUM). Bloqueia as gravações
+    enquanto roda: agende para fora do expediente. Retorna (bytes_antes, bytes_depois).
+    """
+    antes = tamanho_banco(banco)
+    banco.executar("PRAGMA wal_checkpoint(TRUNCATE)")
+    banco.executar("VACUUM")
+    banco.executar("PRAGMA wal_checkpoint(TRUNCATE)")
+    return antes, tamanho_banco(banco)
+
+
+def _mb(n):
+    return f"{n / 1024 / 1024:,.1f} MB"
+
+
+def main():
+    from banco_dados import BancoDados
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Arquivo frio (comprimido) das denúncias antigas - MPRJ")
+    parser.add_argument("--dias", type=int, default=int(os.environ.get("SARO_DIAS_RETENCAO", DIAS_RETENCAO)),
+                        help="idade mínima (em dias) das denúncias arquivadas; 0 não arquiva nada")
+    parser.add_argument("--formato", choices=FORMATOS, default="zlib")
+    parser.add_argument("--compactar", action="store_true", help="executa o VACUUM ao final e mostra o ganho")
+    parser.add_argument("--simular", action="store_true", help="só mostra quantas denúncias seriam arquivadas")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    banco = BancoDados(args.banco)
+    if args.dias > 0:
+        linhas, tamanho = contar_arquivaveis(banco, args.dias)
+        print(f"🗄️  {linhas} denúncias com mais de {args.dias} dias ({_mb(tamanho)} de texto)")
+        if args.simular:
+            return
+        try:
+            totais = arquivar(banco, args.dias, args.formato)
+        except (ValueError, RuntimeError) as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        if totais["linhas"]:
+            taxa = totais["bytes_originais"] / max(1, totais["bytes_comprimidos"])
+            print(f"✅ {totais['linhas']} arquivadas: {_mb(totais['bytes_originais'])} -> "
+                  f"{_mb(totais['bytes_comprimidos'])} ({taxa:.1f}x, {args.formato})")
+    if args.compactar and not args.simular:
+        print("🧹 Compactando o banco (VACUUM)...")
+        antes, depois = compactar(banco)
+        print(f"✅ Banco: {_mb(antes)} -> {_mb(depois)} ({_mb(antes - depois)} liberados)")
+    banco.fechar()
+
+if __name__ == "__main__":
+    main()
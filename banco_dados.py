@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Camada de Armazenamento SQLite - MPRJ
+
+Uma conexão de longa duração por processo (em modo WAL, com pragmas ajustados),
+compartilhada entre threads sob um lock. As instruções SQL são reaproveitadas
+pelo cache de instruções preparadas do sqlite3, já que a conexão não é
+recriada a cada gravação. Também cria o esquema e migra bancos antigos.
+"""
+
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from agregados import criar_agregados, reconstruir_agregados
+from arquivo_frio import SQL_CRIAR_ARQUIVO, descomprimir
+from registro_empresas import SQL_EMPRESAS, RegistroEmpresas
+
+FORMATOS_DATA = ("%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S",
+                 "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",      # seguro em WAL; evita fsync a cada commit
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -32000",       # ~32 MB de cache de páginas
+    "PRAGMA mmap_size = 268435456",     # leitura via mmap (256 MB)
+    "PRAGMA busy_timeout = 5000",
+)
+
+INDICES_OUVIDORIAS = {
+    "idx_ouvidorias_data_iso": "data_iso",
+    "idx_ouvidorias_municipio": "municipio, data_iso",
+    "idx_ouvidorias_promotoria": "promotoria, data_iso",
+    "idx_ouvidorias_tema": "tema, subtema",
+    "idx_ouvidorias_empresa": "empresa",
+    "idx_ouvidorias_empresa_id": "empresa_id, data_iso",
+    "idx_ouvidorias_num_com": "num_com",
+    "idx_ouvidorias_num_mprj": "num_mprj",
+    "idx_ouvidorias_status": "status",
+    "idx_ouvidorias_versao_catalogo": "versao_catalogo, tema, subtema",
+}
+
+# Colunas leves exibidas no histórico (o texto completo da denúncia só é lido sob demanda)
+COLUNAS_RESUMO = ("id", "data", "num_com", "num_mprj", "municipio", "promotoria", "tema", "subtema",
+                  "empresa", "resumo", "vencedor", "responsavel", "status")
+
+# Texto da denúncia, esteja na linha ou no arquivo frio (comprimido, ver arquivo_frio.py); alias "o" = ouvidorias
+SQL_DENUNCIA = ("COALESCE(o.denuncia, (SELECT descomprimir_denuncia(a.corpo) "
+                "FROM ouvidorias_arquivo a WHERE a.id = o.id))")
+
+# Índice de texto completo sincronizado por gatilhos, com conteúdo externo: o FTS não guarda
+# cópia do texto, só o índice. Indexa o texto quente (o que está na linha); ao ser arquivada, a
+# denúncia sai do índice e a linha continua encontrável por resumo e empresa. Assim os gatilhos
+# não dependem de descomprimir_denuncia, e alterar ou excluir ouvidorias por outro programa
+# (ex.: sqlite3 de linha de comando) mantém a busca sincronizada.
+SQL_FTS = (
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS ouvidorias_fts USING fts5(
+        denuncia, resumo, empresa, content='ouvidorias', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS ouvidorias_fts_ai AFTER INSERT ON ouvidorias BEGIN
+        INSERT INTO ouvidorias_fts (rowid, denuncia, resumo, empresa) VALUES (new.id, new.denuncia, new.resumo, new.empresa);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS ouvidorias_fts_ad AFTER DELETE ON ouvidorias BEGIN
+        INSERT INTO ouvidorias_fts (ouvidorias_fts, rowid, denuncia, resumo, empresa)
+            VALUES ('delete', old.id, old.denuncia, old.resumo, old.empresa);
+        DELETE FROM ouvidorias_arquivo WHERE id = old.id;
+    END''',
+    # Inclui o arquivamento (texto -> NULL): o texto arquivado sai do índice
+    '''CREATE TRIGGER IF NOT EXISTS ouvidorias_fts_au AFTER UPDATE OF denuncia, resumo, empresa ON ouvidorias BEGIN
+        INSERT INTO ouvidorias_fts (ouvidorias_fts, rowid, denuncia, resumo, empresa)
+            VALUES ('delete', old.id, old.denuncia, old.resumo, old.empresa);
+        INSERT INTO ouvidorias_fts (rowid, denuncia, resumo, empresa) VALUES (new.id, new.denuncia, new.resumo, new.empresa);
+    END''',
+)
+
+
+def consulta_fts(termo):
+    """Texto livre -> consulta FTS5 segura: cada palavra entre aspas (E lógico), prefixo na última"""
+    palavras = re.findall(r"\w+", termo or "")
+    if not palavras:
+        return None
+    return " ".join(f'"{p}"' for p in palavras) + "*"
+
+
+def data_para_iso(data):
+    """'dd/mm/YYYY HH:MM' (formato exibido) -> 'YYYY-MM-DDTHH:MM' (ordenável); None se não reconhecer"""
+    if not data:
+        return None
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(str(data).strip(), formato).isoformat(timespec="minutes")
+        except ValueError:
+            continue
+    return None
+
+
+class BancoDados:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.conn = self._conectar()
+        self.criar_esquema()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.create_function("data_para_iso", 1, data_para_iso, deterministic=True)
+        conn.create_function("descomprimir_denuncia", 1, descomprimir, deterministic=True)
+        return conn
+
+    def reabrir(self):
+        """
+        Nova conexão no lugar da atual, já fechada. Usado nos processos filhos do serviço
+        HTTP: uma conexão SQLite não pode atravessar um fork, então o processo pai fecha a
+        sua antes de criar os filhos e cada filho abre a própria.
+        """
+        with self._lock:
+            self.conn = self._conectar()
+
+    @contextmanager
+    def transacao(self):
+        """Bloco atômico: commit ao final, rollback em caso de erro"""
+        with self._lock:
+            with self.conn:
+                yield self.conn
+
+    @contextmanager
+    def leitor(self):
+        """
+        Conexão separada, somente leitura, para leituras longas (ex.: exportações): em
+        modo WAL ela lê um retrato consistente sem segurar o lock da conexão compartilhada
+        """
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.create_function("descomprimir_denuncia", 1, descomprimir, deterministic=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def executar(self, sql, parametros=()):
+        with self.transacao() as conn:
+            return conn.execute(sql, parametros)
+
+    def executar_varios(self, sql, lista_parametros):
+        with self.transacao() as conn:
+            conn.executemany(sql, lista_parametros)
+
+    def consultar(self, sql, parametros=()):
+        with self._lock:
+            return self.conn.execute(sql, parametros).fetchall()
+
+    def consultar_um(self, sql, parametros=()):
+        with self._lock:
+            return self.conn.execute(sql, parametros).fetchone()
+
+    def consultar_dicts(self, sql, parametros=()):
+        with self._lock:
+            cursor = self.conn.execute(sql, parametros)
+            colunas = [d[0] for d in cursor.description]
+            return [dict(zip(colunas, row)) for row in cursor.fetchall()]
+
+    def colunas(self, tabela):
+        return {r[1] for r in self.consultar(f"PRAGMA table_info({tabela})")}
+
+    def criar_esquema(self):
+        with self.transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ouvidorias (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    num_com TEXT,
+                    num_mprj TEXT,
+                    data TEXT,
+                    municipio TEXT,
+                    promotoria TEXT,
+                    tema TEXT,
+                    subtema TEXT,
+                    empresa TEXT,
+                    denuncia TEXT,
+                    resumo TEXT,
+                    vencedor TEXT,
+                    responsavel TEXT,
+                    origem TEXT,
+                    data_iso TEXT,
+                    status TEXT DEFAULT 'concluido',
+                    versao_catalogo TEXT,
+                    empresa_id INTEGER,
+                    empresa_original TEXT,
+                    reservado_por TEXT,
+                    reservado_em REAL
+                )
+            ''')
+            # Controle de importações em lote: linhas do arquivo de entrada já gravadas
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS lote_progresso (
+                    lote TEXT,
+                    linha INTEGER,
+                    PRIMARY KEY (lote, linha)
+                )
+            ''')
+            # Texto comprimido das denúncias antigas (arquivo frio)
+            conn.execute(SQL_CRIAR_ARQUIVO)
+            # Registro canônico de empresas e seus apelidos (ver registro_empresas.py)
+            for sql in SQL_EMPRESAS:
+                conn.execute(sql)
+            # Quantas classificações foram atendidas localmente, pelo cache ou pela IA
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS contadores_roteamento (
+                    dia TEXT,
+                    origem TEXT,
+                    total INTEGER DEFAULT 0,
+                    PRIMARY KEY (dia, origem)
+                )
+            ''')
+        self.migrar()
+
+    def migrar(self):
+        """Atualiza bancos criados por versões anteriores (operações idempotentes)"""
+        colunas = self.colunas("ouvidorias")
+        vincular_empresas = False
+        with self.transacao() as conn:
+            if "origem" not in colunas:
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN origem TEXT")
+            if "data_iso" not in colunas:
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN data_iso TEXT")
+                conn.execute("UPDATE ouvidorias SET data_iso = data_para_iso(data)")
+            if "status" not in colunas:
+                # Fila de classificação: linhas antigas já estão classificadas
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN status TEXT DEFAULT 'concluido'")
+            if "versao_catalogo" not in colunas:
+                # Versão do catálogo usada na classificação (ver versoes_catalogo.py)
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN versao_catalogo TEXT")
+            if "empresa_id" not in colunas:
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN empresa_id INTEGER")
+            if "empresa_original" not in colunas:
+                # Nome de empresa como veio da IA (o registro de empresas separa uniões por ele).
+                # Nas linhas já vinculadas só resta o nome canônico
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN empresa_original TEXT")
+                conn.execute("UPDATE ouvidorias SET empresa_original = empresa WHERE empresa IS NOT NULL")
+            if "confirmado" not in self.colunas("empresas_apelidos"):
+                # Uniões por semelhança pendentes de revisão (ver registro_empresas.py)
+                conn.execute("ALTER TABLE empresas_apelidos ADD COLUMN confirmado INTEGER DEFAULT 1")
+            if "reservado_por" not in colunas:
+                # Reserva das linhas em andamento na fila (ver fila_classificacao.py)
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN reservado_por TEXT")
+                conn.execute("ALTER TABLE ouvidorias ADD COLUMN reservado_em REAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+                # Falhas antigas da IA gravadas como "Outros / Erro no GPT": marcadas para reclassificação
+                conn.execute(
+                    "UPDATE ouvidorias SET status = 'degradado', origem = 'degradado' "
+                    "WHERE resumo = 'Erro no GPT' AND status = 'concluido'"
+                )
+                conn.execute("PRAGMA user_version = 1")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < 2:
+                # Gatilhos do FTS anteriores ao arquivo frio: recriados abaixo
+                conn.execute("DROP TRIGGER IF EXISTS ouvidorias_fts_ad")
+                conn.execute("DROP TRIGGER IF EXISTS ouvidorias_fts_au")
+                conn.execute("PRAGMA user_version = 2")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < 3:
+                # Agregados por empresa passam a usar empresa_id: gatilhos recriados abaixo e
+                # ouvidorias antigas vinculadas ao registro de empresas (user_version vai a 3 no fim)
+                for gatilho in ("agregados_ai", "agregados_ad", "agregados_au"):
+                    conn.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+                vincular_empresas = True
+            if conn.execute("PRAGMA user_version").fetchone()[0] < 5:
+                # FTS anterior (gatilhos com descomprimir_denuncia ou cópia própria do texto, inclusive
+                # do arquivado): recriado abaixo com conteúdo externo, só com o texto quente
+                for gatilho in ("ouvidorias_fts_ai", "ouvidorias_fts_ad", "ouvidorias_fts_au"):
+                    conn.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+                conn.execute("DROP TABLE IF EXISTS ouvidorias_fts")
+                if not vincular_empresas:
+                    conn.execute("PRAGMA user_version = 5")
+            for nome, expressao in INDICES_OUVIDORIAS.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON ouvidorias ({expressao})")
+            fts_novo = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'ouvidorias_fts'"
+            ).fetchone() is None
+            for sql in SQL_FTS:
+                conn.execute(sql)
+            if fts_novo:
+                # Indexa as ouvidorias já existentes a partir da própria tabela
+                conn.execute("INSERT INTO ouvidorias_fts (ouvidorias_fts) VALUES ('rebuild')")
+            agregados_novos = criar_agregados(conn)
+        if vincular_empresas:
+            RegistroEmpresas(self).vincular()
+        if agregados_novos or vincular_empresas:
+            # Carga inicial do painel a partir das ouvidorias já existentes
+            reconstruir_agregados(self)
+        if vincular_empresas:
+            # A migração 3 só termina aqui; as seguintes já foram aplicadas na transação acima
+            self.executar("PRAGMA user_version = 5")
+        self.executar("PRAGMA optimize")
+
+    def buscar_historico(self, termo=None, antes_de_id=None, limite=15):
+        """
+        Página do histórico (mais recentes primeiro) com paginação por chave: a
+        próxima página começa antes do menor id da atual, sem OFFSET.
+        'termo' procura nº de comunicação/MPRJ (prefixo) e palavras em denúncia, resumo e empresa.
+        """
+        colunas = ", ".join(f"o.{c}" for c in COLUNAS_RESUMO)
+        # O filtro por id só entra a partir da 2ª página (mantém a busca por intervalo de rowid)
+        filtro_id, param_id = ("AND o.id < ?", (antes_de_id,)) if antes_de_id is not None else ("", ())
+        termo = (termo or "").strip()
+        if not termo:
+            return self.consultar_dicts(
+                f"SELECT {colunas} FROM ouvidorias o WHERE 1 {filtro_id} ORDER BY o.id DESC LIMIT ?",
+                param_id + (limite,)
+            )
+
+        # Cada ramo já vem ordenado e limitado, para não materializar todos os resultados antes do UNION
+        partes, parametros = [], ()
+        # Números de processo: busca por prefixo usando os índices de num_com / num_mprj
+        # (o "+" impede o planejador de trocar o índice do número pela varredura de ids)
+        for coluna in ("num_com", "num_mprj") if re.search(r"\d", termo) else ():
+            partes.append(
+                f"SELECT * FROM (SELECT {colunas} FROM ouvidorias o "
+                f"WHERE o.{coluna} >= ? AND o.{coluna} < ? {filtro_id.replace('o.id', '+o.id')} ORDER BY o.id DESC LIMIT ?)"
+            )
+            parametros += (termo, termo + "\uffff") + param_id + (limite,)
+        fts = consulta_fts(termo)
+        if fts:
+            partes.append(
+                f"SELECT * FROM (SELECT {colunas} FROM ouvidorias_fts f JOIN ouvidorias o ON o.id = f.rowid "
+                f"WHERE ouvidorias_fts MATCH ? {filtro_id.replace('o.id', 'f.rowid')} ORDER BY f.rowid DESC LIMIT ?)"
+            )
+            parametros += (fts,) + param_id + (limite,)
+        return self.consultar_dicts(" UNION ".join(partes) + " ORDER BY id DESC LIMIT ?", parametros + (limite,))
+
+    def obter_denuncia(self, id_ouvidoria):
+        """Texto completo de uma ouvidoria (carregado só quando o usuário pede; descomprimido se arquivado)"""
+        row = self.consultar_um(f"SELECT {SQL_DENUNCIA} FROM ouvidorias o WHERE o.id = ?", (id_ouvidoria,))
+        return row[0] if row else None
+
+    def fechar(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Medição de Desempenho (Benchmark) - MPRJ
+
+Mede o ClassificadorDenuncias sem chamar a API real: sobe o servidor falso da
+IA (servidor_ia_falso.py) e usa um corpus sintético de endereços e denúncias
+montado a partir de base_promotorias.json e base_temas_subtemas.json, num
+banco SQLite temporário. Relata:
+- localização de município (operações/s);
+- classificações por segundo em vários níveis de concorrência (e em pacotes);
+- taxa de gravação no SQLite (linha a linha e em transações);
+- memória (RSS máximo do processo ao fim de cada etapa).
+
+O resultado vai para um arquivo JSON, para comparar execuções ao longo do tempo.
+
+Uso:
+    python3 benchmark.py --requisicoes 200 --concorrencias 1,4,8,16 --latencia-ms 50
+    python3 benchmark.py --comparar benchmarks/benchmark_20260101_120000.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from metricas import percentil
+from servidor_ia_falso import ServidorIAFalso, FORMATOS
+
+RUAS = ("Rua da Conceição", "Av. Rio Branco", "Rua dos Pescadores", "Estrada do Contorno", "Rua Sete de Setembro",
+        "Travessa São José", "Av. Brasil", "Rua Coronel Moreira César", "Alameda das Palmeiras", "Rua Dr. Paulo Alves")
+BAIRROS = ("Centro", "Jardim América", "Vila Nova", "Santa Rosa", "Parque Industrial", "Boa Vista", "Braga", "Icaraí")
+ABERTURAS = ("Venho registrar reclamação sobre", "Estou com problema de", "Gostaria de denunciar falha em",
+             "Há semanas enfrento transtornos com", "Solicito providências quanto a")
+COMPLEMENTOS = ("A empresa {empresa} não resolve o problema.", "Já abri vários protocolos na {empresa}.",
+                "O atendimento da {empresa} foi péssimo.", "A {empresa} cobrou valores indevidos.",
+                "Ninguém da {empresa} retorna as ligações.")
+EMPRESAS = ("Claro", "Vivo", "Enel", "Light", "Cedae", "Unimed", "Amil", "Supervia", "Magazine Luiza", "Casas Bahia")
+
+
+def _sem_acentos(texto):
+    return "".join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+def gerar_corpus(n, semente=42):
+    """n itens {endereco, denuncia, num_com, num_mprj, vencedor, responsavel}, todos distintos (sem acerto no cache)"""
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(base_path, "base_promotorias.json"), 'r', encoding='utf-8') as f:
+        municipios = [m for d in json.load(f).values() for m in d["municipios"]]
+    with open(os.path.join(base_path, "base_temas_subtemas.json"), 'r', encoding='utf-8') as f:
+        pares = [(t, s) for t, subs in json.load(f).items() for s in subs]
+
+    aleatorio = random.Random(semente)
+    corpus = []
+    for i in range(n):
+        municipio = aleatorio.choice(municipios)
+        endereco = f"{aleatorio.choice(RUAS)}, {aleatorio.randint(1, 3000)} - {aleatorio.choice(BAIRROS)}, {municipio} - RJ"
+        variacao = aleatorio.random()
+        if variacao < 0.2:
+            endereco = endereco.upper()
+        elif variacao < 0.4:
+            endereco = _sem_acentos(endereco)
+        elif variacao < 0.5:
+            endereco = f"{aleatorio.choice(RUAS)}, {aleatorio.randint(1, 3000)} - {aleatorio.choice(BAIRROS)}"
+        tema, subtema = aleatorio.choice(pares)
+        empresa = aleatorio.choice(EMPRESAS)
+        denuncia = (f"{aleatorio.choice(ABERTURAS)} {subtema.lower()} ({tema.lower()}). "
+                    f"{aleatorio.choice(COMPLEMENTOS).format(empresa=empresa)} Protocolo {semente}-{i:07d}.")
+        corpus.append({"endereco": endereco, "denuncia": denuncia, "num_com": f"{i}/2026",
+                       "num_mprj": f"2026.{i:06d}", "vencedor": aleatorio.choice(("Sim", "Não")), "responsavel": "Benchmark"})
+    return corpus
+
+
+def _rss_max_mb():
+    """Pico de memória residente do processo até agora (sem custo nas medições de tempo, ao contrário do tracemalloc)"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: KB no Linux, bytes no macOS
+    return round(rss / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+# ============ MEDIÇÕES ============
+
+def medir_localizacao(classificador, corpus, repeticoes=5):
+    enderecos = [item["endereco"] for item in corpus]
+    localizador = classificador.localizador
+    inicio = time.perf_counter()
+    achados = 0
+    for _ in range(repeticoes):
+        for endereco in enderecos:
+            achados += localizador.localizar(endereco) is not None
+    duracao = time.perf_counter() - inicio
+    total = len(enderecos) * repeticoes
+    return {"operacoes": total, "ops_por_segundo": round(total / duracao, 1),
+            "us_por_operacao": round(duracao / total * 1e6, 2), "taxa_identificacao": round(achados / total, 3)}
+
+
+def medir_classificacao(classificador, itens, concorrencia):
+    """Classificações individuais (classificar_texto) com 'concorrencia' threads"""
+    latencias, origens = [], Counter()
+
+    def classificar(texto):
+        inicio = time.perf_counter()
+        dados = classificador.classificar_texto(texto)
+        return time.perf_counter() - inicio, dados.get("origem")
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        for latencia, origem in pool.map(classificar, [item["denuncia"] for item in itens]):
+            latencias.append(latencia * 1000)
+            origens[origem] += 1
+    duracao = time.perf_counter() - inicio
+    latencias.sort()
+    return {"concorrencia": concorrencia, "requisicoes": len(itens), "req_por_segundo": round(len(itens) / duracao, 2),
+            "p50_ms": round(percentil(latencias, 50), 1), "p95_ms": round(percentil(latencias, 95), 1),
+            "p99_ms": round(percentil(latencias, 99), 1), "origens": dict(origens)}
+
+
+def medir_classificacao_lote(classificador, itens, concorrencia):
+    """Classificação empacotada (classificar_lote): várias denúncias por requisição"""
+    inicio = time.perf_counter()
+    resultados = classificador.classificar_lote([item["denuncia"] for item in itens], concorrencia=concorrencia)
+    duracao = time.perf_counter() - inicio
+    origens = Counter(d.get("origem") for d in resultados.values())
+    return {"concorrencia": concorrencia, "denuncias": len(itens),
+            "denuncias_por_segundo": round(len(itens) / duracao, 2), "origens": dict(origens)}
+
+
+def medir_gravacao(classificador, corpus, individuais=500, tamanho_transacao=100):
+    dados_ia = {"tema": "Outros", "subtema": "Geral", "empresa": "N/D", "resumo": "benchmark", "origem": "ia"}
+    registros = [
+        classificador.montar_registro(item["endereco"], item["denuncia"], item["num_com"], item["num_mprj"],
+                                      item["vencedor"], item["responsavel"], dados_ia)
+        for item in corpus
+    ]
+    inicio = time.perf_counter()
+    for registro in registros[:individuais]:
+        classificador.salvar_no_banco(registro)
+    duracao_individual = time.perf_counter() - inicio
+
+    restantes = registros[individuais:]
+    inicio = time.perf_counter()
+    for i in range(0, len(restantes), tamanho_transacao):
+        classificador.salvar_lote_no_banco(restantes[i:i + tamanho_transacao])
+    duracao_lote = time.perf_counter() - inicio
+    return {
+        "linhas_individuais": individuais,
+        "linhas_por_segundo_individual": round(individuais / duracao_individual, 1),
+        "linhas_em_transacoes": len(restantes), "tamanho_transacao": tamanho_transacao,
+        "linhas_por_segundo_transacao": round(len(restantes) / duracao_lote, 1) if restantes else None,
+        "tamanho_banco_mb": round(os.path.getsize(classificador.db_path) / 1024 / 1024, 2),
+    }
+
+
+def executar(requisicoes=200, concorrencias=(1, 4, 8, 16), latencia_ms=50.0, taxa_erro=0.0, formato="valido",
+             linhas_gravacao=5000, semente=42):
+    from classificador_denuncias import ClassificadorDenuncias
+
+    with ServidorIAFalso(latencia_ms=latencia_ms, taxa_erro=taxa_erro, formato=formato, semente=semente) as servidor, \
+            tempfile.TemporaryDirectory(prefix="saro_benchmark_") as pasta:
+        os.environ["OPENAI_BASE_URL"] = servidor.url_base
+        os.environ["OPENAI_API_KEY"] = "falsa"
+        necessarios = requisicoes * (len(concorrencias) + 1)
+        corpus = gerar_corpus(max(necessarios, linhas_gravacao), semente)
+
+        inicio = time.perf_counter()
+        classificador = ClassificadorDenuncias(os.path.join(pasta, "benchmark.db"))
+        resultados = {"inicializacao": {"segundos": round(time.perf_counter() - inicio, 3), "rss_max_mb": _rss_max_mb()}}
+        # Só o caminho da IA é medido: o pré-classificador local e o reaproveitamento por similaridade ficam desligados
+        classificador.limiar_local = float("inf")
+        classificador.limiar_similar = float("inf")
+
+        resultados["localizacao"] = dict(medir_localizacao(classificador, corpus[:10000]), rss_max_mb=_rss_max_mb())
+        print(f"📍 Localização: {resultados['localizacao']['ops_por_segundo']:,.0f} ops/s")
+
+        resultados["classificacao"] = []
+        for n, concorrencia in enumerate(concorrencias):
+            itens = corpus[n * requisicoes:(n + 1) * requisicoes]   # textos inéditos: nenhum acerto no cache
+            medicao = dict(medir_classificacao(classificador, itens, concorrencia), rss_max_mb=_rss_max_mb())
+            resultados["classificacao"].append(medicao)
+            print(f"🤖 Concorrência {concorrencia:>3}: {medicao['req_por_segundo']:>8.2f} req/s  "
+                  f"p50 {medicao['p50_ms']:.0f} ms  p95 {medicao['p95_ms']:.0f} ms  {medicao['origens']}")
+
+        itens = corpus[len(concorrencias) * requisicoes:necessarios]
+        resultados["classificacao_lote"] = dict(
+            medir_classificacao_lote(classificador, itens, max(concorrencias)), rss_max_mb=_rss_max_mb()
+        )
+        print(f"📦 Em pacotes: {resultados['classificacao_lote']['denuncias_por_segundo']:.2f} denúncias/s")
+
+        resultados["gravacao"] = dict(medir_gravacao(classificador, corpus[:linhas_gravacao]), rss_max_mb=_rss_max_mb())
+        print(f"💾 SQLite: {resultados['gravacao']['linhas_por_segundo_individual']:,.0f} linhas/s (uma a uma), "
+              f"{resultados['gravacao']['linhas_por_segundo_transacao'] or 0:,.0f} linhas/s (em transações)")
+
+        resultados["servidor_falso"] = {"requisicoes": servidor.requisicoes, "erros_injetados": servidor.erros}
+        classificador.metricas.descarregar()
+        classificador.banco.fechar()
+
+    resultados["rss_max_mb"] = _rss_max_mb()
+    return resultados
+
+
+# ============ RELATÓRIO ============
+
+def _versao_codigo():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _numeros(dados, prefixo=""):
+    """Achata o JSON em {caminho: valor} só com os valores numéricos (para comparar execuções)"""
+    if isinstance(dados, dict):
+        itens = dados.items()
+    elif isinstance(dados, list):
+        itens = ((str(d.get("concorrencia", i)) if isinstance(d, dict) else str(i), d) for i, d in enumerate(dados))
+    else:
+        return {prefixo: dados} if isinstance(dados, (int, float)) and not isinstance(dados, bool) else {}
+    saida = {}
+    for chave, valor in itens:
+        saida.update(_numeros(valor, f"{prefixo}.{chave}" if prefixo else str(chave)))
+    return saida
+
+
+def comparar(anterior, atual):
+    antes, depois = _numeros(anterior["resultados"]), _numeros(atual["resultados"])
+    print(f"\n📊 Comparação com {anterior.get('data')} ({anterior.get('versao_codigo') or 'versão desconhecida'}):")
+    for caminho in sorted(set(antes) & set(depois)):
+        a, d = antes[caminho], depois[caminho]
+        variacao = f"{100 * (d - a) / a:+.1f}%" if a else "—"
+        print(f"   {caminho:<55} {a:>12,.2f} → {d:>12,.2f}  {variacao}")
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Medição de desempenho com IA falsa - MPRJ")
+    parser.add_argument("--requisicoes", type=int, default=200, help="classificações por nível de concorrência")
+    parser.add_argument("--concorrencias", default="1,4,8,16", help="níveis de concorrência (separados por vírgula)")
+    parser.add_argument("--latencia-ms", type=float, default=50.0, help="latência média da IA falsa")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 429/500 da IA falsa")
+    parser.add_argument("--formato", choices=FORMATOS, default="valido", help="formato das respostas da IA falsa")
+    parser.add_argument("--linhas-gravacao", type=int, default=5000, help="linhas na medição do SQLite")
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: benchmarks/benchmark_<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    configuracao = {
+        "requisicoes": args.requisicoes, "concorrencias": [int(c) for c in args.concorrencias.split(",") if c.strip()],
+        "latencia_ms": args.latencia_ms, "taxa_erro": args.taxa_erro, "formato": args.formato,
+        "linhas_gravacao": args.linhas_gravacao,
+    }
+    resultados = executar(**configuracao)
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"), "versao_codigo": _versao_codigo(),
+        "python": platform.python_version(), "plataforma": platform.platform(),
+        "configuracao": configuracao, "resultados": resultados,
+    }
+
+    saida = args.saida or os.path.join(base_path, "benchmarks", f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado salvo em: {saida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(json.load(f), relatorio)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Cache Persistente de Classificações - MPRJ
+
+Guarda no saro_database.db o resultado já interpretado da IA, indexado pelo
+hash da denúncia normalizada + modelo + versão do catálogo, com expiração (TTL)
+e descarte LRU quando o limite de itens é atingido.
+"""
+
+import hashlib
+import re
+import time
+import unicodedata
+
+
+def normalizar_denuncia(texto: str) -> str:
+    """Texto sem acentos, minúsculo e com espaços colapsados (re-envios e cópias geram a mesma chave)"""
+    sem_acentos = "".join(c for c in unicodedata.normalize('NFD', texto or "") if unicodedata.category(c) != 'Mn')
+    return re.sub(r"\s+", " ", sem_acentos.casefold()).strip()
+
+
+class CacheClassificacao:
+    def __init__(self, banco, max_itens=50000, ttl_segundos=90 * 24 * 3600):
+        self.banco = banco
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._gravacoes = 0
+        self.inicializar_tabela()
+
+    def inicializar_tabela(self):
+        with self.banco.transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_classificacao (
+                    chave TEXT PRIMARY KEY,
+                    tema TEXT,
+                    subtema TEXT,
+                    empresa TEXT,
+                    resumo TEXT,
+                    criado_em REAL,
+                    ultimo_acesso REAL,
+                    acessos INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_ultimo_acesso ON cache_classificacao (ultimo_acesso)')
+
+    def gerar_chave(self, denuncia, modelo, versao_catalogo):
+        base = "\x1f".join([normalizar_denuncia(denuncia), modelo, versao_catalogo])
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def buscar(self, chave):
+        """Retorna {tema, subtema, empresa, resumo} ou None (ausente ou expirado)"""
+        agora = time.time()
+        with self.banco.transacao() as conn:
+            row = conn.execute(
+                'SELECT tema, subtema, empresa, resumo, criado_em FROM cache_classificacao WHERE chave = ?',
+                (chave,)
+            ).fetchone()
+            if row is None:
+                return None
+            if agora - row[4] > self.ttl_segundos:
+                conn.execute('DELETE FROM cache_classificacao WHERE chave = ?', (chave,))
+                return None
+            conn.execute(
+                'UPDATE cache_classificacao SET ultimo_acesso = ?, acessos = acessos + 1 WHERE chave = ?',
+                (agora, chave)
+            )
+            return {"tema": row[0], "subtema": row[1], "empresa": row[2], "resumo": row[3]}
+
+    def gravar(self, chave, dados):
+        agora = time.time()
+        with self.banco.transacao() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO cache_classificacao (chave, tema, subtema, empresa, resumo, criado_em, ultimo_acesso, acessos)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (chave, dados.get("tema"), dados.get("subtema"), dados.get("empresa"), dados.get("resumo"), agora, agora))
+            # Descarte LRU (a cada 100 gravações): remove os acessados há mais tempo acima do limite
+            self._gravacoes += 1
+            if self._gravacoes % 100 == 1:
+                conn.execute('''
+                    DELETE FROM cache_classificacao WHERE chave IN (
+                        SELECT chave FROM cache_classificacao ORDER BY ultimo_acesso DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_itens,))
+
+    def estatisticas(self):
+        itens, acertos = self.banco.consultar_um(
+            'SELECT COUNT(*), COALESCE(SUM(acessos), 0) FROM cache_classificacao'
+        )
+        return {"itens": itens, "acertos": acertos}
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Catálogo de Temas e Subtemas - MPRJ
+
+Forma compacta e numerada do base_temas_subtemas.json (ex: "T3.S2"), montada
+uma única vez, e índice local para validar os códigos devolvidos pela IA.
+"""
+
+import hashlib
+import json
+
+
+class CatalogoTemas:
+    def __init__(self, temas_subtemas: dict):
+        self.temas_subtemas = temas_subtemas
+        self.por_codigo = {}   # "T3.S2" -> (tema, subtema)
+        self.por_nome = {}     # (tema, subtema) -> "T3.S2"
+        self.temas = {}        # "T3" -> tema
+        linhas = []
+        for t, (tema, subtemas) in enumerate(temas_subtemas.items(), 1):
+            self.temas[f"T{t}"] = tema
+            itens = []
+            for s, subtema in enumerate(subtemas, 1):
+                codigo = f"T{t}.S{s}"
+                self.por_codigo[codigo] = (tema, subtema)
+                self.por_nome[(tema, subtema)] = codigo
+                itens.append(f"{s} {subtema}")
+            linhas.append(f"T{t} {tema}: " + "; ".join(itens))
+        self.texto_compacto = "\n".join(linhas)
+
+        # Versão do catálogo: muda sempre que base_temas_subtemas.json for editado
+        self.versao = hashlib.sha256(
+            json.dumps(temas_subtemas, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+
+    @staticmethod
+    def normalizar_codigo(codigo) -> str:
+        return str(codigo or "").strip().upper().replace(" ", "")
+
+    def resolver(self, codigo):
+        """Retorna (tema, subtema) canônicos para o código, ou None se o código não existir"""
+        return self.por_codigo.get(self.normalizar_codigo(codigo))
+
+    def dica_correcao(self, codigo) -> str:
+        """Mensagem para a nova tentativa: lista os subtemas válidos do tema citado (ou os temas)"""
+        tema_codigo = self.normalizar_codigo(codigo).split(".")[0]
+        if tema_codigo in self.temas:
+            tema = self.temas[tema_codigo]
+            validos = ", ".join(
+                f"{c} {sub}" for c, (t, sub) in self.por_codigo.items() if t == tema
+            )
+            return f"O código '{codigo}' não existe. Códigos válidos para {tema_codigo} ({tema}): {validos}."
+        return f"O código '{codigo}' não existe. Use apenas códigos do catálogo, no formato T<n>.S<n>."
+
+
+def diferencas(antigo: CatalogoTemas, novo: CatalogoTemas):
+    """
+    Compara duas versões do catálogo a partir dos pares (tema, subtema) da antiga. Retorna
+    {"renomeados": {par_antigo: par_novo}, "mantidos": {par}, "reclassificar": {par_antigo}}:
+    - mantido: o par continua igual e o tema não ganhou subtemas;
+    - renomeado: troca simples de nome, sem mudar a estrutura (mesma posição, mesma
+      quantidade de subtemas no tema), inclusive quando o próprio tema foi renomeado;
+    - reclassificar: subtema removido ou dividido, ou tema que ganhou subtemas novos
+      (as ouvidorias do tema podem pertencer a eles).
+    """
+    temas_antigos = list(antigo.temas_subtemas)
+    temas_novos = list(novo.temas_subtemas)
+    renomeados, mantidos, reclassificar = {}, set(), set()
+
+    for posicao, tema in enumerate(temas_antigos):
+        subtemas = list(antigo.temas_subtemas[tema])
+        tema_novo = tema if tema in novo.temas_subtemas else None
+        if tema_novo is None and posicao < len(temas_novos):
+            candidato = temas_novos[posicao]
+            # Tema renomeado: mesma posição, nome novo inexistente antes e mesma quantidade de subtemas
+            if candidato not in antigo.temas_subtemas and len(novo.temas_subtemas[candidato]) == len(subtemas):
+                tema_novo = candidato
+        if tema_novo is None:
+            reclassificar.update((tema, subtema) for subtema in subtemas)
+            continue
+
+        subtemas_novos = list(novo.temas_subtemas[tema_novo])
+        destinos = {}
+        for i, subtema in enumerate(subtemas):
+            if subtema in subtemas_novos:
+                destinos[subtema] = subtema
+            elif len(subtemas) == len(subtemas_novos) and subtemas_novos[i] not in subtemas:
+                destinos[subtema] = subtemas_novos[i]
+        ganhou_subtemas = bool(set(subtemas_novos) - set(destinos.values()))
+        for subtema in subtemas:
+            par = (tema, subtema)
+            if subtema not in destinos or ganhou_subtemas:
+                reclassificar.add(par)
+            elif (tema_novo, destinos[subtema]) == par:
+                mantidos.add(par)
+            else:
+                renomeados[par] = (tema_novo, destinos[subtema])
+    return {"renomeados": renomeados, "mantidos": mantidos, "reclassificar": reclassificar}
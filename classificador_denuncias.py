@@ -1,36 +1,147 @@
 # -*- coding: utf-8 -*-
 import json
 import os
+import re
 import sqlite3
+import threading
+import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 from openai import OpenAI
 from datetime import datetime
+from banco_dados import BancoDados, data_para_iso
+from indice_enderecos import ResolvedorEnderecos
+from cache_classificacao import CacheClassificacao
+from catalogo_temas import CatalogoTemas
+from classificador_local import ClassificadorLocal, resumo_extrativo
+from resiliencia_ia import ChamadaResiliente
+from metricas import Metricas
+from indice_similaridade import IndiceSimilaridade
+from versoes_catalogo import registrar_versao
+from registro_empresas import NAO_IDENTIFICADAS, RegistroEmpresas, normalizar_empresa
+
+COLUNAS_OUVIDORIA = (
+    "num_com", "num_mprj", "data", "municipio", "promotoria", "tema", "subtema",
+    "empresa", "denuncia", "resumo", "vencedor", "responsavel", "origem", "data_iso", "status",
+    "versao_catalogo", "empresa_id", "empresa_original"
+)
+# Confiança mínima do pré-classificador local para dispensar a IA (variável SARO_LIMIAR_LOCAL)
+LIMIAR_CONFIANCA_LOCAL = 0.85
+# Similaridade (cosseno) mínima para reaproveitar a classificação de uma ouvidoria quase idêntica
+# (variável SARO_LIMIAR_SIMILAR); só valem vizinhas concluídas classificadas pela IA
+LIMIAR_SIMILARIDADE = 0.92
+VIZINHOS_CONSULTADOS = 5
+SIMILARIDADE_MINIMA_EXIBICAO = 0.5   # abaixo disso a ouvidoria não é mostrada como "semelhante"
+ORIGENS_REAPROVEITAVEIS = ("ia", "cache", "similar")
+
+# Empacotamento de várias denúncias por requisição (classificar_lote)
+ORCAMENTO_TOKENS_LOTE = 6000     # tokens de denúncias por requisição (além do catálogo)
+TOKENS_RESPOSTA_POR_ITEM = 50    # código/empresa/resumo de cada item
+MAX_TOKENS_RESPOSTA_LOTE = 4000
+TIMEOUT_REQUISICAO_LOTE = 60.0   # segundos; respostas de pacotes são bem maiores
+
+SQL_INSERIR_OUVIDORIA = (
+    f"INSERT INTO ouvidorias ({', '.join(COLUNAS_OUVIDORIA)}) "
+    f"VALUES ({', '.join('?' for _ in COLUNAS_OUVIDORIA)})"
+)
+
+# Arquivos cuja alteração no disco exige recarregar o classificador compartilhado
+ARQUIVOS_BASES = ("base_promotorias.json", "base_temas_subtemas.json", "modelo_local.json", "base_ceps_bairros.json")
+
+# Campo de texto da resposta JSON, mesmo incompleto: "resumo": "Cobrança indev
+REGEX_CAMPO_PARCIAL = re.compile(r'"(codigo|empresa|resumo)"\s*:\s*"((?:[^"\\]|\\.)*)(")?')
+
+
+def campos_parciais(texto):
+    """
+    Campos codigo/empresa/resumo já presentes em uma resposta JSON ainda incompleta (recebida em
+    fluxo). 'codigo_completo' só aparece quando o código terminou de chegar.
+    """
+    campos = {}
+    for m in REGEX_CAMPO_PARCIAL.finditer(texto):
+        valor = m.group(2)
+        if not m.group(3):
+            # Escape cortado no meio (ex.: "\u00") fica para o próximo trecho
+            valor = re.sub(r'\\(u[0-9a-fA-F]{0,3})?$', "", valor)
+        try:
+            valor = json.loads(f'"{valor}"')
+        except ValueError:
+            continue
+        campos[m.group(1)] = valor
+        if m.group(1) == "codigo" and m.group(3):
+            campos["codigo_completo"] = valor
+    return campos
+
+
+def _chave_empresa(nome):
+    """Nome de empresa comparável ("Claro S.A." = "claro"); "" para as variações de não identificada"""
+    chave = normalizar_empresa(nome)
+    return "" if chave in NAO_IDENTIFICADAS else chave
+
 
 class ClassificadorDenuncias:
-    def __init__(self):
-        # 1. Configuração de Caminhos
+    def __init__(self, db_path=None):
+        # 1. Configuração de Caminhos (db_path: outro banco, ex. em medições de desempenho)
         self.base_path = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = os.path.join(self.base_path, "saro_database.db")
+        self.db_path = db_path or os.path.join(self.base_path, "saro_database.db")
         
-        # 2. Configuração OpenAI
-        api_key = st.secrets.get("OPENAI_API_KEY")
+        # 2. Configuração OpenAI (Secrets do Streamlit ou variável de ambiente, para uso via terminal)
+        api_key = self.obter_api_key()
         if not api_key:
             st.error("❌ Erro: OPENAI_API_KEY não encontrada nos Secrets.")
             st.stop()
-            
-        self.client = OpenAI(api_key=api_key)
+            # Fora do Streamlit o st.stop() não interrompe a execução
+            raise RuntimeError("OPENAI_API_KEY não encontrada nos Secrets nem no ambiente.")
+
+        # Sem repetições internas do SDK: prazos, novas tentativas e disjuntor ficam em self.resiliencia
+        self.client = OpenAI(api_key=api_key, max_retries=0)
         self.model_name = "gpt-4o-mini"
+        self.resiliencia = ChamadaResiliente()
+        self._antes_de_fechar = []
         
         # 3. Inicialização dos Componentes (Aqui chamamos as funções abaixo)
         self.carregar_bases()
         self.inicializar_banco()
+        registrar_versao(self.banco, self.catalogo)
+        self.cache = CacheClassificacao(self.banco)
+        self.metricas = Metricas(self.banco)
+        # Nome da empresa -> empresa canônica (id + nome), com busca aproximada por trigramas
+        self.registro_empresas = RegistroEmpresas(self.banco)
+        self.classificador_local = ClassificadorLocal(os.path.join(self.base_path, "modelo_local.json"))
+        self.limiar_local = float(os.environ.get("SARO_LIMIAR_LOCAL", LIMIAR_CONFIANCA_LOCAL))
+        # Vetores das denúncias ao lado do banco (<banco>.vetores / <banco>.ids)
+        self.indice = IndiceSimilaridade(self.banco, self.db_path)
+        self.indice.atualizar()
+        self.limiar_similar = float(os.environ.get("SARO_LIMIAR_SIMILAR", LIMIAR_SIMILARIDADE))
+
+    def antes_de_fechar(self, funcao):
+        """Registra uma função aguardada antes de fechar as conexões (ex.: esvaziar uma fila que as usa)"""
+        self._antes_de_fechar.append(funcao)
+
+    def fechar(self):
+        """Espera quem ainda usa o classificador, grava as métricas pendentes e fecha as conexões"""
+        for funcao in self._antes_de_fechar:
+            funcao()
+        self.metricas.descarregar()
+        self.client.close()
+        self.banco.fechar()
+
+    def obter_api_key(self):
+        try:
+            api_key = st.secrets.get("OPENAI_API_KEY")
+        except Exception:
+            api_key = None
+        return api_key or os.environ.get("OPENAI_API_KEY")
 
     def carregar_bases(self):
         """Carrega os arquivos JSON de apoio"""
         try:
             with open(os.path.join(self.base_path, "base_temas_subtemas.json"), 'r', encoding='utf-8') as f:
                 self.temas_subtemas = json.load(f)
+            # Catálogo numerado (T3.S2) montado uma vez, com índice para validar as respostas
+            self.catalogo = CatalogoTemas(self.temas_subtemas)
+            self.versao_catalogo = self.catalogo.versao
             with open(os.path.join(self.base_path, "base_promotorias.json"), 'r', encoding='utf-8') as f:
                 self.base_promotorias = json.load(f)
             
@@ -42,94 +153,484 @@ class ClassificadorDenuncias:
                         "promotoria": d["promotoria"],
                         "municipio_oficial": m
                     }
+            # CEP, nome do município e bairro, sem consulta externa (índice montado na primeira consulta)
+            self.localizador = ResolvedorEnderecos(
+                self.municipio_para_promotoria, os.path.join(self.base_path, "base_ceps_bairros.json")
+            )
         except Exception as e:
             st.error(f"Erro ao carregar arquivos JSON: {e}")
             st.stop()
 
     def inicializar_banco(self):
-        """Cria o banco de dados SQLite se não existir"""
+        """Abre a conexão persistente com o SQLite (cria/migra o esquema se preciso)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ouvidorias (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    num_com TEXT,
-                    num_mprj TEXT,
-                    data TEXT,
-                    municipio TEXT,
-                    promotoria TEXT,
-                    tema TEXT,
-                    subtema TEXT,
-                    empresa TEXT,
-                    denuncia TEXT,
-                    resumo TEXT,
-                    vencedor TEXT,
-                    responsavel TEXT
-                )
-            ''')
-            conn.commit()
-            conn.close()
+            self.banco = BancoDados(self.db_path)
         except Exception as e:
             st.error(f"Erro ao inicializar banco SQLite: {e}")
+            st.stop()
+            raise
 
     def remover_acentos(self, texto: str) -> str:
         if not texto: return ""
         return "".join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
 
+    def localizar_municipio(self, endereco):
+        """Retorna {'municipio_oficial', 'promotoria', 'inicio', 'fim', 'fonte'} ou None se não identificado"""
+        with self.metricas.medir("localizacao"):
+            return self.localizador.localizar(endereco)
+
+    def _valores_registro(self, d):
+        return tuple(d[c] for c in COLUNAS_OUVIDORIA)
+
     def salvar_no_banco(self, d):
-        """Salva o registro final no SQLite"""
+        """Salva o registro final no SQLite (o id da linha fica em d['id'])"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO ouvidorias (num_com, num_mprj, data, municipio, promotoria, tema, subtema, empresa, denuncia, resumo, vencedor, responsavel)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (d['num_com'], d['num_mprj'], d['data'], d['municipio'], d['promotoria'], d['tema'], d['subtema'], d['empresa'], d['denuncia'], d['resumo'], d['vencedor'], d['responsavel']))
-            conn.commit()
-            conn.close()
+            with self.metricas.medir("gravacao"):
+                d["id"] = self.banco.executar(SQL_INSERIR_OUVIDORIA, self._valores_registro(d)).lastrowid
+            self.indexar_novas()
             return True
         except Exception as e:
             st.sidebar.error(f"Erro no banco: {e}")
             return False
 
-    def processar_denuncia(self, endereco, denuncia, num_com, num_mprj, vencedor, responsavel):
-        # 1. Identificar Município/Promotoria
-        municipio_nome = "Não identificado"
-        promotoria = "Não identificada"
-        end_upper = self.remover_acentos(endereco.upper())
-        for m_chave, info in self.municipio_para_promotoria.items():
-            if self.remover_acentos(m_chave) in end_upper:
-                municipio_nome = info["municipio_oficial"]
-                promotoria = info["promotoria"]
-                break
-
-        # 2. Classificação com GPT
-        catalogo = json.dumps(self.temas_subtemas, ensure_ascii=False)
+    def salvar_lote_no_banco(self, registros, lote=None, linhas=()):
+        """
+        Salva vários registros em uma única transação. Se 'lote' for informado,
+        as linhas processadas do arquivo de entrada são marcadas na mesma
+        transação (checkpoint da importação em lote).
+        """
+        with self.metricas.medir("gravacao"), self.banco.transacao() as conn:
+            conn.executemany(SQL_INSERIR_OUVIDORIA, [self._valores_registro(d) for d in registros])
+            if lote is not None:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO lote_progresso (lote, linha) VALUES (?, ?)',
+                    [(lote, linha) for linha in linhas]
+                )
+        self.indexar_novas()
+
+    def indexar_novas(self):
+        """Acrescenta ao índice de similaridade as ouvidorias recém-gravadas (falha no índice não impede a gravação)"""
+        try:
+            self.indice.atualizar()
+        except (OSError, sqlite3.Error, ValueError):
+            pass
+
+    def ouvidorias_semelhantes(self, id_ouvidoria, k=VIZINHOS_CONSULTADOS):
+        """Ouvidorias mais parecidas com a informada, da mais para a menos similar (campo 'similaridade', 0 a 1)"""
+        vizinhos = [(i, s) for i, s in self.indice.semelhantes_a(id_ouvidoria, k) if s >= SIMILARIDADE_MINIMA_EXIBICAO]
+        if not vizinhos:
+            return []
+        linhas = self.banco.consultar_dicts(
+            "SELECT id, data, municipio, promotoria, tema, subtema, empresa, resumo, status FROM ouvidorias "
+            f"WHERE id IN ({', '.join('?' for _ in vizinhos)})",
+            tuple(i for i, _ in vizinhos)
+        )
+        por_id = {linha["id"]: linha for linha in linhas}
+        # Ids apagados do banco continuam no índice até a próxima reconstrução
+        return [dict(por_id[i], similaridade=s) for i, s in vizinhos if i in por_id]
+
+    def classificar_por_similaridade(self, denuncia):
+        """
+        Tema/subtema de uma ouvidoria já concluída quase idêntica (similaridade >= limiar), ou None.
+        A própria denúncia, se já estiver gravada como pendente, não conta (não está concluída).
+        O vetor quase não distingue nomes de empresa ("Claro" x "Vivo"): a vizinha só vale se citar
+        a mesma empresa que o texto atual, e empresa e resumo vêm sempre do texto atual.
+        """
+        vizinhos = [(i, s) for i, s in self.indice.buscar_texto(denuncia, VIZINHOS_CONSULTADOS) if s >= self.limiar_similar]
+        if not vizinhos:
+            return None
+        linhas = self.banco.consultar_dicts(
+            "SELECT id, tema, subtema, empresa, resumo FROM ouvidorias "
+            f"WHERE id IN ({', '.join('?' for _ in vizinhos)}) AND status = 'concluido' AND versao_catalogo = ? "
+            f"AND origem IN ({', '.join('?' for _ in ORIGENS_REAPROVEITAVEIS)})",
+            tuple(i for i, _ in vizinhos) + (self.versao_catalogo,) + ORIGENS_REAPROVEITAVEIS
+        )
+        por_id = {linha["id"]: linha for linha in linhas}
+        empresa = self.classificador_local.extrair_empresa(denuncia)
+        for id_vizinho, _ in vizinhos:
+            # Só vale o que foi classificado com o catálogo atual
+            linha = por_id.get(id_vizinho)
+            if linha and _chave_empresa(linha["empresa"]) == _chave_empresa(empresa):
+                return {"tema": linha["tema"], "subtema": linha["subtema"], "empresa": empresa,
+                        "resumo": resumo_extrativo(denuncia)}
+        return None
+
+    def linhas_ja_processadas(self, lote):
+        return {r[0] for r in self.banco.consultar('SELECT linha FROM lote_progresso WHERE lote = ?', (lote,))}
+
+    def registrar_origem(self, origem, quantidade=1):
         try:
-            response = self.client.chat.completions.create(
+            self.banco.executar('''
+                INSERT INTO contadores_roteamento (dia, origem, total) VALUES (?, ?, ?)
+                ON CONFLICT (dia, origem) DO UPDATE SET total = total + excluded.total
+            ''', (datetime.now().strftime("%Y-%m-%d"), origem, quantidade))
+        except sqlite3.Error:
+            pass
+
+    def classificar_localmente(self, denuncia):
+        """Resultado do pré-classificador local se a confiança atingir o limiar; senão None"""
+        dados = self.classificador_local.classificar_se_confiante(denuncia, self.limiar_local)
+        # Modelo treinado com um catálogo anterior pode sugerir um par que não existe mais
+        if dados is not None and (dados["tema"], dados["subtema"]) in self.catalogo.por_nome:
+            return dados
+        return None
+
+    def _mensagem_sistema(self):
+        return (
+            "Você é um classificador do MPRJ. Catálogo (tema: subtemas numerados):\n"
+            f"{self.catalogo.texto_compacto}\n"
+            "Codigo = T<tema>.S<subtema>, ex: T3.S2. Responda apenas em JSON puro."
+        )
+
+    def _chamar_ia(self, mensagens, itens=1, **kwargs):
+        """
+        Chamada com prazo, novas tentativas em 429/5xx e disjuntor (ver resiliencia_ia.py).
+        O uso de tokens é registrado nas métricas ('itens' = denúncias atendidas pela chamada).
+        """
+        with self.metricas.medir("ia"):
+            response = self.resiliencia.executar(
+                self.client.chat.completions.create,
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": f"Você é um classificador do MPRJ. Use este catálogo JSON: {catalogo}. Responda apenas em JSON puro."},
-                    {"role": "user", "content": f"Classifique: {denuncia}. Chaves: tema, subtema, empresa, resumo (máx 10 palavras)."}
-                ],
-                response_format={"type": "json_object"}
+                messages=mensagens,
+                response_format={"type": "json_object"},
+                **kwargs
             )
-            dados_ia = json.loads(response.choices[0].message.content)
-        except Exception as e:
-            st.sidebar.error(f"Erro IA: {e}")
-            dados_ia = {"tema": "Outros", "subtema": "Geral", "empresa": "N/D", "resumo": "Erro no GPT"}
+        self.metricas.registrar_uso(self.model_name, getattr(response, "usage", None), itens)
+        return response.choices[0].message.content
+
+    def _chamar_ia_em_fluxo(self, mensagens, **kwargs):
+        """
+        Como _chamar_ia, mas gera os trechos de texto à medida que chegam. As novas tentativas
+        valem para a abertura da requisição; uma falha no meio do fluxo é propagada.
+        A etapa "ia" mede da requisição ao último pedaço, sem o tempo em que o gerador ficou
+        suspenso no yield (renderização e gravação de quem consome).
+        """
+        inicio = time.perf_counter()
+        suspenso = 0.0
+        fluxo = self.resiliencia.executar(
+            self.client.chat.completions.create,
+            model=self.model_name,
+            messages=mensagens,
+            response_format={"type": "json_object"},
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        usage = None
+        with fluxo:
+            for pedaco in fluxo:
+                # O uso de tokens vem em um pedaço final, sem 'choices'
+                usage = getattr(pedaco, "usage", None) or usage
+                if pedaco.choices and pedaco.choices[0].delta.content:
+                    pausa = time.perf_counter()
+                    yield pedaco.choices[0].delta.content
+                    suspenso += time.perf_counter() - pausa
+        self.metricas.registrar_etapa("ia", (time.perf_counter() - inicio - suspenso) * 1000)
+        self.metricas.registrar_uso(self.model_name, usage, 1)
+
+    def _resolver_codigo(self, resposta):
+        """Troca o código da resposta pelos nomes canônicos; None se o par tema/subtema não existir"""
+        if not isinstance(resposta, dict):
+            return None
+        par = self.catalogo.resolver(resposta.get("codigo"))
+        if par is None:
+            return None
+        return {"tema": par[0], "subtema": par[1], "empresa": resposta.get("empresa"), "resumo": resposta.get("resumo")}
+
+    def _classificar_sem_ia(self, denuncia, chave):
+        """Cache, ouvidoria quase idêntica ou pré-classificador local (com 'origem'); None se for preciso chamar a IA"""
+        em_cache = self.cache.buscar(chave)
+        if em_cache:
+            self.registrar_origem("cache")
+            return dict(em_cache, origem="cache")
+
+        dados_similares = self.classificar_por_similaridade(denuncia)
+        if dados_similares:
+            self.registrar_origem("similar")
+            return dict(dados_similares, origem="similar")
 
-        # 3. Formatação Final
-        dados_final = {
+        dados_locais = self.classificar_localmente(denuncia)
+        if dados_locais:
+            self.registrar_origem("local")
+            return dict(dados_locais, origem="local")
+        return None
+
+    def _mensagens_classificacao(self, denuncia):
+        with self.metricas.medir("prompt"):
+            return [
+                {"role": "system", "content": self._mensagem_sistema()},
+                {"role": "user", "content": f"Classifique: {denuncia}. Chaves: codigo, empresa, resumo (máx 10 palavras)."}
+            ]
+
+    def _interpretar_resposta(self, mensagens, conteudo):
+        """{tema, subtema, empresa, resumo} da resposta; código fora do catálogo gera uma única nova tentativa"""
+        with self.metricas.medir("parse"):
+            resposta = json.loads(conteudo)
+            dados_ia = self._resolver_codigo(resposta)
+        if dados_ia is None:
+            # Código fora do catálogo: uma única nova tentativa, indicando os códigos válidos
+            codigo = resposta.get("codigo") if isinstance(resposta, dict) else None
+            mensagens = mensagens + [
+                {"role": "assistant", "content": conteudo},
+                {"role": "user", "content": self.catalogo.dica_correcao(codigo)}
+            ]
+            conteudo = self._chamar_ia(mensagens)
+            with self.metricas.medir("parse"):
+                resposta = json.loads(conteudo)
+                dados_ia = self._resolver_codigo(resposta)
+            if dados_ia is None:
+                raise ValueError(f"Classificação fora do catálogo: {resposta}")
+        return dados_ia
+
+    def classificar_texto(self, denuncia, levantar_erros=False):
+        """
+        Retorna {tema, subtema, empresa, resumo}; denúncias já classificadas vêm do cache sem chamar a IA.
+        Com levantar_erros=True a falha da IA é propagada em vez de virar a classificação padrão "Outros".
+        O campo 'origem' indica quem classificou: cache, similar (ouvidoria quase idêntica já
+        classificada), local (sem IA), ia ou degradado.
+        """
+        chave = self.cache.gerar_chave(denuncia, self.model_name, self.versao_catalogo)
+        sem_ia = self._classificar_sem_ia(denuncia, chave)
+        if sem_ia:
+            return sem_ia
+
+        mensagens = self._mensagens_classificacao(denuncia)
+        try:
+            dados_ia = self._interpretar_resposta(mensagens, self._chamar_ia(mensagens))
+        except Exception:
+            if levantar_erros:
+                raise
+            self.registrar_origem("degradado")
+            return self.classificacao_degradada(denuncia)
+
+        self.cache.gravar(chave, dados_ia)
+        self.registrar_origem("ia")
+        return dict(dados_ia, origem="ia")
+
+    def classificar_texto_em_fluxo(self, denuncia):
+        """
+        Versão incremental de classificar_texto: a resposta da IA é lida em fluxo (stream) e cada
+        trecho recebido gera um dicionário parcial com os campos já conhecidos (tema/subtema assim
+        que o código chega inteiro; empresa e resumo ainda incompletos). O último dicionário gerado
+        é a classificação final, com 'origem'. Cache, similar e local geram só o resultado final.
+        """
+        chave = self.cache.gerar_chave(denuncia, self.model_name, self.versao_catalogo)
+        sem_ia = self._classificar_sem_ia(denuncia, chave)
+        if sem_ia:
+            yield sem_ia
+            return
+
+        mensagens = self._mensagens_classificacao(denuncia)
+        try:
+            conteudo, anterior = "", {}
+            for trecho in self._chamar_ia_em_fluxo(mensagens):
+                conteudo += trecho
+                parcial = self._resolver_parcial(campos_parciais(conteudo))
+                if parcial != anterior:
+                    anterior = parcial
+                    yield parcial
+            dados_ia = self._interpretar_resposta(mensagens, conteudo)
+        except Exception:
+            self.registrar_origem("degradado")
+            yield self.classificacao_degradada(denuncia)
+            return
+
+        self.cache.gravar(chave, dados_ia)
+        self.registrar_origem("ia")
+        yield dict(dados_ia, origem="ia")
+
+    def _resolver_parcial(self, campos):
+        """Campos parciais da resposta com o código já trocado por tema/subtema (se estiver completo e válido)"""
+        parcial = {c: campos[c] for c in ("empresa", "resumo") if campos.get(c)}
+        par = self.catalogo.resolver(campos.get("codigo_completo"))
+        if par:
+            parcial["tema"], parcial["subtema"] = par
+        return parcial
+
+    def classificacao_degradada(self, denuncia):
+        """
+        Classificação provisória quando a IA falha ou está sendo evitada pelo disjuntor:
+        o palpite do pré-classificador local, mesmo abaixo do limiar. A linha fica marcada
+        (origem/status 'degradado') e volta para a fila quando a IA se recuperar.
+        """
+        dados, _ = self.classificador_local.classificar(denuncia)
+        if dados is None:
+            dados = {"tema": "Outros", "subtema": "Geral", "empresa": "N/D", "resumo": resumo_extrativo(denuncia)}
+        return dict(dados, origem="degradado")
+
+    def estimar_tokens(self, texto):
+        """Estimativa grosseira (~3 caracteres por token em português), suficiente para dimensionar pacotes"""
+        return len(texto) // 3 + 10
+
+    def _montar_pacotes(self, itens, orcamento_tokens):
+        """Agrupa (id, texto) em pacotes que respeitam o orçamento de entrada e o limite de resposta"""
+        max_itens = max(1, MAX_TOKENS_RESPOSTA_LOTE // TOKENS_RESPOSTA_POR_ITEM)
+        pacotes, atual, tokens_atual = [], [], 0
+        for id_item, texto in itens:
+            tokens = self.estimar_tokens(texto)
+            if atual and (tokens_atual + tokens > orcamento_tokens or len(atual) >= max_itens):
+                pacotes.append(atual)
+                atual, tokens_atual = [], 0
+            atual.append((id_item, texto))
+            tokens_atual += tokens
+        if atual:
+            pacotes.append(atual)
+        return pacotes
+
+    def _classificar_pacote(self, pacote, levantar_erros=False):
+        """
+        Uma requisição para o pacote; itens ausentes ou malformados na resposta são refeitos
+        individualmente. Se a própria chamada falhar (conexão, 429, disjuntor aberto), refazer
+        item a item só multiplicaria as chamadas: o pacote inteiro fica degradado (ou, com
+        levantar_erros=True, a exceção é propagada).
+        """
+        with self.metricas.medir("prompt"):
+            entrada = [{"id": str(id_item), "texto": texto} for id_item, texto in pacote]
+            mensagens = [
+                {"role": "system", "content": self._mensagem_sistema()},
+                {"role": "user", "content": (
+                    "Classifique cada denúncia da lista abaixo. Responda no formato "
+                    '{"resultados": [{"id": ..., "codigo": ..., "empresa": ..., "resumo": ...}]}, '
+                    "com um item para cada id recebido e resumo de no máximo 10 palavras.\n"
+                    + json.dumps(entrada, ensure_ascii=False)
+                )}
+            ]
+        try:
+            conteudo = self._chamar_ia(
+                mensagens, itens=len(pacote),
+                max_tokens=min(MAX_TOKENS_RESPOSTA_LOTE, TOKENS_RESPOSTA_POR_ITEM * len(pacote) + 100),
+                timeout=TIMEOUT_REQUISICAO_LOTE
+            )
+        except Exception:
+            if levantar_erros:
+                raise
+            self.registrar_origem("degradado", len(pacote))
+            return {id_item: self.classificacao_degradada(texto) for id_item, texto in pacote}
+
+        resultados = {}
+        try:
+            with self.metricas.medir("parse"):
+                for item in json.loads(conteudo).get("resultados", []):
+                    # Itens com código inválido ficam de fora e passam pela classificação individual (com nova tentativa)
+                    dados_ia = self._resolver_codigo(item)
+                    if dados_ia is not None and "id" in item:
+                        resultados[str(item["id"])] = dados_ia
+        except (ValueError, AttributeError, TypeError):
+            # Resposta inválida ou truncada: os itens sem resultado caem no modo individual abaixo
+            pass
+
+        saida = {}
+        for id_item, texto in pacote:
+            dados_ia = resultados.get(str(id_item))
+            if dados_ia is None:
+                dados_ia = self.classificar_texto(texto, levantar_erros)
+            else:
+                self.cache.gravar(self.cache.gerar_chave(texto, self.model_name, self.versao_catalogo), dados_ia)
+                self.registrar_origem("ia")
+                dados_ia = dict(dados_ia, origem="ia")
+            saida[id_item] = dados_ia
+        return saida
+
+    def classificar_lote(self, denuncias, orcamento_tokens=ORCAMENTO_TOKENS_LOTE, concorrencia=4, levantar_erros=False):
+        """
+        Classifica várias denúncias enviando o catálogo uma única vez por requisição.
+
+        denuncias: {id: texto} (ou lista de textos, com ids = posições).
+        Retorna {id: {tema, subtema, empresa, resumo}}. O tamanho de cada pacote é
+        definido pelo orçamento de tokens; denúncias já em cache, quase idênticas a uma
+        ouvidoria já classificada ou resolvidas pelo pré-classificador local não vão para a IA.
+        """
+        if not isinstance(denuncias, dict):
+            denuncias = dict(enumerate(denuncias))
+
+        resultados, faltantes = {}, []
+        for id_item, texto in denuncias.items():
+            em_cache = self.cache.buscar(self.cache.gerar_chave(texto, self.model_name, self.versao_catalogo))
+            dados_similares = None if em_cache else self.classificar_por_similaridade(texto)
+            dados_locais = None if em_cache or dados_similares else self.classificar_localmente(texto)
+            if em_cache:
+                resultados[id_item] = dict(em_cache, origem="cache")
+            elif dados_similares:
+                resultados[id_item] = dict(dados_similares, origem="similar")
+            elif dados_locais:
+                resultados[id_item] = dict(dados_locais, origem="local")
+            else:
+                faltantes.append((id_item, texto))
+        for origem in ("cache", "similar", "local"):
+            quantidade = sum(1 for d in resultados.values() if d["origem"] == origem)
+            if quantidade:
+                self.registrar_origem(origem, quantidade)
+
+        pacotes = self._montar_pacotes(faltantes, orcamento_tokens)
+        with ThreadPoolExecutor(max_workers=max(1, concorrencia)) as pool:
+            for parcial in pool.map(lambda p: self._classificar_pacote(p, levantar_erros), pacotes):
+                resultados.update(parcial)
+        return resultados
+
+    def montar_registro(self, endereco, denuncia, num_com, num_mprj, vencedor, responsavel, dados_ia, data=None):
+        """Junta localização, classificação e dados do formulário no registro da tabela ouvidorias"""
+        municipio_nome = "Não identificado"
+        promotoria = "Não identificada"
+        local = self.localizar_municipio(endereco)
+        if local:
+            municipio_nome = local["municipio_oficial"]
+            promotoria = local["promotoria"]
+
+        agora = datetime.now()
+        origem = dados_ia.get("origem", "ia")
+        empresa_id, empresa = self.registro_empresas.resolver(dados_ia.get("empresa"))
+        return {
             "num_com": num_com, "num_mprj": num_mprj, "promotoria": promotoria,
-            "municipio": municipio_nome, "data": datetime.now().strftime("%d/%m/%Y %H:%M"),
+            "municipio": municipio_nome, "data": data or agora.strftime("%d/%m/%Y %H:%M"),
+            "data_iso": data_para_iso(data) if data else agora.isoformat(timespec="minutes"),
             "denuncia": denuncia, "resumo": dados_ia.get("resumo"),
             "tema": dados_ia.get("tema"), "subtema": dados_ia.get("subtema"),
-            "empresa": str(dados_ia.get("empresa")).title(),
-            "vencedor": vencedor, "responsavel": responsavel
+            "empresa": empresa, "empresa_id": empresa_id, "empresa_original": dados_ia.get("empresa"),
+            "vencedor": vencedor, "responsavel": responsavel,
+            "origem": origem, "status": "degradado" if origem == "degradado" else "concluido",
+            "versao_catalogo": self.versao_catalogo
         }
 
-        # 4. Salvar
-        sucesso = self.salvar_no_banco(dados_final)
+    def processar_denuncia(self, endereco, denuncia, num_com, num_mprj, vencedor, responsavel):
+        with self.metricas.medir("total"):
+            # 1. Classificação com GPT (ou cache)
+            dados_ia = self.classificar_texto(denuncia)
+
+            # 2. Identificar Município/Promotoria e formatar
+            dados_final = self.montar_registro(endereco, denuncia, num_com, num_mprj, vencedor, responsavel, dados_ia)
+
+            # 3. Salvar
+            sucesso = self.salvar_no_banco(dados_final)
         return dados_final, sucesso
+
+
+def versao_bases():
+    """Datas de modificação dos arquivos de base (0 se o arquivo não existir)"""
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    versao = []
+    for nome in ARQUIVOS_BASES:
+        caminho = os.path.join(base_path, nome)
+        versao.append(os.path.getmtime(caminho) if os.path.exists(caminho) else 0)
+    return tuple(versao)
+
+
+def _liberar_classificador(classificador):
+    """
+    Ao ser trocado por outro (bases alteradas): fecha em segundo plano, depois que as
+    classificações em andamento com ele terminarem, sem bloquear o rerun
+    """
+    threading.Thread(target=classificador.fechar, name="saro-fechar-classificador", daemon=True).start()
+
+
+@st.cache_resource(max_entries=1, show_spinner=False, on_release=_liberar_classificador)
+def _classificador_compartilhado(versao):
+    return ClassificadorDenuncias()
+
+
+def obter_classificador():
+    """
+    Classificador único por processo (bases, autômato, conexão SQLite e cliente
+    HTTP da OpenAI com keep-alive), reaproveitado entre reruns e sessões do
+    Streamlit e recriado apenas quando um arquivo de base muda no disco.
+    """
+    return _classificador_compartilhado(versao_bases())
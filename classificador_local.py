@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Pré-classificador Local - MPRJ
+
+Classifica localmente as denúncias repetitivas (internet da Claro/Vivo, luz da
+Enel, plano de saúde da Unimed...) sem chamar a IA. Combina regras de
+palavras-chave com um modelo linear TF-IDF (centróides por subtema) treinado
+a partir das ouvidorias já classificadas no banco. Inferência em Python puro.
+
+Uso:
+    python3 classificador_local.py --treinar      # (re)treina a partir do banco
+    python3 classificador_local.py --relatorio    # atendimentos locais x IA
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from banco_dados import SQL_DENUNCIA, BancoDados
+
+# (termos — basta um aparecer, tema, subtema)
+REGRAS_PALAVRAS_CHAVE = [
+    (("internet", "wi-fi", "wifi", "fibra optica", "banda larga"), "Telecomunicações", "Internet (Conexão)"),
+    (("tv por assinatura", "tv a cabo", "sky"), "Telecomunicações", "TV por Assinatura"),
+    (("linha telefonica", "telefone fixo", "celular pos-pago", "chip", "portabilidade"), "Telecomunicações", "Telefonia (Fixa e Móvel)"),
+    (("conta de luz", "energia eletrica", "falta de luz", "queda de energia", "enel", "light", "ampla"), "Serviços", "Luz"),
+    (("conta de agua", "falta de agua", "cedae", "aguas do rio"), "Serviços", "Água"),
+    (("plano de saude", "operadora de saude", "unimed", "amil", "bradesco saude", "sulamerica saude"), "Saúde", "Planos de Saúde"),
+    (("supervia", "trem"), "Transporte", "Trem"),
+    (("estacao do metro", "metrorio"), "Transporte", "Metrô"),
+    (("onibus", "brt"), "Transporte", "Ônibus"),
+    (("barcas", "ccr barcas"), "Transporte", "Barcas"),
+    (("uber", "99 pop", "taxi"), "Transporte", "Táxi e Aplicativos de Transporte"),
+    (("cartao de credito", "fatura do cartao"), "Finanças", "Cartões"),
+    (("serasa", "spc", "nome negativado"), "Finanças", "Serviços de Proteção ao Crédito"),
+]
+
+# (termos, nome da empresa)
+EMPRESAS_CONHECIDAS = [
+    (("claro", "net claro", "claro net"), "Claro"),
+    (("vivo",), "Vivo"),
+    (("tim",), "Tim"),
+    (("oi fibra", "operadora oi"), "Oi"),
+    (("sky",), "Sky"),
+    (("enel", "ampla"), "Enel"),
+    (("light",), "Light"),
+    (("cedae",), "Cedae"),
+    (("aguas do rio",), "Águas Do Rio"),
+    (("unimed",), "Unimed"),
+    (("amil",), "Amil"),
+    (("supervia",), "Supervia"),
+    (("metrorio",), "Metrôrio"),
+    (("ccr barcas",), "Ccr Barcas"),
+]
+
+CONFIANCA_REGRA = 0.5          # regra sozinha: palpite (fica abaixo do limiar, a IA decide)
+CONFIANCA_CONFIRMADA = 0.9     # regra com 2+ termos distintos e modelo concordando
+MIN_TERMOS_CONFIRMACAO = 2
+TEMPERATURA = 10.0             # escala das similaridades antes do softmax
+MIN_SIMILARIDADE = 0.2         # abaixo disso o texto não se parece com nenhuma classe treinada
+MIN_EXEMPLOS_POR_CLASSE = 5
+STOPWORDS = set("""
+a o e de da do das dos em no na nos nas um uma uns umas que com por para pra se nao sim mais
+muito ja foi ser esta estou meu minha meus minhas ao aos as os como mas ou ele ela eles elas
+eu me tem ter sao era ha isso esse essa este esta pelo pela pelos pelas sobre entre ate apos
+""".split())
+
+
+def normalizar(texto: str) -> str:
+    sem_acentos = "".join(c for c in unicodedata.normalize('NFD', texto or "") if unicodedata.category(c) != 'Mn')
+    return re.sub(r"\s+", " ", sem_acentos.lower()).strip()
+
+
+def tokenizar(texto_norm: str):
+    return [t for t in re.findall(r"[a-z0-9]{2,}", texto_norm) if t not in STOPWORDS]
+
+
+def _regex_termos(termos):
+    termos = sorted({normalizar(t) for t in termos}, key=len, reverse=True)
+    return re.compile(r"(?<![a-z0-9])(?:" + "|".join(re.escape(t) for t in termos) + r")(?![a-z0-9])")
+
+
+def resumo_extrativo(texto: str, max_palavras=10) -> str:
+    """Primeira frase da denúncia, limitada a 10 palavras (o resumo da IA tem o mesmo limite)"""
+    frase = re.split(r"(?<=[.!?])\s", (texto or "").strip(), maxsplit=1)[0]
+    palavras = frase.split()
+    return " ".join(palavras[:max_palavras]) + ("..." if len(palavras) > max_palavras else "")
+
+
+class ClassificadorLocal:
+    def __init__(self, caminho_modelo):
+        self.caminho_modelo = caminho_modelo
+        self.regras = [(_regex_termos(termos), tema, subtema) for termos, tema, subtema in REGRAS_PALAVRAS_CHAVE]
+        self.idf = {}
+        self.centroides = {}   # "tema\x1fsubtema" -> {token: peso} (normalizado)
+        self.treinado = False
+        self._definir_empresas([])
+        self.carregar()
+
+    def _definir_empresas(self, aprendidas):
+        """Empresas conhecidas + as aprendidas no treino, num único regex (mais longa primeiro)"""
+        self.empresas = {}
+        for termos, nome in EMPRESAS_CONHECIDAS:
+            for t in termos:
+                self.empresas[normalizar(t)] = nome
+        for nome in aprendidas:
+            chave = normalizar(nome)
+            if len(chave) >= 3:
+                self.empresas.setdefault(chave, nome)
+        self.regex_empresas = _regex_termos(self.empresas.keys())
+
+    def _empresa_em(self, texto_norm):
+        achada = self.regex_empresas.search(texto_norm)
+        return self.empresas[achada.group(0)] if achada else "N/D"
+
+    def extrair_empresa(self, denuncia):
+        """Nome da primeira empresa conhecida (ou aprendida no treino) citada no texto; "N/D" se nenhuma"""
+        return self._empresa_em(normalizar(denuncia))
+
+    def carregar(self):
+        if not os.path.exists(self.caminho_modelo):
+            return
+        with open(self.caminho_modelo, 'r', encoding='utf-8') as f:
+            modelo = json.load(f)
+        self.idf = modelo["idf"]
+        self.centroides = modelo["centroides"]
+        self._definir_empresas(modelo.get("empresas", []))
+        self.treinado = bool(self.centroides)
+
+    def _vetor(self, tokens):
+        tf = Counter(tokens)
+        vetor = {t: (1 + math.log(n)) * self.idf[t] for t, n in tf.items() if t in self.idf}
+        norma = math.sqrt(sum(v * v for v in vetor.values())) or 1.0
+        return {t: v / norma for t, v in vetor.items()}
+
+    def treinar(self, exemplos, temas_subtemas):
+        """
+        exemplos: iterável de (denuncia, tema, subtema, empresa). Apenas pares
+        presentes no catálogo e classes com exemplos suficientes entram no modelo.
+        """
+        validos = {(t, s) for t, subs in temas_subtemas.items() for s in subs}
+        documentos, empresas = [], Counter()
+        for denuncia, tema, subtema, empresa in exemplos:
+            if (tema, subtema) in validos and denuncia:
+                documentos.append((tokenizar(normalizar(denuncia)), f"{tema}\x1f{subtema}"))
+                if empresa and empresa not in ("N/D", "None"):
+                    empresas[empresa] += 1
+
+        df = Counter()
+        for tokens, _ in documentos:
+            df.update(set(tokens))
+        total = len(documentos)
+        self.idf = {t: math.log((1 + total) / (1 + n)) + 1 for t, n in df.items() if n >= 2}
+
+        somas, contagem = defaultdict(lambda: defaultdict(float)), Counter()
+        for tokens, rotulo in documentos:
+            contagem[rotulo] += 1
+            for t, v in self._vetor(tokens).items():
+                somas[rotulo][t] += v
+
+        self.centroides = {}
+        for rotulo, soma in somas.items():
+            if contagem[rotulo] < MIN_EXEMPLOS_POR_CLASSE:
+                continue
+            norma = math.sqrt(sum(v * v for v in soma.values())) or 1.0
+            # Mantém só os termos mais relevantes de cada classe (modelo compacto)
+            principais = sorted(soma.items(), key=lambda kv: kv[1], reverse=True)[:300]
+            self.centroides[rotulo] = {t: round(v / norma, 5) for t, v in principais}
+
+        aprendidas = [nome for nome, n in empresas.items() if n >= 2]
+        self._definir_empresas(aprendidas)
+        self.treinado = bool(self.centroides)
+
+        with open(self.caminho_modelo, 'w', encoding='utf-8') as f:
+            json.dump({"idf": self.idf, "centroides": self.centroides, "empresas": aprendidas}, f, ensure_ascii=False)
+        return {"exemplos": total, "classes": len(self.centroides), "empresas": len(aprendidas)}
+
+    def _probabilidades(self, tokens):
+        vetor = self._vetor(tokens)
+        if not vetor:
+            return {}
+        sims = {r: sum(v * c.get(t, 0.0) for t, v in vetor.items()) for r, c in self.centroides.items()}
+        maior = max(sims.values())
+        if maior < MIN_SIMILARIDADE:
+            return {}
+        exps = {r: math.exp(TEMPERATURA * (s - maior)) for r, s in sims.items()}
+        total = sum(exps.values())
+        return {r: e / total for r, e in exps.items()}
+
+    def classificar(self, denuncia):
+        """
+        Retorna ({tema, subtema, empresa, resumo}, confiança) ou (None, 0.0).
+        Uma palavra-chave sozinha é só um palpite ("comprei pela internet" não é
+        reclamação de internet): a confiança só sobe quando 2+ termos da regra
+        aparecem e o modelo concorda. Discordando, ou com regras de assuntos
+        diferentes ao mesmo tempo, a decisão fica com a IA.
+        """
+        texto = normalizar(denuncia)
+        disparadas = {}
+        for regex, tema, subtema in self.regras:
+            termos = set(regex.findall(texto))
+            if termos:
+                disparadas[(tema, subtema)] = len(termos)
+        if len(disparadas) > 1:
+            return None, 0.0
+        regra, termos = next(iter(disparadas.items())) if disparadas else (None, 0)
+
+        rotulo, confianca = None, 0.0
+        if self.treinado:
+            probs = self._probabilidades(tokenizar(texto))
+            if probs:
+                melhor = max(probs, key=probs.get)
+                rotulo, confianca = tuple(melhor.split("\x1f")), probs[melhor]
+        if regra:
+            if rotulo is None:
+                rotulo, confianca = regra, CONFIANCA_REGRA
+            elif rotulo == regra:
+                if termos >= MIN_TERMOS_CONFIRMACAO:
+                    confianca = max(confianca, CONFIANCA_CONFIRMADA)
+            else:
+                return None, 0.0
+        if rotulo is None:
+            return None, 0.0
+
+        return {"tema": rotulo[0], "subtema": rotulo[1], "empresa": self._empresa_em(texto),
+                "resumo": resumo_extrativo(denuncia)}, confianca
+
+    def classificar_se_confiante(self, denuncia, limiar):
+        """
+        Resultado local apenas quando ele pode dispensar a IA: confiança >= limiar e uma
+        empresa identificada no texto. Sem empresa, o caso raramente é o repetitivo que
+        o pré-classificador atende (ex.: acidente com ônibus, golpe com chip). Senão None.
+        """
+        dados, confianca = self.classificar(denuncia)
+        if dados is None or confianca < limiar or dados["empresa"] == "N/D":
+            return None
+        return dados
+
+
+# ============ LINHA DE COMANDO ============
+
+def treinar_do_banco(banco, caminho_modelo, temas_subtemas):
+    """Treina apenas com classificações feitas pela IA (evita o modelo aprender com as próprias respostas)"""
+    exemplos = banco.consultar(
+        f"SELECT {SQL_DENUNCIA}, tema, subtema, empresa FROM ouvidorias o WHERE COALESCE(origem, 'ia') IN ('ia', 'cache')"
+    )
+    return ClassificadorLocal(caminho_modelo).treinar(exemplos, temas_subtemas)
+
+
+def relatorio_roteamento(banco):
+    return banco.consultar(
+        "SELECT origem, SUM(total) FROM contadores_roteamento GROUP BY origem ORDER BY origem"
+    )
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Pré-classificador local - MPRJ")
+    parser.add_argument("--treinar", action="store_true", help="(re)treina o modelo a partir das ouvidorias no banco")
+    parser.add_argument("--relatorio", action="store_true", help="quantas classificações foram locais, do cache ou da IA")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    parser.add_argument("--modelo", default=os.path.join(base_path, "modelo_local.json"))
+    args = parser.parse_args()
+
+    banco = BancoDados(args.banco)
+    if args.treinar:
+        with open(os.path.join(base_path, "base_temas_subtemas.json"), 'r', encoding='utf-8') as f:
+            temas_subtemas = json.load(f)
+        info = treinar_do_banco(banco, args.modelo, temas_subtemas)
+        print(f"✅ Modelo treinado com {info['exemplos']} exemplos: {info['classes']} subtemas, {info['empresas']} empresas.")
+        print(f"💾 Salvo em: {args.modelo}")
+    if args.relatorio:
+        linhas = relatorio_roteamento(banco)
+        total = sum(n for _, n in linhas) or 1
+        print("📊 Classificações por origem:")
+        for origem, n in linhas:
+            print(f"   {origem:<8} {n:>8}  ({100 * n / total:.1f}%)")
+    if not (args.treinar or args.relatorio):
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Exportação de Ouvidorias - MPRJ
+
+Gera planilhas (CSV), JSONL ou Parquet das ouvidorias, com filtros por
+promotoria, município, tema, empresa e período. As linhas são lidas do SQLite em blocos
+(cursor com fetchmany, em uma conexão somente leitura) e gravadas no arquivo
+bloco a bloco: a memória usada não cresce com o tamanho da exportação.
+
+Uso:
+    python3 exportar_ouvidorias.py saida.csv --promotoria "NÚCLEO NITERÓI" --inicio 2026-01-01 --fim 2026-03-31
+    python3 exportar_ouvidorias.py saida.parquet --tema "Telecomunicações"
+    python3 exportar_ouvidorias.py saida.jsonl --municipio Niterói --formato jsonl
+    python3 exportar_ouvidorias.py saida.csv --empresa "Claro S.A."      # nome canônico ou apelido
+"""
+
+import argparse
+import codecs
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+from banco_dados import SQL_DENUNCIA, data_para_iso
+
+FORMATOS = ("csv", "jsonl", "parquet")
+TIPOS_MIME = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+COLUNAS_EXPORTACAO = (
+    "id", "num_com", "num_mprj", "data", "data_iso", "municipio", "promotoria", "tema", "subtema",
+    "empresa", "denuncia", "resumo", "vencedor", "responsavel", "origem", "status", "versao_catalogo"
+)
+TAMANHO_BLOCO = 5000
+SEPARADOR_CSV = ";"      # padrão do Excel em português (vírgula é separador decimal)
+
+
+def montar_consulta(promotoria=None, municipio=None, tema=None, empresa_id=None, inicio=None, fim=None):
+    """
+    SQL + parâmetros da exportação. Datas em qualquer formato aceito por data_para_iso;
+    'fim' inclui o dia inteiro. Os filtros usam os índices (promotoria/município/empresa_id
+    + data_iso, tema). A empresa é filtrada pelo id do registro canônico (registro_empresas.py).
+    """
+    condicoes, parametros = [], []
+    for coluna, valor in (("promotoria", promotoria), ("municipio", municipio), ("tema", tema),
+                          ("empresa_id", empresa_id)):
+        if valor:
+            condicoes.append(f"{coluna} = ?")
+            parametros.append(valor)
+    if inicio:
+        inicio_iso = data_para_iso(inicio)
+        if inicio_iso is None:
+            raise ValueError(f"Data inicial não reconhecida: {inicio}")
+        condicoes.append("data_iso >= ?")
+        parametros.append(inicio_iso[:10])
+    if fim:
+        fim_iso = data_para_iso(fim)
+        if fim_iso is None:
+            raise ValueError(f"Data final não reconhecida: {fim}")
+        condicoes.append("data_iso < ?")
+        parametros.append((datetime.fromisoformat(fim_iso[:10]) + timedelta(days=1)).strftime("%Y-%m-%d"))
+    onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    # Denúncias no arquivo frio saem descomprimidas
+    colunas = ", ".join(SQL_DENUNCIA if c == "denuncia" else f"o.{c}" for c in COLUNAS_EXPORTACAO)
+    return f"SELECT {colunas} FROM ouvidorias o {onde} ORDER BY o.id", tuple(parametros)
+
+
+def blocos(banco, tamanho=TAMANHO_BLOCO, **filtros):
+    """Gera listas de até 'tamanho' linhas (tuplas na ordem de COLUNAS_EXPORTACAO)"""
+    sql, parametros = montar_consulta(**filtros)
+    with banco.leitor() as conn:
+        cursor = conn.execute(sql, parametros)
+        while True:
+            linhas = cursor.fetchmany(tamanho)
+            if not linhas:
+                return
+            yield linhas
+
+
+def _gravar_csv(arquivo, blocos_linhas):
+    # BOM escrito à parte: o Excel reconhece o UTF-8 e o codec "utf-8" é bem mais rápido que "utf-8-sig"
+    arquivo.write(codecs.BOM_UTF8)
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8", newline="")
+    escritor = csv.writer(texto, delimiter=SEPARADOR_CSV)
+    escritor.writerow(COLUNAS_EXPORTACAO)
+    total = 0
+    for linhas in blocos_linhas:
+        escritor.writerows(linhas)
+        total += len(linhas)
+    texto.flush()
+    texto.detach()
+    return total
+
+
+def _gravar_jsonl(arquivo, blocos_linhas):
+    total = 0
+    for linhas in blocos_linhas:
+        arquivo.write("".join(
+            json.dumps(dict(zip(COLUNAS_EXPORTACAO, linha)), ensure_ascii=False) + "\n" for linha in linhas
+        ).encode("utf-8"))
+        total += len(linhas)
+    return total
+
+
+def _gravar_parquet(arquivo, blocos_linhas):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Exportação em Parquet requer o pacote pyarrow (pip install pyarrow).")
+    esquema = pa.schema([(c, pa.int64() if c == "id" else pa.string()) for c in COLUNAS_EXPORTACAO])
+    total = 0
+    # Um row group por bloco: o arquivo é escrito aos poucos, sem montar a tabela inteira
+    with pq.ParquetWriter(arquivo, esquema, compression="zstd") as escritor:
+        for linhas in blocos_linhas:
+            colunas = list(zip(*linhas))
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, esquema)], schema=esquema
+            ))
+            total += len(linhas)
+    return total
+
+
+GRAVADORES = {"csv": _gravar_csv, "jsonl": _gravar_jsonl, "parquet": _gravar_parquet}
+
+
+def exportar(banco, arquivo, formato="csv", tamanho_bloco=TAMANHO_BLOCO, **filtros):
+    """
+    Grava as ouvidorias filtradas em 'arquivo' (caminho ou arquivo binário aberto) e retorna quantas linhas.
+    Filtros: promotoria, municipio, tema, empresa_id, inicio, fim.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS)})")
+    montar_consulta(**filtros)  # valida os filtros antes de criar o arquivo
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, "wb") as f:
+            return exportar(banco, f, formato, tamanho_bloco, **filtros)
+    return GRAVADORES[formato](arquivo, blocos(banco, tamanho_bloco, **filtros))
+
+
+def main():
+    from banco_dados import BancoDados
+    from registro_empresas import RegistroEmpresas
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Exportação de ouvidorias (CSV, JSONL ou Parquet) - MPRJ")
+    parser.add_argument("saida", help="arquivo a gerar (o formato vem da extensão, se --formato não for informado)")
+    parser.add_argument("--formato", choices=FORMATOS)
+    parser.add_argument("--promotoria")
+    parser.add_argument("--municipio")
+    parser.add_argument("--tema")
+    parser.add_argument("--empresa", help="empresa (id, nome canônico ou apelido do registro de empresas)")
+    parser.add_argument("--inicio", help="data inicial (AAAA-MM-DD ou DD/MM/AAAA)")
+    parser.add_argument("--fim", help="data final, inclusive")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    formato = args.formato or os.path.splitext(args.saida)[1].lstrip(".").lower()
+    if formato not in FORMATOS:
+        parser.error(f"não foi possível deduzir o formato de '{args.saida}'; use --formato ({', '.join(FORMATOS)})")
+    banco = BancoDados(args.banco)
+    try:
+        empresa_id = None
+        if args.empresa:
+            empresa_id = RegistroEmpresas(banco).localizar(args.empresa)
+            if empresa_id is None:
+                raise ValueError(f"Empresa não encontrada no registro: {args.empresa}")
+        total = exportar(banco, args.saida, formato, promotoria=args.promotoria, municipio=args.municipio,
+                         tema=args.tema, empresa_id=empresa_id, inicio=args.inicio, fim=args.fim)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print(f"✅ {total} ouvidorias exportadas para {args.saida}")
+
+if __name__ == "__main__":
+    main()
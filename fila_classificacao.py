@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Fila de Classificação Assíncrona - MPRJ
+
+O formulário grava a ouvidoria na hora com status 'pendente' (município e
+promotoria já resolvidos localmente) e um grupo de threads de trabalho faz a
+classificação pela IA em segundo plano, atualizando a linha ao terminar.
+A vazão nos horários de pico fica limitada pelo número de trabalhadores, e não
+pela espera de cada operador. Pendências de uma execução interrompida são
+retomadas quando a fila é criada.
+
+Cada linha em andamento guarda quem a reservou (máquina e processo) e quando.
+Várias filas podem usar o mesmo banco (outro processo do Streamlit, o serviço
+HTTP, a reclassificação do catálogo): uma fila nova só retoma as linhas cuja
+reserva venceu (PRAZO_RESERVA) ou que são do próprio processo e não estão
+mais em andamento nele.
+
+Se a IA estiver fora do ar, a linha recebe uma classificação local provisória
+(status 'degradado') e volta para a fila automaticamente quando a IA responder
+de novo (o disjuntor de resiliencia_ia.py avisa a recuperação).
+"""
+
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from banco_dados import SQL_DENUNCIA
+from classificador_denuncias import COLUNAS_OUVIDORIA, SQL_INSERIR_OUVIDORIA, obter_classificador, versao_bases
+
+# Trabalhadores simultâneos (variável SARO_TRABALHADORES_FILA)
+TRABALHADORES_FILA = 4
+
+STATUS_PENDENTE = "pendente"
+STATUS_PROCESSANDO = "processando"
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+STATUS_DEGRADADO = "degradado"
+
+# Segundos até uma reserva ser considerada abandonada (bem acima do prazo total da IA)
+PRAZO_RESERVA = 300.0
+
+COLUNAS_SITUACAO = ("id", "status", "data", "num_com", "num_mprj", "municipio", "promotoria", "tema", "subtema",
+                    "empresa", "resumo", "vencedor", "responsavel", "origem")
+
+# Ids em classificação neste processo, por qualquer fila (a fila trocada pelo cache ainda termina as suas)
+_em_andamento = set()
+_lock_andamento = threading.Lock()
+
+
+def dono_processo():
+    """Identifica o processo nas reservas (calculado na hora: os filhos do serviço HTTP vêm de fork)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FilaClassificacao:
+    def __init__(self, classificador, trabalhadores=None, so_degradadas=False):
+        """
+        so_degradadas: retoma e reagenda só as linhas com classificação provisória (origem
+        'degradado'), sem disputar as pendentes recém-registradas por outras filas (ex.: o
+        reclassificador do serviço HTTP, ao lado da classificação ao vivo do Streamlit)
+        """
+        self.classificador = classificador
+        self.banco = classificador.banco
+        self.so_degradadas = so_degradadas
+        trabalhadores = trabalhadores or int(os.environ.get("SARO_TRABALHADORES_FILA", TRABALHADORES_FILA))
+        self.pool = ThreadPoolExecutor(max_workers=max(1, trabalhadores), thread_name_prefix="saro-fila")
+        self._agendadas = set()      # ids já na fila do pool (reagendar não os duplica)
+        self._lock = threading.Lock()
+        classificador.resiliencia.ao_recuperar(self.reprocessar_degradados)
+        # O classificador só fecha as conexões depois que as tarefas em andamento terminarem
+        classificador.antes_de_fechar(self.pool.shutdown)
+        self.retomar_pendentes()
+
+    def registrar(self, endereco, denuncia, num_com, num_mprj, vencedor, responsavel):
+        """Grava a ouvidoria como pendente, sem agendar a classificação; retorna o id da linha"""
+        registro = self.classificador.montar_registro(
+            endereco, denuncia, num_com, num_mprj, vencedor, responsavel,
+            {"tema": None, "subtema": None, "empresa": None, "resumo": None, "origem": None}
+        )
+        registro["empresa"] = registro["empresa_id"] = None
+        registro["status"] = STATUS_PENDENTE
+        cursor = self.banco.executar(SQL_INSERIR_OUVIDORIA, tuple(registro[c] for c in COLUNAS_OUVIDORIA))
+        id_ouvidoria = cursor.lastrowid
+        self.classificador.indexar_novas()
+        return id_ouvidoria
+
+    def enfileirar(self, endereco, denuncia, num_com, num_mprj, vencedor, responsavel):
+        """Grava a ouvidoria como pendente e agenda a classificação; retorna o id da linha"""
+        id_ouvidoria = self.registrar(endereco, denuncia, num_com, num_mprj, vencedor, responsavel)
+        self._agendar(id_ouvidoria)
+        return id_ouvidoria
+
+    def classificar_em_fluxo(self, id_ouvidoria):
+        """
+        Classifica uma ouvidoria pendente na thread de quem chama, lendo a resposta da IA em
+        fluxo: gera os campos parciais (tema/subtema, empresa e resumo) à medida que chegam e
+        grava o resultado ao final. Se a leitura for interrompida (página recarregada, sessão
+        encerrada, erro), a linha volta a pendente e a classificação segue pela fila.
+        """
+        inicio = time.perf_counter()
+        denuncia = self._reservar(id_ouvidoria)
+        if denuncia is None:
+            return
+        concluida, suspenso = False, 0.0
+        try:
+            dados_ia = {}
+            for dados_ia in self.classificador.classificar_texto_em_fluxo(denuncia):
+                if "origem" not in dados_ia:
+                    pausa = time.perf_counter()
+                    yield dados_ia
+                    suspenso += time.perf_counter() - pausa
+            self._gravar_classificacao(id_ouvidoria, dados_ia)
+            concluida = True
+            # "total" sem o tempo em que a página renderizava os parciais
+            self.classificador.metricas.registrar_etapa(
+                "total", (time.perf_counter() - inicio - suspenso) * 1000
+            )
+        finally:
+            self._liberar(id_ouvidoria)
+            if not concluida:
+                self.banco.executar(
+                    "UPDATE ouvidorias SET status = ?, reservado_por = NULL, reservado_em = NULL "
+                    "WHERE id = ? AND status = ?",
+                    (STATUS_PENDENTE, id_ouvidoria, STATUS_PROCESSANDO)
+                )
+                self._agendar(id_ouvidoria)
+
+    def reenfileirar(self, ids):
+        """Devolve à fila ouvidorias com erro (ou pendentes), por exemplo após uma falha da API"""
+        ids = list(ids)
+        self.banco.executar_varios(
+            "UPDATE ouvidorias SET status = ? WHERE id = ? AND status IN (?, ?)",
+            [(STATUS_PENDENTE, i, STATUS_ERRO, STATUS_PENDENTE) for i in ids]
+        )
+        for id_ouvidoria in ids:
+            self._agendar(id_ouvidoria)
+
+    def retomar_pendentes(self):
+        """
+        Reagenda o que ficou pendente ou em andamento quando o processo anterior parou
+        (só reservas vencidas ou deste processo), e as classificações provisórias gravadas
+        enquanto a IA estava fora do ar
+        """
+        return self._reagendar((STATUS_PROCESSANDO, STATUS_DEGRADADO))
+
+    def reprocessar_degradados(self):
+        """Chamado quando a IA volta a responder: reclassifica as linhas provisórias"""
+        return self._reagendar((STATUS_DEGRADADO,))
+
+    def _reagendar(self, status_anteriores):
+        with self.banco.transacao() as conn:
+            if STATUS_PROCESSANDO in status_anteriores:
+                self._recuperar_reservas(conn)
+            conn.executemany(
+                "UPDATE ouvidorias SET status = ? WHERE status = ?",
+                [(STATUS_PENDENTE, status) for status in status_anteriores if status != STATUS_PROCESSANDO]
+            )
+            filtro = " AND origem = 'degradado'" if self.so_degradadas else ""
+            ids = [r[0] for r in conn.execute(
+                f"SELECT id FROM ouvidorias WHERE status = ?{filtro} ORDER BY id", (STATUS_PENDENTE,)
+            )]
+        for id_ouvidoria in ids:
+            self._agendar(id_ouvidoria)
+        return len(ids)
+
+    @staticmethod
+    def _recuperar_reservas(conn):
+        """Devolve a pendente as linhas em andamento abandonadas: reserva vencida, ou deste processo mas parada"""
+        with _lock_andamento:
+            locais = set(_em_andamento)
+        ids = [r[0] for r in conn.execute(
+            "SELECT id FROM ouvidorias WHERE status = ? "
+            "AND (reservado_por IS NULL OR reservado_em < ? OR reservado_por = ?)",
+            (STATUS_PROCESSANDO, time.time() - PRAZO_RESERVA, dono_processo())
+        ) if r[0] not in locais]
+        conn.executemany(
+            "UPDATE ouvidorias SET status = ?, reservado_por = NULL, reservado_em = NULL WHERE id = ? AND status = ?",
+            [(STATUS_PENDENTE, i, STATUS_PROCESSANDO) for i in ids]
+        )
+
+    def _reservar(self, id_ouvidoria):
+        """Marca a linha como em andamento por este processo; None se outro trabalhador já a pegou"""
+        with self.banco.transacao() as conn:
+            cursor = conn.execute(
+                "UPDATE ouvidorias SET status = ?, reservado_por = ?, reservado_em = ? WHERE id = ? AND status = ?",
+                (STATUS_PROCESSANDO, dono_processo(), time.time(), id_ouvidoria, STATUS_PENDENTE)
+            )
+            if cursor.rowcount == 0:
+                return None
+            with _lock_andamento:
+                _em_andamento.add(id_ouvidoria)
+            row = conn.execute(f"SELECT {SQL_DENUNCIA} FROM ouvidorias o WHERE o.id = ?", (id_ouvidoria,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _liberar(id_ouvidoria):
+        with _lock_andamento:
+            _em_andamento.discard(id_ouvidoria)
+
+    def _agendar(self, id_ouvidoria):
+        with self._lock:
+            if id_ouvidoria in self._agendadas:
+                return
+            self._agendadas.add(id_ouvidoria)
+        self.pool.submit(self._processar, id_ouvidoria)
+
+    def _processar(self, id_ouvidoria):
+        with self._lock:
+            self._agendadas.discard(id_ouvidoria)
+        try:
+            with self.classificador.metricas.medir("total"):
+                self._classificar_pendente(id_ouvidoria)
+        finally:
+            self._liberar(id_ouvidoria)
+
+    def _classificar_pendente(self, id_ouvidoria):
+        denuncia = self._reservar(id_ouvidoria)
+        if denuncia is None:
+            return
+        try:
+            # Falhas da IA viram classificação provisória (origem 'degradado'), sem exceção
+            dados_ia = self.classificador.classificar_texto(denuncia)
+        except Exception as e:
+            self.classificador.registrar_origem("erro")
+            self.banco.executar(
+                "UPDATE ouvidorias SET status = ?, resumo = ?, origem = 'erro', reservado_por = NULL, "
+                "reservado_em = NULL WHERE id = ?",
+                (STATUS_ERRO, f"Erro na classificação: {e}", id_ouvidoria)
+            )
+            return
+        self._gravar_classificacao(id_ouvidoria, dados_ia)
+
+    def _gravar_classificacao(self, id_ouvidoria, dados_ia):
+        origem = dados_ia.get("origem", "ia")
+        empresa_id, empresa = self.classificador.registro_empresas.resolver(dados_ia.get("empresa"))
+        with self.classificador.metricas.medir("gravacao"):
+            self.banco.executar(
+                "UPDATE ouvidorias SET tema = ?, subtema = ?, empresa = ?, empresa_id = ?, empresa_original = ?, "
+                "resumo = ?, origem = ?, status = ?, versao_catalogo = ?, reservado_por = NULL, reservado_em = NULL "
+                "WHERE id = ?",
+                (dados_ia.get("tema"), dados_ia.get("subtema"), empresa, empresa_id, dados_ia.get("empresa"),
+                 dados_ia.get("resumo"), origem, STATUS_DEGRADADO if origem == "degradado" else STATUS_CONCLUIDO,
+                 self.classificador.versao_catalogo, id_ouvidoria)
+            )
+
+    def situacao(self, ids):
+        """{id: registro resumido com status} das ouvidorias pedidas (para a tela acompanhar a fila)"""
+        ids = list(ids)
+        if not ids:
+            return {}
+        linhas = self.banco.consultar_dicts(
+            f"SELECT {', '.join(COLUNAS_SITUACAO)} FROM ouvidorias WHERE id IN ({', '.join('?' for _ in ids)})",
+            tuple(ids)
+        )
+        return {linha["id"]: linha for linha in linhas}
+
+    def pendentes(self):
+        """Quantas ouvidorias aguardam classificação (na fila ou em andamento)"""
+        row = self.banco.consultar_um(
+            "SELECT COUNT(*) FROM ouvidorias WHERE status IN (?, ?)", (STATUS_PENDENTE, STATUS_PROCESSANDO)
+        )
+        return row[0]
+
+
+def _liberar_fila(fila):
+    """
+    Encerra os trabalhadores da fila substituída sem bloquear o rerun. O que ainda não
+    começou continua pendente no banco e é retomado pela fila nova; o que já está em
+    andamento termina com o classificador antigo, que só fecha depois (ver antes_de_fechar).
+    """
+    fila.pool.shutdown(wait=False, cancel_futures=True)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False, on_release=_liberar_fila)
+def _fila_compartilhada(versao):
+    return FilaClassificacao(obter_classificador())
+
+
+def obter_fila():
+    """Fila única por processo, ligada ao classificador compartilhado (recriada junto com ele)"""
+    return _fila_compartilhada(versao_bases())
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Índice Offline de CEPs e Bairros - MPRJ
+
+Resolve o município de um endereço sem consulta externa, na ordem:
+1. CEP: faixas de CEP dos municípios do RJ (base_ceps_bairros.json), em
+   vetores ordenados consultados por busca binária;
+2. nome do município (autômato do localizador_municipios), incluindo
+   abreviações ("S. Gonçalo", "Sta. Maria Madalena") e apelidos ("Caxias");
+3. bairro: nomes de bairros característicos de cada município, no mesmo
+   tipo de autômato. Bairros repetidos em mais de um município são ignorados,
+   e também os que aparecem como nome de logradouro ("Rua Tanque, 4",
+   "Rua Fonseca, 10"), já que muitos bairros são palavras comuns.
+
+A base só é lida, e os vetores de CEP e os autômatos só são montados, na
+primeira consulta que precisar de cada um.
+
+Uso:
+    python3 indice_enderecos.py "Rua Dr. Nilo Peçanha, 100 - CEP 24445-360"
+"""
+
+import argparse
+import json
+import os
+import re
+from array import array
+from bisect import bisect_right
+
+from localizador_municipios import LocalizadorMunicipios, normalizar_com_posicoes
+
+# CEP com separador (24445-360, 24.445-360) ou 8 dígitos seguidos logo após "CEP"
+REGEX_CEP = re.compile(r"(?<!\d)(\d{2})\.?(\d{3})-(\d{3})(?!\d)|\bCEP\W{0,3}(\d{8})(?!\d)", re.IGNORECASE)
+
+# Abreviações usuais da primeira palavra do nome do município
+ABREVIACOES = {"São": ("S.", "S"), "Santa": ("Sta.", "Sta"), "Santo": ("Sto.", "Sto"), "Nova": ("N.",),
+               "Engenheiro": ("Eng.", "Eng"), "Comendador": ("Com.",)}
+
+
+def variantes_nome(nome):
+    """Formas abreviadas do nome ("São Gonçalo" -> "S. Gonçalo", "S.Gonçalo", "S Gonçalo")"""
+    primeira, _, resto = nome.partition(" ")
+    variantes = []
+    for abreviacao in ABREVIACOES.get(primeira, ()) if resto else ():
+        variantes.append(f"{abreviacao} {resto}")
+        if abreviacao.endswith("."):
+            variantes.append(f"{abreviacao}{resto}")
+    return variantes
+
+
+def extrair_ceps(endereco):
+    """CEPs (inteiros de 8 dígitos) encontrados no endereço, na ordem em que aparecem, com a posição"""
+    ceps = []
+    for m in REGEX_CEP.finditer(endereco or ""):
+        digitos = m.group(4) or "".join(m.group(1, 2, 3))
+        ceps.append((int(digitos), m.start(), m.end()))
+    return ceps
+
+
+class IndiceCep:
+    """Faixas de CEP achatadas em intervalos disjuntos: (início, fim, município) em vetores de inteiros"""
+
+    def __init__(self, faixas):
+        # Faixas aninhadas (ex.: Carapebus dentro de Macaé): vale a mais estreita
+        pontos = sorted({f[0] for f in faixas} | {f[1] + 1 for f in faixas})
+        self.municipios = sorted({f[2] for f in faixas})
+        posicao = {m: i for i, m in enumerate(self.municipios)}
+        self.inicios, self.fins, self.indices = array("l"), array("l"), array("h")
+        for inicio, proximo in zip(pontos, pontos[1:]):
+            cobrindo = [f for f in faixas if f[0] <= inicio and proximo - 1 <= f[1]]
+            if not cobrindo:
+                continue
+            municipio = posicao[min(cobrindo, key=lambda f: f[1] - f[0])[2]]
+            if self.fins and self.fins[-1] == inicio - 1 and self.indices[-1] == municipio:
+                self.fins[-1] = proximo - 1
+            else:
+                self.inicios.append(inicio)
+                self.fins.append(proximo - 1)
+                self.indices.append(municipio)
+
+    def municipio(self, cep):
+        i = bisect_right(self.inicios, cep) - 1
+        if i >= 0 and cep <= self.fins[i]:
+            return self.municipios[self.indices[i]]
+        return None
+
+
+class ResolvedorEnderecos:
+    def __init__(self, municipio_para_promotoria, caminho_base=None):
+        """
+        municipio_para_promotoria: {NOME EM MAIÚSCULAS: {'promotoria', 'municipio_oficial'}}
+        caminho_base: arquivo com faixas de CEP, bairros e apelidos (base_ceps_bairros.json)
+        """
+        self.municipio_para_promotoria = municipio_para_promotoria
+        self.caminho_base = caminho_base or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         "base_ceps_bairros.json")
+        self._dados = None
+        self._indice_cep = None
+        self._localizador = None
+        self._bairros = None
+
+    @property
+    def dados(self):
+        if self._dados is None:
+            if os.path.exists(self.caminho_base):
+                with open(self.caminho_base, 'r', encoding='utf-8') as f:
+                    self._dados = json.load(f)
+            else:
+                self._dados = {}
+        return self._dados
+
+    @property
+    def indice_cep(self):
+        if self._indice_cep is None:
+            self._indice_cep = IndiceCep(self.dados.get("faixas_cep", []))
+        return self._indice_cep
+
+    @property
+    def localizador(self):
+        """Autômato dos nomes oficiais, abreviações e apelidos dos municípios"""
+        if self._localizador is None:
+            nomes = dict(self.municipio_para_promotoria)
+            for info in self.municipio_para_promotoria.values():
+                for variante in variantes_nome(info["municipio_oficial"]):
+                    nomes.setdefault(variante.upper(), info)
+            for apelido, municipio in self.dados.get("apelidos", {}).items():
+                info = self._info(municipio)
+                if info:
+                    nomes.setdefault(apelido.upper(), info)
+            self._localizador = LocalizadorMunicipios(nomes)
+        return self._localizador
+
+    @property
+    def bairros(self):
+        """Autômato dos bairros que identificam um único município (nunca em nome de logradouro)"""
+        if self._bairros is None:
+            donos = {}
+            for municipio, nomes in self.dados.get("bairros", {}).items():
+                for nome in nomes:
+                    donos.setdefault(nome.upper(), set()).add(municipio)
+            self._bairros = LocalizadorMunicipios({
+                nome: self._info(next(iter(municipios)))
+                for nome, municipios in donos.items() if len(municipios) == 1 and self._info(next(iter(municipios)))
+            }, aceitar_logradouro=False)
+        return self._bairros
+
+    def _info(self, municipio):
+        return self.municipio_para_promotoria.get(municipio.upper())
+
+    def localizar(self, endereco):
+        """
+        Mesmo retorno do LocalizadorMunicipios ({'municipio_oficial', 'promotoria', 'inicio', 'fim'}),
+        mais 'fonte' (cep, nome ou bairro); None se nada for reconhecido
+        """
+        for cep, inicio, fim in extrair_ceps(endereco):
+            municipio = self.indice_cep.municipio(cep)
+            info = municipio and self._info(municipio)
+            if info:
+                return dict(info, inicio=inicio, fim=fim, fonte="cep")
+        texto_norm, posicoes = normalizar_com_posicoes(endereco)
+        for localizador, fonte in ((self.localizador, "nome"), (self.bairros, "bairro")):
+            resultado = localizador.localizar_normalizado(texto_norm, posicoes)
+            if resultado:
+                resultado["fonte"] = fonte
+                return resultado
+        return None
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Índice offline de CEPs e bairros - MPRJ")
+    parser.add_argument("enderecos", nargs="+", help="endereços a resolver")
+    args = parser.parse_args()
+
+    with open(os.path.join(base_path, "base_promotorias.json"), 'r', encoding='utf-8') as f:
+        base_promotorias = json.load(f)
+    municipios = {m.upper(): {"promotoria": d["promotoria"], "municipio_oficial": m}
+                  for d in base_promotorias.values() for m in d["municipios"]}
+    resolvedor = ResolvedorEnderecos(municipios)
+    for endereco in args.enderecos:
+        local = resolvedor.localizar(endereco)
+        if local:
+            print(f"📍 {endereco} -> {local['municipio_oficial']} (via {local['fonte']}) | {local['promotoria']}")
+        else:
+            print(f"❓ {endereco} -> Não identificado")
+
+if __name__ == "__main__":
+    main()
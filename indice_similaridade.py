@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de Similaridade entre Ouvidorias - MPRJ
+
+Cada denúncia gravada vira um vetor (embedding local, sem chamar a API: hashing
+de palavras e pares de palavras, normalizado), acrescentado a um arquivo
+float32 lido por memória mapeada (numpy.memmap). Um segundo arquivo guarda, na
+mesma ordem, o id da ouvidoria de cada vetor. A busca é por similaridade do
+cosseno (produto escalar entre vetores normalizados), em blocos, sem carregar
+o arquivo inteiro na memória. Vários processos podem acrescentar vetores (a
+interface, a importação em lote, o serviço HTTP): cada acréscimo é feito sob
+uma trava de arquivo (<caminho_base>.lock, via fcntl; no Windows não há trava
+e só um processo deve gravar o índice).
+
+Usos: "ouvidorias semelhantes" na tela de resultado e reaproveitamento da
+classificação de uma denúncia quase idêntica já classificada (sem chamar a IA).
+
+Uso:
+    python3 indice_similaridade.py --indexar        # acrescenta as ouvidorias ainda não indexadas
+    python3 indice_similaridade.py --reconstruir    # recria os arquivos do zero
+"""
+
+import argparse
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+from banco_dados import SQL_DENUNCIA
+from classificador_local import normalizar, tokenizar
+
+try:
+    import fcntl
+except ImportError:            # Windows: sem trava entre processos
+    fcntl = None
+
+DIMENSAO = 256
+BLOCO_BUSCA = 65536            # vetores por bloco na busca (memória constante)
+LOTE_INDEXACAO = 1000
+
+
+def vetorizar(texto, dimensao=DIMENSAO):
+    """Embedding local: palavras e pares de palavras espalhados por hash (com sinal) em 'dimensao' posições"""
+    tokens = tokenizar(normalizar(texto))
+    termos = Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+    if not termos:
+        return np.zeros(dimensao, dtype=np.float32)
+    hashes = [zlib.crc32(termo.encode("utf-8")) for termo in termos]
+    pesos = [(1.0 if h & 0x80000000 else -1.0) * (1 + math.log(n)) for h, n in zip(hashes, termos.values())]
+    vetor = np.bincount([h % dimensao for h in hashes], weights=pesos, minlength=dimensao).astype(np.float32)
+    norma = np.linalg.norm(vetor)
+    return vetor / norma if norma else vetor
+
+
+class IndiceSimilaridade:
+    def __init__(self, banco, caminho_base, dimensao=DIMENSAO):
+        """caminho_base: prefixo dos arquivos (<caminho_base>.vetores e <caminho_base>.ids)"""
+        self.banco = banco
+        self.dimensao = dimensao
+        self.caminho_vetores = caminho_base + ".vetores"
+        self.caminho_ids = caminho_base + ".ids"
+        self.caminho_trava = caminho_base + ".lock"
+        self._lock = threading.RLock()
+        self._mapa = None            # (vetores, ids) mapeados; refeito só quando o índice cresceu
+        # Somente leitura: outro processo (o gravador do serviço HTTP) acrescenta os vetores
+        self.somente_leitura = False
+        # O total é o menor entre vetores e ids (uma gravação pode ter sido interrompida no meio)
+        self.total = min(self._tamanho(self.caminho_vetores) // (4 * self.dimensao), self._tamanho(self.caminho_ids) // 8)
+        self.ultimo_id = int(self._mapear()[1][-1]) if self.total else 0
+        maior_banco = self.banco.consultar_um("SELECT MAX(id) FROM ouvidorias")[0] or 0
+        if self.ultimo_id > maior_banco:
+            # Arquivos de outro banco (ou banco recriado): os ids não batem mais
+            self.reconstruir()
+
+    @staticmethod
+    def _tamanho(caminho):
+        return os.path.getsize(caminho) if os.path.exists(caminho) else 0
+
+    def _mapear(self):
+        """(vetores, ids) por memória mapeada, cobrindo as 'total' primeiras posições"""
+        with self._lock:
+            if self._mapa is None or len(self._mapa[1]) != self.total:
+                self._mapa = (
+                    np.memmap(self.caminho_vetores, dtype=np.float32, mode="r", shape=(self.total, self.dimensao)),
+                    np.memmap(self.caminho_ids, dtype=np.int64, mode="r", shape=(self.total,))
+                ) if self.total else None
+            return self._mapa
+
+    @contextmanager
+    def _travar(self):
+        """Exclusão entre processos durante o acréscimo (as threads já se excluem por self._lock)"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.caminho_trava, "a") as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def atualizar(self):
+        """Acrescenta ao índice as ouvidorias gravadas depois do último id indexado; retorna quantas"""
+        with self._lock:
+            if self.somente_leitura:
+                return self._acompanhar()
+            with self._travar():
+                # Outro processo pode ter acrescentado vetores desde a última leitura: tamanhos e
+                # último id são relidos já com a trava, antes de alinhar e acrescentar
+                self._acompanhar()
+                self._alinhar()
+                return self._acrescentar()
+
+    def _acrescentar(self):
+        novos = 0
+        while True:
+            linhas = self.banco.consultar(
+                f"SELECT o.id, {SQL_DENUNCIA} FROM ouvidorias o WHERE o.id > ? ORDER BY o.id LIMIT ?",
+                (self.ultimo_id, LOTE_INDEXACAO)
+            )
+            if not linhas:
+                return novos
+            vetores = np.vstack([vetorizar(denuncia or "", self.dimensao) for _, denuncia in linhas])
+            ids = np.array([id_ouvidoria for id_ouvidoria, _ in linhas], dtype=np.int64)
+            with open(self.caminho_vetores, "ab") as f:
+                f.write(vetores.tobytes())
+            with open(self.caminho_ids, "ab") as f:
+                f.write(ids.tobytes())
+            novos += len(linhas)
+            self.total += len(linhas)
+            self.ultimo_id = int(ids[-1])
+
+    def _acompanhar(self):
+        """Passa a enxergar os vetores que outro processo já acrescentou aos arquivos; retorna quantos"""
+        total = min(self._tamanho(self.caminho_vetores) // (4 * self.dimensao), self._tamanho(self.caminho_ids) // 8)
+        if total <= self.total:
+            return 0
+        novos, self.total = total - self.total, total
+        self.ultimo_id = int(self._mapear()[1][-1])
+        return novos
+
+    def _alinhar(self):
+        """Descarta a sobra de uma gravação interrompida, para vetores e ids voltarem a se alinhar"""
+        for caminho, tamanho in ((self.caminho_vetores, self.total * 4 * self.dimensao), (self.caminho_ids, self.total * 8)):
+            if self._tamanho(caminho) > tamanho:
+                with open(caminho, "r+b") as f:
+                    f.truncate(tamanho)
+
+    def reconstruir(self):
+        with self._lock, self._travar():
+            self._mapa = None
+            for caminho in (self.caminho_vetores, self.caminho_ids):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            self.total = self.ultimo_id = 0
+            return self._acrescentar()
+
+    def vetor_de(self, id_ouvidoria):
+        """Vetor já indexado de uma ouvidoria (busca binária: os ids são crescentes), ou None"""
+        mapa = self._mapear()
+        if mapa is None:
+            return None
+        vetores, ids = mapa
+        posicao = int(np.searchsorted(ids, id_ouvidoria))
+        if posicao < len(ids) and ids[posicao] == id_ouvidoria:
+            return np.array(vetores[posicao])
+        return None
+
+    def buscar(self, vetor, k=5, excluir=()):
+        """[(id, similaridade)] dos k vetores mais próximos (cosseno), do mais para o menos similar"""
+        mapa = self._mapear()
+        if mapa is None or not np.any(vetor):
+            return []
+        vetores, ids = mapa
+        excluir = set(excluir)
+        candidatos_ids, candidatos_sims = [], []
+        quantos = k + len(excluir)
+        for inicio in range(0, len(ids), BLOCO_BUSCA):
+            sims = vetores[inicio:inicio + BLOCO_BUSCA] @ vetor
+            if len(sims) > quantos:
+                melhores = np.argpartition(sims, -quantos)[-quantos:]
+            else:
+                melhores = np.arange(len(sims))
+            candidatos_ids.extend(ids[inicio + melhores].tolist())
+            candidatos_sims.extend(sims[melhores].tolist())
+        ordem = sorted(zip(candidatos_sims, candidatos_ids), reverse=True)
+        return [(i, float(s)) for s, i in ordem if i not in excluir][:k]
+
+    def buscar_texto(self, texto, k=5):
+        return self.buscar(vetorizar(texto, self.dimensao), k)
+
+    def semelhantes_a(self, id_ouvidoria, k=5):
+        """Vizinhos de uma ouvidoria já indexada (ela própria fica de fora)"""
+        vetor = self.vetor_de(id_ouvidoria)
+        if vetor is None:
+            return []
+        return self.buscar(vetor, k, excluir=(id_ouvidoria,))
+
+
+def main():
+    from banco_dados import BancoDados
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Índice de similaridade entre ouvidorias - MPRJ")
+    parser.add_argument("--indexar", action="store_true", help="acrescenta as ouvidorias ainda não indexadas")
+    parser.add_argument("--reconstruir", action="store_true", help="recria o índice a partir de todas as ouvidorias")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    indice = IndiceSimilaridade(BancoDados(args.banco), args.banco)
+    if args.reconstruir:
+        print(f"✅ Índice reconstruído: {indice.reconstruir()} ouvidorias.")
+    elif args.indexar:
+        print(f"✅ {indice.atualizar()} ouvidorias acrescentadas ({indice.total} no índice).")
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Localizador de Municípios - MPRJ
+
+Autômato Aho-Corasick construído uma única vez a partir dos nomes de
+municípios, para localizar o município em um endereço em uma só passada.
+Nomes que fazem parte do nome de um logradouro ("Rua Rio de Janeiro") não
+contam como o município do endereço.
+"""
+
+import re
+import unicodedata
+from collections import deque
+
+# Trecho do endereço (já normalizado) que começa em um tipo de logradouro e vai até a posição
+# consultada sem separador nem número: o nome ali é da rua ("RUA RIO DE JANEIRO", "AV. DO BARRETO")
+REGEX_LOGRADOURO = re.compile(
+    r"(?:^|[,;\-(/|\n])\s*(?:RUA|R|AVENIDA|AV|TRAVESSA|TRAV|TV|ESTRADA|ESTR|EST|RODOVIA|ROD|PRACA|PCA|PC|"
+    r"ALAMEDA|AL|LARGO|LGO|BECO|LADEIRA|LAD|VIA|VIELA|CAMINHO|SERVIDAO|PRAIA)\b\.?[^,;\-(/|\n0-9]*$"
+)
+
+
+def normalizar_caractere(c: str) -> str:
+    """Remove acentos e coloca em maiúsculas um único caractere (pode virar mais de um, ex: 'ß')"""
+    return "".join(x for x in unicodedata.normalize('NFD', c) if unicodedata.category(x) != 'Mn').upper()
+
+
+# Caso comum (letras latinas com ou sem acento): um caractere vira exatamente um, via str.translate
+_TABELA_RAPIDA = {
+    ord(c): normalizar_caractere(c) for c in map(chr, range(0x80, 0x180))
+    if len(normalizar_caractere(c)) == 1 and normalizar_caractere(c).isascii()
+}
+
+
+def normalizar_com_posicoes(texto: str):
+    """Normaliza o texto e devolve, para cada caractere normalizado, o índice no texto original"""
+    rapido = (texto or "").translate(_TABELA_RAPIDA).upper()
+    if rapido.isascii() and len(rapido) == len(texto or ""):
+        return rapido, range(len(rapido))
+    partes, posicoes = [], []
+    for i, c in enumerate(texto or ""):
+        n = normalizar_caractere(c)
+        partes.append(n)
+        posicoes.extend([i] * len(n))
+    return "".join(partes), posicoes
+
+
+def em_logradouro(texto_norm: str, inicio: int) -> bool:
+    """Se o trecho que começa em 'inicio' faz parte do nome de um logradouro"""
+    return REGEX_LOGRADOURO.search(texto_norm, 0, inicio) is not None
+
+
+class LocalizadorMunicipios:
+    def __init__(self, municipios: dict, aceitar_logradouro=True):
+        """
+        municipios: {nome do município: informações (promotoria, município oficial...)}
+        As chaves são normalizadas aqui, uma única vez.
+        aceitar_logradouro: se o único nome encontrado faz parte do nome de um logradouro,
+        usá-lo mesmo assim (municípios) ou não reconhecer nada (bairros, que colidem mais
+        com nomes de rua e palavras comuns)
+        """
+        self.aceitar_logradouro = aceitar_logradouro
+        # Estrutura do autômato: transições, links de falha e saídas (índices de padrão) por estado
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._saidas = [[]]
+        self._padroes = []  # (tamanho do padrão normalizado, informações)
+
+        for nome, info in municipios.items():
+            chave, _ = normalizar_com_posicoes(nome.strip())
+            if chave:
+                self._adicionar(chave, info)
+        self._construir_falhas()
+
+    def _adicionar(self, chave: str, info):
+        estado = 0
+        for c in chave:
+            prox = self._transicoes[estado].get(c)
+            if prox is None:
+                prox = len(self._transicoes)
+                self._transicoes[estado][c] = prox
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._saidas.append([])
+            estado = prox
+        # Chaves repetidas (mesmo município em dois núcleos): a última definição prevalece
+        for idx in self._saidas[estado]:
+            if self._padroes[idx][0] == len(chave):
+                self._padroes[idx] = (len(chave), info)
+                return
+        self._saidas[estado].append(len(self._padroes))
+        self._padroes.append((len(chave), info))
+
+    def _construir_falhas(self):
+        fila = deque(self._transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for c, prox in self._transicoes[estado].items():
+                fila.append(prox)
+                f = self._falha[estado]
+                while f and c not in self._transicoes[f]:
+                    f = self._falha[f]
+                destino = self._transicoes[f].get(c, 0)
+                self._falha[prox] = destino if destino != prox else 0
+                self._saidas[prox] = self._saidas[prox] + self._saidas[self._falha[prox]]
+
+    def _ocorrencias(self, texto_norm: str):
+        """Todas as ocorrências (inicio, fim, índice do padrão) que respeitam limites de palavra"""
+        ocorrencias = []
+        estado = 0
+        for i, c in enumerate(texto_norm):
+            while estado and c not in self._transicoes[estado]:
+                estado = self._falha[estado]
+            estado = self._transicoes[estado].get(c, 0)
+            for idx in self._saidas[estado]:
+                inicio, fim = i + 1 - self._padroes[idx][0], i + 1
+                if inicio > 0 and texto_norm[inicio - 1].isalnum():
+                    continue
+                if fim < len(texto_norm) and texto_norm[fim].isalnum():
+                    continue
+                ocorrencias.append((inicio, fim, idx))
+        return ocorrencias
+
+    def localizar(self, endereco: str):
+        """
+        Retorna o município encontrado no endereço, ou None.
+
+        Ocorrências sobrepostas são resolvidas pela mais longa ("Barra do Piraí"
+        vence "Piraí"). As que fazem parte do nome de um logradouro são ignoradas
+        ("Niterói, Rua Rio de Janeiro 10"); entre as restantes vale a última do
+        texto, já que o município costuma vir ao final ("Rua X, 10 - Niterói").
+        O resultado traz 'inicio' e 'fim', a posição do trecho no endereço original.
+        """
+        return self.localizar_normalizado(*normalizar_com_posicoes(endereco))
+
+    def localizar_normalizado(self, texto_norm: str, posicoes):
+        """Como localizar(), com o texto já normalizado (para consultar vários autômatos sem renormalizar)"""
+        ocorrencias = self._ocorrencias(texto_norm)
+        if not ocorrencias:
+            return None
+
+        # Mais longa primeiro; descarta as que se sobrepõem a uma já escolhida
+        ocorrencias.sort(key=lambda o: (o[0] - o[1], o[0]))
+        escolhidas = []
+        for inicio, fim, idx in ocorrencias:
+            if all(fim <= e[0] or inicio >= e[1] for e in escolhidas):
+                escolhidas.append((inicio, fim, idx))
+
+        fora_de_logradouro = [o for o in escolhidas if not em_logradouro(texto_norm, o[0])]
+        if fora_de_logradouro:
+            escolhidas = fora_de_logradouro
+        elif not self.aceitar_logradouro:
+            return None
+        inicio, fim, idx = max(escolhidas, key=lambda o: o[0])
+        resultado = dict(self._padroes[idx][1])
+        resultado["inicio"] = posicoes[inicio]
+        resultado["fim"] = posicoes[fim - 1] + 1
+        return resultado
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas de Desempenho e Consumo - MPRJ
+
+Mede o tempo de cada etapa do processamento (localização do município,
+montagem do prompt, chamada à IA, leitura do JSON e gravação no SQLite) e
+registra o uso de tokens devolvido pela OpenAI em cada requisição.
+
+As medições ficam em memória e são gravadas em lote (uma transação a cada
+poucos segundos), para não acrescentar uma escrita no banco a cada etapa.
+Além das medições brutas (usadas nos percentis da página de métricas), há
+contadores acumulados no formato do Prometheus.
+
+Uso:
+    python3 metricas.py --prometheus     # exposição em texto dos contadores
+    python3 metricas.py --resumo         # p50/p95/p99 por etapa (últimos 7 dias)
+"""
+
+import argparse
+import atexit
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+ETAPAS = ("localizacao", "prompt", "ia", "parse", "gravacao", "total")
+
+# Limites dos baldes do histograma (segundos)
+BALDES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# US$ por milhão de tokens (entrada, saída)
+PRECOS_POR_MILHAO = {"gpt-4o-mini": (0.15, 0.60)}
+
+MAX_PENDENTES = 200          # medições em memória antes de gravar
+INTERVALO_GRAVACAO = 10.0    # segundos entre gravações
+DIAS_RETENCAO = 30           # medições brutas mais antigas são descartadas (os contadores continuam)
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    k = min(len(valores_ordenados) - 1, max(0, round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[k]
+
+
+def custo_dolares(modelo, tokens_entrada, tokens_saida):
+    entrada, saida = PRECOS_POR_MILHAO.get(modelo, (0.0, 0.0))
+    return (tokens_entrada * entrada + tokens_saida * saida) / 1_000_000
+
+
+def _rotulos(**rotulos):
+    return ",".join(f'{k}="{v}"' for k, v in rotulos.items())
+
+
+def _ordem_serie(serie):
+    """Ordena as séries por nome e rótulos, com os baldes do histograma em ordem numérica"""
+    nome, rotulos, _ = serie
+    outros, _, le = rotulos.partition(',le="')
+    return nome, outros, float(le.rstrip('"').replace("+Inf", "inf")) if le else 0.0
+
+
+class Metricas:
+    def __init__(self, banco):
+        self.banco = banco
+        self._etapas = []        # (momento, etapa, duracao_ms)
+        self._usos = []          # (momento, modelo, prompt, completion, total, itens)
+        self._ultima_gravacao = time.monotonic()
+        self._dia_limpeza = None
+        self._lock = threading.Lock()
+        self.inicializar_tabelas()
+        atexit.register(self.descarregar)
+
+    def inicializar_tabelas(self):
+        with self.banco.transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metricas_etapas (
+                    momento TEXT,
+                    etapa TEXT,
+                    duracao_ms REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_metricas_etapas ON metricas_etapas (etapa, momento)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_metricas_etapas_momento ON metricas_etapas (momento)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metricas_uso (
+                    momento TEXT,
+                    modelo TEXT,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    total_tokens INTEGER,
+                    itens INTEGER
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_metricas_uso_momento ON metricas_uso (momento)')
+            # Contadores acumulados (nunca diminuem), lidos pela exposição do Prometheus
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metricas_contadores (
+                    nome TEXT,
+                    rotulos TEXT,
+                    valor REAL DEFAULT 0,
+                    PRIMARY KEY (nome, rotulos)
+                ) WITHOUT ROWID
+            ''')
+
+    # ============ COLETA ============
+
+    @contextmanager
+    def medir(self, etapa):
+        """Bloco cronometrado: with metricas.medir("ia"): ..."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_etapa(etapa, (time.perf_counter() - inicio) * 1000)
+
+    def registrar_etapa(self, etapa, duracao_ms):
+        with self._lock:
+            self._etapas.append((datetime.now().isoformat(timespec="seconds"), etapa, duracao_ms))
+        self._talvez_descarregar()
+
+    def registrar_uso(self, modelo, usage, itens=1):
+        """Campos 'usage' da resposta da OpenAI (itens = denúncias atendidas pela requisição)"""
+        if usage is None:
+            return
+        with self._lock:
+            self._usos.append((
+                datetime.now().isoformat(timespec="seconds"), modelo,
+                getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0,
+                getattr(usage, "total_tokens", 0) or 0, itens
+            ))
+        self._talvez_descarregar()
+
+    def _talvez_descarregar(self):
+        with self._lock:
+            pendentes = len(self._etapas) + len(self._usos)
+            vencido = time.monotonic() - self._ultima_gravacao >= INTERVALO_GRAVACAO
+        if pendentes >= MAX_PENDENTES or (pendentes and vencido):
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava as medições em memória (uma transação) e atualiza os contadores acumulados"""
+        with self._lock:
+            etapas, self._etapas = self._etapas, []
+            usos, self._usos = self._usos, []
+            self._ultima_gravacao = time.monotonic()
+        if not (etapas or usos):
+            return
+
+        incrementos = defaultdict(float)
+        for _, etapa, duracao_ms in etapas:
+            segundos = duracao_ms / 1000
+            incrementos[("saro_etapa_duracao_segundos_count", _rotulos(etapa=etapa))] += 1
+            incrementos[("saro_etapa_duracao_segundos_sum", _rotulos(etapa=etapa))] += segundos
+            for limite in BALDES_SEGUNDOS:
+                # Todos os baldes existem desde a primeira medição (mesmo com zero)
+                incrementos[("saro_etapa_duracao_segundos_bucket", _rotulos(etapa=etapa, le=limite))] += segundos <= limite
+            incrementos[("saro_etapa_duracao_segundos_bucket", _rotulos(etapa=etapa, le="+Inf"))] += 1
+        for _, modelo, prompt, completion, _, itens in usos:
+            incrementos[("saro_ia_requisicoes_total", _rotulos(modelo=modelo))] += 1
+            incrementos[("saro_ia_denuncias_total", _rotulos(modelo=modelo))] += itens
+            incrementos[("saro_ia_tokens_total", _rotulos(modelo=modelo, tipo="prompt"))] += prompt
+            incrementos[("saro_ia_tokens_total", _rotulos(modelo=modelo, tipo="completion"))] += completion
+            incrementos[("saro_ia_custo_dolares_total", _rotulos(modelo=modelo))] += custo_dolares(modelo, prompt, completion)
+
+        hoje = datetime.now().strftime("%Y-%m-%d")
+        try:
+            with self.banco.transacao() as conn:
+                conn.executemany("INSERT INTO metricas_etapas (momento, etapa, duracao_ms) VALUES (?, ?, ?)", etapas)
+                conn.executemany('''
+                    INSERT INTO metricas_uso (momento, modelo, prompt_tokens, completion_tokens, total_tokens, itens)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', usos)
+                conn.executemany('''
+                    INSERT INTO metricas_contadores (nome, rotulos, valor) VALUES (?, ?, ?)
+                    ON CONFLICT (nome, rotulos) DO UPDATE SET valor = valor + excluded.valor
+                ''', [(nome, rotulos, valor) for (nome, rotulos), valor in incrementos.items()])
+                if self._dia_limpeza != hoje:
+                    # Uma vez por dia: descarta medições brutas antigas
+                    limite = (datetime.now() - timedelta(days=DIAS_RETENCAO)).isoformat(timespec="seconds")
+                    conn.execute("DELETE FROM metricas_etapas WHERE momento < ?", (limite,))
+                    conn.execute("DELETE FROM metricas_uso WHERE momento < ?", (limite,))
+                    self._dia_limpeza = hoje
+        except Exception:
+            # Métricas nunca derrubam o processamento (ex.: banco já fechado na saída do processo)
+            pass
+
+    # ============ CONSULTA ============
+
+    def percentis_etapas(self, dias=7):
+        """{etapa: {"n", "p50", "p95", "p99"}} em milissegundos, no período"""
+        self.descarregar()
+        desde = (datetime.now() - timedelta(days=dias)).isoformat(timespec="seconds")
+        resultado = {}
+        for etapa in ETAPAS:
+            duracoes = [r[0] for r in self.banco.consultar(
+                "SELECT duracao_ms FROM metricas_etapas WHERE etapa = ? AND momento >= ? ORDER BY duracao_ms",
+                (etapa, desde)
+            )]
+            if duracoes:
+                resultado[etapa] = {"n": len(duracoes), "p50": percentil(duracoes, 50),
+                                    "p95": percentil(duracoes, 95), "p99": percentil(duracoes, 99)}
+        return resultado
+
+    def uso_por_dia(self, dias=30):
+        """[{dia, requisicoes, denuncias, prompt_tokens, completion_tokens, tokens_por_denuncia, custo}]"""
+        self.descarregar()
+        desde = (datetime.now() - timedelta(days=dias)).isoformat(timespec="seconds")
+        linhas = self.banco.consultar('''
+            SELECT substr(momento, 1, 10), modelo, COUNT(*), SUM(itens), SUM(prompt_tokens), SUM(completion_tokens)
+            FROM metricas_uso WHERE momento >= ? GROUP BY 1, 2 ORDER BY 1
+        ''', (desde,))
+        por_dia = {}
+        for dia, modelo, requisicoes, itens, prompt, completion in linhas:
+            d = por_dia.setdefault(dia, {"dia": dia, "requisicoes": 0, "denuncias": 0, "prompt_tokens": 0,
+                                         "completion_tokens": 0, "custo": 0.0})
+            d["requisicoes"] += requisicoes
+            d["denuncias"] += itens
+            d["prompt_tokens"] += prompt
+            d["completion_tokens"] += completion
+            d["custo"] += custo_dolares(modelo, prompt, completion)
+        for d in por_dia.values():
+            d["tokens_por_denuncia"] = (d["prompt_tokens"] + d["completion_tokens"]) / max(1, d["denuncias"])
+        return list(por_dia.values())
+
+    def exposicao_prometheus(self):
+        """Contadores acumulados no formato de texto do Prometheus (text/plain; version=0.0.4)"""
+        self.descarregar()
+        tipos = {
+            "saro_etapa_duracao_segundos": ("histogram", "Duração de cada etapa do processamento"),
+            "saro_ia_requisicoes_total": ("counter", "Requisições à IA"),
+            "saro_ia_denuncias_total": ("counter", "Denúncias classificadas pelas requisições à IA"),
+            "saro_ia_tokens_total": ("counter", "Tokens consumidos na IA"),
+            "saro_ia_custo_dolares_total": ("counter", "Custo estimado da IA em dólares"),
+            "saro_classificacoes_total": ("counter", "Classificações por origem (cache, similar, local, ia, degradado)"),
+            "saro_fila_pendentes": ("gauge", "Ouvidorias aguardando classificação"),
+        }
+        series = defaultdict(list)
+        for nome, rotulos, valor in self.banco.consultar(
+            "SELECT nome, rotulos, valor FROM metricas_contadores ORDER BY nome, rotulos"
+        ):
+            base = nome.rsplit("_", 1)[0] if nome.startswith("saro_etapa_duracao_segundos_") else nome
+            series[base].append((nome, rotulos, valor))
+        for origem, total in self.banco.consultar(
+            "SELECT origem, SUM(total) FROM contadores_roteamento GROUP BY origem"
+        ):
+            series["saro_classificacoes_total"].append(("saro_classificacoes_total", _rotulos(origem=origem), total))
+        pendentes = self.banco.consultar_um(
+            "SELECT COUNT(*) FROM ouvidorias WHERE status IN ('pendente', 'processando')"
+        )[0]
+        series["saro_fila_pendentes"].append(("saro_fila_pendentes", "", pendentes))
+
+        linhas = []
+        for base, (tipo, ajuda) in tipos.items():
+            if not series.get(base):
+                continue
+            linhas.append(f"# HELP {base} {ajuda}")
+            linhas.append(f"# TYPE {base} {tipo}")
+            for nome, rotulos, valor in sorted(series[base], key=_ordem_serie):
+                linhas.append(f"{nome}{{{rotulos}}} {valor:g}" if rotulos else f"{nome} {valor:g}")
+        return "\n".join(linhas) + "\n"
+
+
+def main():
+    from banco_dados import BancoDados
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Métricas de desempenho e consumo - MPRJ")
+    parser.add_argument("--prometheus", action="store_true", help="imprime os contadores no formato do Prometheus")
+    parser.add_argument("--resumo", action="store_true", help="p50/p95/p99 por etapa e consumo por dia")
+    parser.add_argument("--dias", type=int, default=7)
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    metricas = Metricas(BancoDados(args.banco))
+    if args.prometheus:
+        print(metricas.exposicao_prometheus(), end="")
+    if args.resumo:
+        print(f"⏱️ Latência por etapa (últimos {args.dias} dias, ms):")
+        for etapa, p in metricas.percentis_etapas(args.dias).items():
+            print(f"   {etapa:<12} n={p['n']:<7} p50={p['p50']:>9.1f} p95={p['p95']:>9.1f} p99={p['p99']:>9.1f}")
+        print("🪙 Consumo por dia:")
+        for d in metricas.uso_por_dia(args.dias):
+            print(f"   {d['dia']}  {d['denuncias']:>6} denúncias  {d['tokens_por_denuncia']:>7.0f} tokens/denúncia"
+                  f"  US$ {d['custo']:.4f}")
+    if not (args.prometheus or args.resumo):
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificador_denuncias import obter_classificador
+from agregados import consultar_agregados
+
+st.set_page_config(page_title="SARO - Painel Gerencial", layout="wide", page_icon="📊")
+
+st.markdown("""
+<style>
+    .titulo-sessao {
+        color: #960018;
+        font-weight: bold;
+        font-size: 1.2rem;
+        margin: 20px 0 15px 0;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+try:
+    banco = obter_classificador().banco
+except Exception as e:
+    st.error(f"Erro ao carregar classificador: {e}")
+    st.stop()
+
+st.title("📊 Painel Gerencial de Ouvidorias")
+st.caption("Números calculados a partir das tabelas de agregados (atualizadas a cada registro).")
+st.divider()
+
+
+def tabela(dimensao, limite=None, por="total", rotulo="Chave"):
+    # Chaves vazias = ouvidorias ainda na fila de classificação (ou sem data)
+    linhas = consultar_agregados(banco, dimensao, limite=limite and limite + 1, por=por)
+    linhas = [l for l in linhas if l[0] not in ("", " / ")][:limite]
+    df = pd.DataFrame(linhas, columns=[rotulo, "Ouvidorias", "Consumidor vencedor"])
+    df["% vencedor"] = (100 * df["Consumidor vencedor"] / df["Ouvidorias"]).round(1) if len(df) else []
+    return df
+
+
+# ============ 1. INDICADORES GERAIS ============
+geral = consultar_agregados(banco, "geral")
+total, vencedores = (geral[0][1], geral[0][2]) if geral else (0, 0)
+c1, c2, c3 = st.columns(3)
+c1.metric("Total de ouvidorias", f"{total:,}".replace(",", "."))
+c2.metric("Consumidor vencedor", f"{vencedores:,}".replace(",", "."))
+c3.metric("Taxa de consumidor vencedor", f"{100 * vencedores / total:.1f}%" if total else "—")
+
+if not total:
+    st.info("Nenhuma ouvidoria registrada no banco de dados ainda.")
+    st.stop()
+
+# ============ 2. EVOLUÇÃO MENSAL ============
+st.markdown('<p class="titulo-sessao">📅 Ouvidorias por mês</p>', unsafe_allow_html=True)
+meses = tabela("mes", por="chave", rotulo="Mês")
+st.bar_chart(meses.set_index("Mês")["Ouvidorias"])
+
+# ============ 3. RANKINGS ============
+top_n = st.slider("Quantidade de itens nos rankings", 5, 50, 10)
+
+col_a, col_b = st.columns(2)
+with col_a:
+    st.markdown('<p class="titulo-sessao">🏢 Empresas mais reclamadas</p>', unsafe_allow_html=True)
+    empresas = tabela("empresa", limite=top_n, rotulo="Empresa")
+    st.bar_chart(empresas.set_index("Empresa")["Ouvidorias"], horizontal=True)
+    st.dataframe(empresas, hide_index=True, use_container_width=True)
+with col_b:
+    st.markdown('<p class="titulo-sessao">🏛️ Ouvidorias por promotoria</p>', unsafe_allow_html=True)
+    st.dataframe(tabela("promotoria", limite=top_n, rotulo="Promotoria"), hide_index=True, use_container_width=True)
+
+col_c, col_d = st.columns(2)
+with col_c:
+    st.markdown('<p class="titulo-sessao">📂 Temas</p>', unsafe_allow_html=True)
+    temas = tabela("tema", rotulo="Tema")
+    st.bar_chart(temas.set_index("Tema")["Ouvidorias"])
+with col_d:
+    st.markdown('<p class="titulo-sessao">🗂️ Subtemas</p>', unsafe_allow_html=True)
+    st.dataframe(tabela("subtema", limite=top_n, rotulo="Tema / Subtema"), hide_index=True, use_container_width=True)
+
+st.divider()
+st.caption("SARO - Painel Gerencial | Para recalcular após cargas em massa: python3 agregados.py --reconstruir")
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificador_denuncias import obter_classificador
+
+st.set_page_config(page_title="SARO - Métricas", layout="wide", page_icon="⏱️")
+
+st.markdown("""
+<style>
+    .titulo-sessao {
+        color: #960018;
+        font-weight: bold;
+        font-size: 1.2rem;
+        margin: 20px 0 15px 0;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+try:
+    metricas = obter_classificador().metricas
+except Exception as e:
+    st.error(f"Erro ao carregar classificador: {e}")
+    st.stop()
+
+NOMES_ETAPAS = {"localizacao": "Localização do município", "prompt": "Montagem do prompt", "ia": "Chamada à IA",
+                "parse": "Leitura do JSON", "gravacao": "Gravação no SQLite", "total": "Total por ouvidoria"}
+
+st.title("⏱️ Métricas de Desempenho e Consumo (Administração)")
+dias = st.selectbox("Período", [1, 7, 30], index=1, format_func=lambda d: f"Últimos {d} dias")
+st.divider()
+
+# ============ 1. LATÊNCIA POR ETAPA ============
+st.markdown('<p class="titulo-sessao">🚦 Latência por etapa (ms)</p>', unsafe_allow_html=True)
+percentis = metricas.percentis_etapas(dias)
+if not percentis:
+    st.info("Nenhuma medição registrada no período.")
+else:
+    df = pd.DataFrame([
+        {"Etapa": NOMES_ETAPAS.get(etapa, etapa), "Medições": p["n"],
+         "p50": round(p["p50"], 2), "p95": round(p["p95"], 2), "p99": round(p["p99"], 2)}
+        for etapa, p in percentis.items()
+    ])
+    st.dataframe(df, hide_index=True, use_container_width=True)
+
+# ============ 2. TOKENS E CUSTO ============
+st.markdown('<p class="titulo-sessao">🪙 Tokens e custo por dia</p>', unsafe_allow_html=True)
+uso = metricas.uso_por_dia(dias)
+if not uso:
+    st.info("Nenhuma chamada à IA registrada no período.")
+else:
+    df_uso = pd.DataFrame(uso)
+    c1, c2, c3 = st.columns(3)
+    tokens = df_uso["prompt_tokens"].sum() + df_uso["completion_tokens"].sum()
+    c1.metric("Requisições à IA", int(df_uso["requisicoes"].sum()))
+    c2.metric("Tokens por denúncia", f"{tokens / max(1, df_uso['denuncias'].sum()):.0f}")
+    c3.metric("Custo no período", f"US$ {df_uso['custo'].sum():.4f}")
+    col_a, col_b = st.columns(2)
+    col_a.caption("Custo por dia (US$)")
+    col_a.bar_chart(df_uso.set_index("dia")["custo"])
+    col_b.caption("Tokens por denúncia")
+    col_b.line_chart(df_uso.set_index("dia")["tokens_por_denuncia"])
+    st.dataframe(df_uso.rename(columns={
+        "dia": "Dia", "requisicoes": "Requisições", "denuncias": "Denúncias", "prompt_tokens": "Tokens de entrada",
+        "completion_tokens": "Tokens de saída", "custo": "Custo (US$)", "tokens_por_denuncia": "Tokens/denúncia"
+    }), hide_index=True, use_container_width=True)
+
+# ============ 3. EXPOSIÇÃO PROMETHEUS ============
+st.markdown('<p class="titulo-sessao">📡 Contadores (formato Prometheus)</p>', unsafe_allow_html=True)
+texto = metricas.exposicao_prometheus()
+st.download_button("⬇️ Baixar métricas (.prom)", texto, file_name="saro_metricas.prom", mime="text/plain")
+with st.expander("Ver texto"):
+    st.code(texto, language="text")
+
+st.divider()
+st.caption("SARO - Métricas | Também disponível via: python3 metricas.py --prometheus")
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+import glob
+import sys
+import tempfile
+import time
+from datetime import date
+
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from classificador_denuncias import obter_classificador
+from agregados import consultar_agregados
+from exportar_ouvidorias import FORMATOS, TIPOS_MIME, exportar
+
+st.set_page_config(page_title="SARO - Exportar", layout="wide", page_icon="📤")
+
+st.markdown("""
+<style>
+    .titulo-sessao {
+        color: #960018;
+        font-weight: bold;
+        font-size: 1.2rem;
+        margin: 20px 0 15px 0;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+try:
+    banco = obter_classificador().banco
+except Exception as e:
+    st.error(f"Erro ao carregar classificador: {e}")
+    st.stop()
+
+TODAS = "(todas)"
+PREFIXO_ARQUIVO = "saro_exportacao_"
+PRAZO_ARQUIVO = 3600          # segundos até um arquivo não baixado (sessão abandonada) ser apagado
+
+st.title("📤 Exportar Ouvidorias")
+st.caption("Planilha (CSV), JSONL ou Parquet das ouvidorias filtradas, gerada em blocos direto do banco.")
+st.divider()
+
+
+def opcoes(dimensao):
+    # Valores existentes vêm dos agregados (sem varrer a tabela de ouvidorias)
+    return [TODAS] + [chave for chave, _, _ in consultar_agregados(banco, dimensao, por="chave") if chave]
+
+
+# ============ 1. FILTROS ============
+st.markdown('<p class="titulo-sessao">🔎 Filtros</p>', unsafe_allow_html=True)
+c1, c2, c3 = st.columns(3)
+promotoria = c1.selectbox("Promotoria", opcoes("promotoria"))
+municipio = c2.selectbox("Município", opcoes("municipio"))
+tema = c3.selectbox("Tema", opcoes("tema"))
+# Empresas do registro canônico: o filtro usa o id (índice de empresa_id)
+empresas = dict(banco.consultar("SELECT id, nome FROM empresas ORDER BY nome"))
+c4, c5, c6, c7 = st.columns(4)
+empresa_id = c4.selectbox("Empresa", [None] + list(empresas), format_func=lambda i: empresas.get(i, TODAS))
+periodo = c5.date_input("Período", value=(), max_value=date.today(), format="DD/MM/YYYY")
+formato = c6.selectbox("Formato", FORMATOS, format_func=lambda f: {"csv": "CSV (Excel)", "jsonl": "JSONL",
+                                                                   "parquet": "Parquet"}[f])
+
+filtros = {
+    "promotoria": None if promotoria == TODAS else promotoria,
+    "municipio": None if municipio == TODAS else municipio,
+    "tema": None if tema == TODAS else tema,
+    "empresa_id": empresa_id,
+    "inicio": periodo[0].isoformat() if len(periodo) > 0 else None,
+    "fim": periodo[-1].isoformat() if len(periodo) > 0 else None,
+}
+
+# ============ 2. GERAÇÃO ============
+def ler_arquivo(caminho):
+    # Chamada só quando o usuário clica em baixar: o arquivo não fica na memória da sessão
+    # e é apagado do disco assim que é lido
+    def ler():
+        try:
+            with open(caminho, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(caminho)
+    return ler
+
+
+def apagar_antigos():
+    """Arquivos gerados e nunca baixados (sessões abandonadas), mais velhos que PRAZO_ARQUIVO"""
+    limite = time.time() - PRAZO_ARQUIVO
+    for caminho in glob.glob(os.path.join(tempfile.gettempdir(), PREFIXO_ARQUIVO + "*")):
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+
+if c7.button("📦 GERAR ARQUIVO", use_container_width=True):
+    # O arquivo é montado em disco bloco a bloco; a sessão guarda só o caminho
+    anterior = st.session_state.get("exportacao")
+    st.session_state.exportacao = None
+    if anterior and os.path.exists(anterior[0]):
+        os.remove(anterior[0])
+    apagar_antigos()
+    with tempfile.NamedTemporaryFile(prefix=PREFIXO_ARQUIVO, suffix=f".{formato}", delete=False) as arquivo:
+        caminho = arquivo.name
+    try:
+        with st.spinner("Exportando..."):
+            total = exportar(banco, caminho, formato, **filtros)
+        st.session_state.exportacao = (caminho, formato, total)
+    except (ValueError, RuntimeError) as e:
+        st.error(f"Erro na exportação: {e}")
+        os.remove(caminho)
+
+if st.session_state.get("exportacao") and os.path.exists(st.session_state.exportacao[0]):
+    caminho, formato_gerado, total = st.session_state.exportacao
+    st.success(f"✅ {total} ouvidorias exportadas.")
+    st.download_button(
+        f"⬇️ Baixar ouvidorias.{formato_gerado}", ler_arquivo(caminho),
+        file_name=f"ouvidorias_{date.today():%Y%m%d}.{formato_gerado}", mime=TIPOS_MIME[formato_gerado]
+    )
+
+st.divider()
+st.caption("SARO - Exportação | Também disponível via: python3 exportar_ouvidorias.py saida.csv --promotoria ...")
@@ -2,49 +2,302 @@
 # -*- coding: utf-8 -*-
 """
 Interface Simplificada para Processamento de Denúncias - MPRJ
+
+Uso interativo (uma denúncia):
+    python3 processar_denuncia.py
+
+Importação em lote (CSV ou JSONL com as colunas endereco, denuncia e,
+opcionalmente, num_com, num_mprj, vencedor, responsavel, data):
+    python3 processar_denuncia.py --lote ouvidorias.csv --concorrencia 8
+    python3 processar_denuncia.py --lote ouvidorias.csv --taxa 5     # no máximo 5 requisições/s
+
+Com --empacotar, várias denúncias vão em cada requisição à IA (o catálogo é
+enviado uma vez por pacote), reduzindo tempo e tokens por denúncia.
+
+Se a importação for interrompida, basta repetir o comando: as linhas já
+gravadas no banco são puladas.
 """
 
-from classificador_denuncias import ClassificadorDenuncias
+import argparse
+import csv
+import hashlib
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-def main():
+from classificador_denuncias import ClassificadorDenuncias
+from metricas import percentil
+from resiliencia_ia import CircuitoAberto
+
+ESPERA_CIRCUITO = 1.0          # segundos entre verificações enquanto o disjuntor está aberto
+
+
+def formatar_resultado(res):
+    linhas = ["=" * 80, "RESULTADO DA CLASSIFICAÇÃO", "=" * 80]
+    for rotulo, chave in [("Município", "municipio"), ("Promotoria", "promotoria"), ("Tema", "tema"),
+                          ("Subtema", "subtema"), ("Empresa", "empresa"), ("Resumo", "resumo")]:
+        linhas.append(f"{rotulo + ':':<12} {res.get(chave)}")
+    linhas.append("=" * 80)
+    return "\n".join(linhas)
+
+
+def modo_interativo():
     print("=" * 80)
     print("SISTEMA DE PROCESSAMENTO DE DENÚNCIAS - MPRJ")
     print("Ministério Público do Rio de Janeiro")
     print("=" * 80)
     print()
-    
+
     # Inicializar classificador
     classificador = ClassificadorDenuncias()
-    
+
     # Coletar dados
     print("📍 ENDEREÇO DA DENÚNCIA:")
     endereco = input("   Digite o endereço completo: ").strip()
     print()
-    
+
     print("📝 DESCRIÇÃO DA DENÚNCIA:")
     denuncia = input("   Digite a denúncia: ").strip()
     print()
-    
+
     if not endereco or not denuncia:
         print("❌ Erro: Endereço e denúncia são obrigatórios!")
         return
-    
+
+    num_com = input("   Nº de Comunicação (opcional): ").strip()
+    num_mprj = input("   Nº MPRJ (opcional): ").strip()
+    print()
+
     print("⏳ Processando denúncia...")
     print()
-    
+
     # Processar denúncia
-    resultado = classificador.processar_denuncia(endereco, denuncia)
-    
+    resultado, sucesso = classificador.processar_denuncia(endereco, denuncia, num_com, num_mprj, "", "")
+
     # Exibir resultado formatado
-    print(classificador.formatar_resultado(resultado))
-    
+    print(formatar_resultado(resultado))
+    if not sucesso:
+        print("⚠️ Não foi possível gravar no banco de dados.")
+
     # Salvar resultado
-    with open('/home/ubuntu/mprj_denuncias/ultimo_resultado.json', 'w', encoding='utf-8') as f:
+    caminho = os.path.join(classificador.base_path, "ultimo_resultado.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
         json.dump(resultado, f, ensure_ascii=False, indent=2)
-    
-    print("💾 Resultado salvo em: /home/ubuntu/mprj_denuncias/ultimo_resultado.json")
+
+    print(f"💾 Resultado salvo em: {caminho}")
     print()
 
+
+# ============ IMPORTAÇÃO EM LOTE ============
+
+def ler_entrada(caminho):
+    """Lê o arquivo linha a linha (sem carregar tudo em memória), gerando (nº da linha, registro)"""
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as f:
+        if caminho.lower().endswith((".jsonl", ".ndjson")):
+            for n, linha in enumerate(f, 1):
+                if linha.strip():
+                    yield n, json.loads(linha)
+        else:
+            for n, registro in enumerate(csv.DictReader(f), 1):
+                yield n, registro
+
+
+def identificar_lote(caminho):
+    """Identificador do lote = hash do conteúdo do arquivo (o mesmo arquivo retoma de onde parou)"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()[:16]
+
+
+class ControleTaxa:
+    """
+    Ritmo da importação, compartilhado entre as threads: no máximo 'taxa' chamadas por
+    segundo (None = sem limite) e espera enquanto o disjuntor estiver aberto, em vez de
+    gravar o lote inteiro como falha. Não repete por conta própria: as novas tentativas
+    em 429/5xx são as de resiliencia_ia (um único orçamento). Um erro temporário que
+    chegue aqui já as esgotou, e a linha fica para a próxima execução.
+    """
+
+    def __init__(self, resiliencia, taxa=None):
+        self.resiliencia = resiliencia
+        self.intervalo = 1.0 / taxa if taxa else 0.0
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+
+    def _aguardar_vez(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            vez = max(agora, self._proxima)
+            self._proxima = vez + self.intervalo
+        time.sleep(vez - agora)
+
+    def executar(self, funcao, *args):
+        while True:
+            while not self.resiliencia.disponivel():
+                time.sleep(ESPERA_CIRCUITO)
+            self._aguardar_vez()
+            try:
+                return funcao(*args)
+            except CircuitoAberto:
+                # A requisição nem foi feita: espera o circuito e reenvia
+                time.sleep(ESPERA_CIRCUITO)
+
+
+def classificar_linha(classificador, controle, linha, item):
+    inicio = time.perf_counter()
+    dados_ia = controle.executar(classificador.classificar_texto, item["denuncia"], True)
+    registro = classificador.montar_registro(
+        item.get("endereco", ""), item["denuncia"], item.get("num_com", ""), item.get("num_mprj", ""),
+        item.get("vencedor", ""), item.get("responsavel", ""), dados_ia, data=item.get("data") or None
+    )
+    return linha, registro, time.perf_counter() - inicio
+
+
+def processar_lote(caminho, concorrencia=8, tamanho_transacao=100, id_lote=None, empacotar=False, taxa=None):
+    classificador = ClassificadorDenuncias()
+    controle = ControleTaxa(classificador.resiliencia, taxa)
+    if empacotar:
+        return processar_lote_empacotado(classificador, controle, caminho, concorrencia, tamanho_transacao, id_lote)
+    id_lote = id_lote or identificar_lote(caminho)
+    ja_processadas = classificador.linhas_ja_processadas(id_lote)
+
+    print(f"📦 Lote {id_lote}: {len(ja_processadas)} linhas já gravadas serão puladas.")
+    latencias, falhas = [], 0
+    buffer, linhas_buffer = [], []
+    gravadas = 0
+
+    def descarregar():
+        nonlocal gravadas
+        if buffer:
+            classificador.salvar_lote_no_banco(buffer, lote=id_lote, linhas=linhas_buffer)
+            gravadas += len(buffer)
+            buffer.clear()
+            linhas_buffer.clear()
+            print(f"   ✔ {gravadas} linhas gravadas")
+
+    def coletar(concluidas):
+        nonlocal falhas
+        for fut in concluidas:
+            try:
+                linha, registro, latencia = fut.result()
+            except Exception as e:
+                falhas += 1
+                print(f"   ❌ Falha em uma linha (será refeita na próxima execução): {e}")
+                continue
+            buffer.append(registro)
+            linhas_buffer.append(linha)
+            latencias.append(latencia)
+        if len(buffer) >= tamanho_transacao:
+            descarregar()
+
+    inicio = time.perf_counter()
+    pendentes = set()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        for linha, item in ler_entrada(caminho):
+            if linha in ja_processadas:
+                continue
+            if not item.get("denuncia"):
+                print(f"   ⚠️ Linha {linha} sem denúncia, ignorada.")
+                continue
+            # Limita o número de requisições em andamento (e de linhas em memória)
+            if len(pendentes) >= concorrencia:
+                concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                coletar(concluidas)
+            pendentes.add(pool.submit(classificar_linha, classificador, controle, linha, item))
+        coletar(wait(pendentes).done)
+    descarregar()
+    duracao = time.perf_counter() - inicio
+
+    imprimir_relatorio(gravadas, falhas, duracao, latencias)
+
+
+def processar_lote_empacotado(classificador, controle, caminho, concorrencia, tamanho_transacao, id_lote):
+    """
+    Lê blocos de 'tamanho_transacao' linhas e classifica cada bloco com classificar_lote
+    (aqui o controle de taxa compassa os blocos, não cada pacote enviado à IA)
+    """
+    id_lote = id_lote or identificar_lote(caminho)
+    ja_processadas = classificador.linhas_ja_processadas(id_lote)
+
+    print(f"📦 Lote {id_lote} (empacotado): {len(ja_processadas)} linhas já gravadas serão puladas.")
+    latencias, falhas, gravadas = [], 0, 0
+
+    def processar_bloco(bloco):
+        nonlocal falhas, gravadas
+        inicio_bloco = time.perf_counter()
+        try:
+            # Se o disjuntor abrir no meio, os pacotes já classificados vêm do cache no reenvio
+            dados = controle.executar(
+                lambda: classificador.classificar_lote(
+                    {linha: item["denuncia"] for linha, item in bloco},
+                    concorrencia=concorrencia, levantar_erros=True
+                )
+            )
+        except Exception as e:
+            falhas += len(bloco)
+            print(f"   ❌ Falha em um bloco de {len(bloco)} linhas (será refeito na próxima execução): {e}")
+            return
+        registros = [
+            classificador.montar_registro(
+                item.get("endereco", ""), item["denuncia"], item.get("num_com", ""), item.get("num_mprj", ""),
+                item.get("vencedor", ""), item.get("responsavel", ""), dados[linha], data=item.get("data") or None
+            )
+            for linha, item in bloco
+        ]
+        classificador.salvar_lote_no_banco(registros, lote=id_lote, linhas=[linha for linha, _ in bloco])
+        gravadas += len(registros)
+        # Latência por denúncia = tempo do bloco dividido entre os itens
+        latencias.extend([(time.perf_counter() - inicio_bloco) / len(bloco)] * len(bloco))
+        print(f"   ✔ {gravadas} linhas gravadas")
+
+    inicio = time.perf_counter()
+    bloco = []
+    for linha, item in ler_entrada(caminho):
+        if linha in ja_processadas:
+            continue
+        if not item.get("denuncia"):
+            print(f"   ⚠️ Linha {linha} sem denúncia, ignorada.")
+            continue
+        bloco.append((linha, item))
+        if len(bloco) >= tamanho_transacao:
+            processar_bloco(bloco)
+            bloco = []
+    if bloco:
+        processar_bloco(bloco)
+    imprimir_relatorio(gravadas, falhas, time.perf_counter() - inicio, latencias)
+
+
+def imprimir_relatorio(gravadas, falhas, duracao, latencias):
+    latencias = sorted(latencias)
+    print()
+    print("=" * 80)
+    print(f"Linhas gravadas: {gravadas} | Falhas: {falhas} | Tempo: {duracao:.1f}s")
+    print(f"Vazão: {gravadas / duracao if duracao else 0:.2f} linhas/s")
+    print(f"Latência p50: {percentil(latencias, 50):.2f}s | p95: {percentil(latencias, 95):.2f}s")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processamento de denúncias - MPRJ")
+    parser.add_argument("--lote", help="arquivo CSV ou JSONL para importação em lote")
+    parser.add_argument("--concorrencia", type=int, default=8, help="requisições simultâneas à IA (padrão: 8)")
+    parser.add_argument("--tamanho-transacao", type=int, default=100, help="linhas gravadas por transação (padrão: 100)")
+    parser.add_argument("--empacotar", action="store_true", help="várias denúncias por requisição à IA (classificar_lote)")
+    parser.add_argument("--id-lote", help="identificador do lote para retomada (padrão: hash do arquivo)")
+    parser.add_argument("--taxa", type=float,
+                        help="máximo de requisições à IA por segundo (com --empacotar, blocos por segundo); padrão: sem limite")
+    args = parser.parse_args()
+
+    if args.lote:
+        processar_lote(args.lote, args.concorrencia, args.tamanho_transacao, args.id_lote, args.empacotar, args.taxa)
+    else:
+        modo_interativo()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+Registro Canônico de Empresas - MPRJ
+
+O nome de empresa devolvido pela IA varia ("Claro", "Claro S.A.", "Claro Net",
+"N/D", "Não identificada"...) e fragmentava as contagens por empresa. Cada
+nome agora é resolvido, na gravação, para uma empresa do registro:
+1. apelido exato, após normalização (sem acentos, pontuação e sufixos
+   societários como S.A., Ltda., ME);
+2. apelido parecido, pelo índice de trigramas, só em dois casos:
+   - a marca seguida de complemento ("Claro" x "Claro Net"), desde que a
+     parte comum não seja curta nem só palavras genéricas ("Banco", "Casa");
+   - variação de grafia (semelhança de Dice >= LIMIAR_SEMELHANCA, mesmo
+     número de palavras, com as mesmas iniciais e tamanho parecido);
+   e só se apontar para uma única empresa. O novo apelido fica pendente de
+   revisão (--revisar), até ser confirmado (--confirmar) ou separado;
+3. senão, uma nova empresa.
+Os demais pares parecidos só aparecem como sugestão (--sugerir), e a união é
+confirmada por uma pessoa (--unir). Uma união errada se desfaz com
+--separar, pelo nome recebido de cada ouvidoria.
+A tabela ouvidorias guarda o id (empresa_id, indexado), o nome canônico e o
+nome como veio (empresa_original). Nomes que indicam empresa não
+identificada ficam com empresa_id NULL e "N/D".
+
+Uso:
+    python3 registro_empresas.py --listar                      # empresas, ouvidorias e apelidos
+    python3 registro_empresas.py --sugerir                     # pares parecidos, candidatos à união
+    python3 registro_empresas.py --revisar                     # apelidos unidos por semelhança, a confirmar
+    python3 registro_empresas.py --confirmar "Claro Net"
+    python3 registro_empresas.py --unir "Claro Net" "Claro"    # funde a 1ª na 2ª (retroativo)
+    python3 registro_empresas.py --separar "Claro Net"         # o apelido volta a ser empresa própria
+    python3 registro_empresas.py --separar "Net" --destino "Net Serviços"
+    python3 registro_empresas.py --renomear "Claro" "Claro Brasil"
+    python3 registro_empresas.py --vincular                    # resolve linhas ainda sem empresa_id
+"""
+
+import argparse
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime
+
+LIMIAR_SEMELHANCA = 0.75          # Dice entre trigramas para aceitar uma variação de grafia
+LIMIAR_SUGESTAO = 0.5             # pares exibidos por --sugerir
+RAZAO_MINIMA_TAMANHO = 0.8        # variação de grafia: o nome menor tem ao menos 80% do maior
+TAMANHO_MINIMO_APROXIMADO = 4     # nomes (ou partes comuns) mais curtos ("Oi", "Tim") só por apelido exato
+NOME_NAO_IDENTIFICADA = "N/D"
+
+NAO_IDENTIFICADAS = {
+    "", "nd", "n d", "na", "n a", "none", "null", "nenhuma", "nenhum", "desconhecida", "sem empresa",
+    "nao identificada", "nao identificado", "nao informada", "nao informado", "nao se aplica",
+}
+# Palavras que sozinhas não identificam uma empresa ("Banco" x "Banco Itaú")
+TERMOS_GENERICOS = {
+    "banco", "casa", "casas", "grupo", "rede", "super", "supermercado", "supermercados", "mercado", "loja", "lojas",
+    "farmacia", "drogaria", "hospital", "clinica", "posto", "auto", "viacao", "transportes", "companhia", "cia",
+    "empresa", "servicos", "comercio", "centro", "plano", "seguros", "construtora", "condominio", "escola",
+    "colegio", "academia", "restaurante", "hotel", "consorcio", "concessionaria", "operadora",
+    "de", "do", "da", "dos", "das", "e",
+}
+REGEX_SUFIXO = re.compile(r"(\s+(s a|sa|ltda|me|epp|eireli|cia))+$")
+REGEX_SUFIXO_EXIBICAO = re.compile(r"[\s,.\-/]+(s\.?\s*/?\s*a\.?|ltda\.?|me|epp|eireli|cia\.?)\s*$", re.IGNORECASE)
+
+# AUTOINCREMENT: ids nunca reaproveitados, os processos leem só o que veio depois do último id visto
+SQL_EMPRESAS = (
+    '''CREATE TABLE IF NOT EXISTS empresas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT UNIQUE,
+        criado_em TEXT
+    )''',
+    # Nomes normalizados já vistos -> empresa. União, separação e renomeação regravam os
+    # apelidos (ids novos), e é assim que os outros processos percebem a mudança.
+    # confirmado = 0: apelido unido por semelhança, aguardando revisão
+    '''CREATE TABLE IF NOT EXISTS empresas_apelidos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        apelido TEXT UNIQUE,
+        empresa_id INTEGER,
+        confirmado INTEGER DEFAULT 1
+    )''',
+    "CREATE INDEX IF NOT EXISTS idx_empresas_apelidos_empresa ON empresas_apelidos (empresa_id)",
+)
+
+
+def normalizar_empresa(nome):
+    """'Claro S.A.' -> 'claro': minúsculas, sem acentos, pontuação nem sufixo societário"""
+    if nome is None:
+        return ""
+    texto = unicodedata.normalize("NFD", str(nome))
+    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn").lower()
+    texto = re.sub(r"[^a-z0-9]+", " ", texto).strip()
+    return REGEX_SUFIXO.sub("", texto) if texto not in NAO_IDENTIFICADAS else texto
+
+
+def nome_exibicao(nome):
+    """Nome canônico de uma empresa nova: o nome recebido sem sufixo societário, em Title Case"""
+    nome = re.sub(r"\s+", " ", str(nome)).strip()
+    while True:
+        curto = REGEX_SUFIXO_EXIBICAO.sub("", nome)
+        if curto == nome or not curto:
+            return nome.title()
+        nome = curto
+
+
+def trigramas(chave):
+    texto = f"  {chave} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def mesma_empresa_provavel(chave, outra, semelhanca):
+    """Se dois apelidos normalizados parecidos podem ser unidos sem revisão prévia (ver o cabeçalho)"""
+    curta, longa = sorted((chave.split(), outra.split()), key=len)
+    if len(curta) < len(longa):
+        # Marca seguida de complemento: "claro" x "claro net"
+        return (longa[:len(curta)] == curta and len(" ".join(curta)) >= TAMANHO_MINIMO_APROXIMADO
+                and not all(t in TERMOS_GENERICOS for t in curta))
+    # Variação de grafia: "telefonica brasil" x "telefonica brazil"
+    return (semelhanca >= LIMIAR_SEMELHANCA
+            and min(len(chave), len(outra)) >= RAZAO_MINIMA_TAMANHO * max(len(chave), len(outra))
+            and min(len(chave), len(outra)) > TAMANHO_MINIMO_APROXIMADO
+            and all(a[0] == b[0] for a, b in zip(curta, longa)))
+
+
+class RegistroEmpresas:
+    """Apelidos e índice de trigramas em memória, sincronizados com as tabelas empresas/empresas_apelidos"""
+
+    def __init__(self, banco):
+        self.banco = banco
+        self._lock = threading.RLock()
+        self._apelidos = {}                    # apelido normalizado -> empresa_id
+        self._nomes = {}                       # empresa_id -> nome canônico
+        self._indice = defaultdict(set)        # trigrama -> apelidos
+        self._tamanhos = {}                    # apelido -> nº de trigramas
+        self._ultimo_apelido = 0
+        self._carregar()
+
+    def _carregar(self):
+        """
+        Lê os apelidos gravados depois da última leitura (inclusive por outros processos).
+        Apelidos novos podem vir de uma empresa nova, união, separação ou renomeação: os
+        nomes canônicos são então relidos por inteiro.
+        """
+        with self._lock:
+            linhas = self.banco.consultar(
+                "SELECT id, apelido, empresa_id FROM empresas_apelidos WHERE id > ? ORDER BY id",
+                (self._ultimo_apelido,)
+            )
+            for id_apelido, apelido, empresa_id in linhas:
+                self._indexar(apelido, empresa_id)
+                self._ultimo_apelido = id_apelido
+            if linhas:
+                self._nomes = dict(self.banco.consultar("SELECT id, nome FROM empresas"))
+
+    def _indexar(self, apelido, empresa_id):
+        if apelido not in self._apelidos:
+            meus = trigramas(apelido)
+            for t in meus:
+                self._indice[t].add(apelido)
+            self._tamanhos[apelido] = len(meus)
+        self._apelidos[apelido] = empresa_id
+
+    def _gravar_apelido(self, chave, empresa_id, confirmado=True):
+        # Se outro processo gravou o mesmo apelido antes, vale o dele
+        with self.banco.transacao() as conn:
+            conn.execute("INSERT OR IGNORE INTO empresas_apelidos (apelido, empresa_id, confirmado) VALUES (?, ?, ?)",
+                         (chave, empresa_id, int(confirmado)))
+        self._carregar()
+        return self._apelidos[chave]
+
+    def _semelhantes(self, chave):
+        """{apelido: semelhança de Dice} dos apelidos que têm trigramas em comum com a chave"""
+        minhas = trigramas(chave)
+        comuns = Counter()
+        for t in minhas:
+            comuns.update(self._indice.get(t, ()))
+        return {outro: 2 * n / (len(minhas) + self._tamanhos[outro]) for outro, n in comuns.items()}
+
+    def _empresa_provavel(self, chave):
+        """Empresa de um apelido parecido que passa pelas regras de união; None se nenhuma ou mais de uma"""
+        candidatas = {self._apelidos[outro] for outro, s in self._semelhantes(chave).items()
+                      if mesma_empresa_provavel(chave, outro, s)}
+        return candidatas.pop() if len(candidatas) == 1 else None
+
+    def _criar(self, nome, chave):
+        nome = nome_exibicao(nome)
+        with self.banco.transacao() as conn:
+            conn.execute("INSERT OR IGNORE INTO empresas (nome, criado_em) VALUES (?, ?)",
+                         (nome, datetime.now().isoformat(timespec="seconds")))
+            empresa_id = conn.execute("SELECT id FROM empresas WHERE nome = ?", (nome,)).fetchone()[0]
+        self._nomes[empresa_id] = nome
+        return self._gravar_apelido(chave, empresa_id)
+
+    def resolver(self, nome):
+        """
+        (empresa_id, nome canônico) de um nome de empresa; (None, 'N/D') se não identificada.
+        Apelido exato, ou parecido dentro das regras de mesma_empresa_provavel (o apelido novo
+        fica pendente de revisão); senão, empresa nova até alguém confirmar a união.
+        """
+        chave = normalizar_empresa(nome)
+        if chave in NAO_IDENTIFICADAS:
+            return None, NOME_NAO_IDENTIFICADA
+        with self._lock:
+            # Consulta barata (fim do índice da chave primária): detecta apelidos e uniões de outros processos
+            ultimo = self.banco.consultar_um("SELECT MAX(id) FROM empresas_apelidos")[0] or 0
+            if ultimo > self._ultimo_apelido:
+                self._carregar()
+            empresa_id = self._apelidos.get(chave)
+            if empresa_id is None:
+                provavel = self._empresa_provavel(chave)
+                if provavel is not None:
+                    empresa_id = self._gravar_apelido(chave, provavel, confirmado=False)
+                else:
+                    empresa_id = self._criar(nome, chave)
+            return empresa_id, self._nomes[empresa_id]
+
+    def nome(self, empresa_id):
+        return self._nomes.get(empresa_id)
+
+    def localizar(self, empresa):
+        """Id de uma empresa informada pelo id, pelo nome canônico ou por um apelido; None se desconhecida"""
+        if str(empresa).isdigit() and int(empresa) in self._nomes:
+            return int(empresa)
+        with self._lock:
+            self._carregar()
+            return self._apelidos.get(normalizar_empresa(empresa))
+
+    def unir(self, origem, destino):
+        """
+        Funde a empresa 'origem' na 'destino' (ids): apelidos e ouvidorias passam para a
+        destino, que mantém o nome. Retorna quantas ouvidorias mudaram de empresa.
+        """
+        if origem == destino:
+            raise ValueError("Origem e destino são a mesma empresa.")
+        self._carregar()
+        nome = self._nomes.get(destino)
+        if nome is None or origem not in self._nomes:
+            raise ValueError("Empresa de origem ou de destino inexistente.")
+        with self._lock, self.banco.transacao() as conn:
+            apelidos = [r[0] for r in conn.execute("SELECT apelido FROM empresas_apelidos WHERE empresa_id = ?",
+                                                   (origem,))]
+            conn.execute("DELETE FROM empresas_apelidos WHERE empresa_id = ?", (origem,))
+            conn.executemany("INSERT INTO empresas_apelidos (apelido, empresa_id) VALUES (?, ?)",
+                             [(a, destino) for a in apelidos])
+            # Os gatilhos atualizam a busca (FTS) e os agregados do painel
+            alteradas = conn.execute("UPDATE ouvidorias SET empresa_id = ?, empresa = ? WHERE empresa_id = ?",
+                                     (destino, nome, origem)).rowcount
+            conn.execute("DELETE FROM empresas WHERE id = ?", (origem,))
+        self._carregar()
+        return alteradas
+
+    def separar(self, apelido, destino=None):
+        """
+        Desfaz uma união: o apelido sai da empresa atual e vai para 'destino' (id) ou para uma
+        empresa nova com esse nome. As ouvidorias cujo nome recebido (empresa_original)
+        corresponde ao apelido vão junto. Retorna (empresa_id, ouvidorias movidas).
+        """
+        chave = normalizar_empresa(apelido)
+        with self._lock:
+            self._carregar()
+            atual = self._apelidos.get(chave)
+            if atual is None:
+                raise ValueError(f"Apelido não encontrado: {apelido}")
+            if destino is not None and destino not in self._nomes:
+                raise ValueError("Empresa de destino inexistente.")
+            if destino is None and list(self._apelidos.values()).count(atual) == 1:
+                raise ValueError("É o único apelido da empresa; para trocar o nome, use --renomear.")
+            with self.banco.transacao() as conn:
+                if destino is None:
+                    nome = nome_exibicao(apelido)
+                    conn.execute("INSERT OR IGNORE INTO empresas (nome, criado_em) VALUES (?, ?)",
+                                 (nome, datetime.now().isoformat(timespec="seconds")))
+                    destino = conn.execute("SELECT id FROM empresas WHERE nome = ?", (nome,)).fetchone()[0]
+                if destino == atual:
+                    raise ValueError("O apelido já pertence a essa empresa.")
+                nome = conn.execute("SELECT nome FROM empresas WHERE id = ?", (destino,)).fetchone()[0]
+                movidas = [(destino, nome, id_ouvidoria) for id_ouvidoria, original in conn.execute(
+                    "SELECT id, empresa_original FROM ouvidorias WHERE empresa_id = ?", (atual,)
+                ) if normalizar_empresa(original) == chave]
+                conn.execute("DELETE FROM empresas_apelidos WHERE apelido = ?", (chave,))
+                conn.execute("INSERT INTO empresas_apelidos (apelido, empresa_id) VALUES (?, ?)", (chave, destino))
+                conn.executemany("UPDATE ouvidorias SET empresa_id = ?, empresa = ? WHERE id = ?", movidas)
+            self._carregar()
+            return destino, len(movidas)
+
+    def renomear(self, empresa_id, nome):
+        """
+        Troca o nome canônico da empresa, inclusive nas ouvidorias já gravadas; o nome novo
+        também vira apelido. Retorna quantas ouvidorias mudaram.
+        """
+        nome = re.sub(r"\s+", " ", str(nome)).strip()
+        chave = normalizar_empresa(nome)
+        if chave in NAO_IDENTIFICADAS:
+            raise ValueError(f"Nome inválido para uma empresa: {nome!r}")
+        with self._lock:
+            self._carregar()
+            if empresa_id not in self._nomes:
+                raise ValueError("Empresa inexistente.")
+            dona = self._apelidos.get(chave, empresa_id)
+            if dona != empresa_id:
+                raise ValueError(f"{nome} já é apelido de {self._nomes[dona]}; para juntá-las, use --unir.")
+            if any(n == nome and i != empresa_id for i, n in self._nomes.items()):
+                raise ValueError(f"Já existe uma empresa chamada {nome}.")
+            with self.banco.transacao() as conn:
+                apelidos = dict(conn.execute("SELECT apelido, confirmado FROM empresas_apelidos WHERE empresa_id = ?",
+                                             (empresa_id,)))
+                apelidos[chave] = 1
+                conn.execute("UPDATE empresas SET nome = ? WHERE id = ?", (nome, empresa_id))
+                # Apelidos regravados: os outros processos percebem e releem os nomes
+                conn.execute("DELETE FROM empresas_apelidos WHERE empresa_id = ?", (empresa_id,))
+                conn.executemany("INSERT INTO empresas_apelidos (apelido, empresa_id, confirmado) VALUES (?, ?, ?)",
+                                 [(a, empresa_id, c) for a, c in sorted(apelidos.items())])
+                alteradas = conn.execute("UPDATE ouvidorias SET empresa = ? WHERE empresa_id = ?",
+                                         (nome, empresa_id)).rowcount
+            self._carregar()
+            return alteradas
+
+    def listar(self):
+        """[(id, nome, ouvidorias, apelidos)] das empresas, das mais para as menos frequentes"""
+        self._carregar()
+        contagens = dict(self.banco.consultar(
+            "SELECT empresa_id, COUNT(*) FROM ouvidorias WHERE empresa_id IS NOT NULL GROUP BY empresa_id"
+        ))
+        apelidos = defaultdict(list)
+        for apelido, empresa_id in self._apelidos.items():
+            apelidos[empresa_id].append(apelido)
+        return sorted(((i, nome, contagens.get(i, 0), sorted(apelidos[i])) for i, nome in self._nomes.items()
+                       if i in apelidos), key=lambda e: (-e[2], e[1]))
+
+    def pendentes_revisao(self):
+        """[(apelido, empresa_id, nome)] dos apelidos unidos por semelhança e ainda não revisados"""
+        self._carregar()
+        return [(apelido, empresa_id, self._nomes.get(empresa_id)) for apelido, empresa_id in self.banco.consultar(
+            "SELECT apelido, empresa_id FROM empresas_apelidos WHERE confirmado = 0 ORDER BY id"
+        )]
+
+    def confirmar(self, apelido):
+        """Aceita a união de um apelido pendente de revisão (para desfazê-la, use separar)"""
+        if not self.banco.executar("UPDATE empresas_apelidos SET confirmado = 1 WHERE apelido = ?",
+                                   (normalizar_empresa(apelido),)).rowcount:
+            raise ValueError(f"Apelido não encontrado: {apelido}")
+
+    def sugerir(self, limiar=LIMIAR_SUGESTAO):
+        """
+        [(semelhança, id_a, nome_a, id_b, nome_b)] de empresas distintas com apelidos parecidos.
+        Só candidatos: a união é confirmada por uma pessoa, com unir().
+        """
+        self._carregar()
+        pares = {}
+        for apelido, empresa_id in self._apelidos.items():
+            for outro, s in self._semelhantes(apelido).items():
+                outra = self._apelidos[outro]
+                if outra <= empresa_id:
+                    continue
+                if s >= limiar and s > pares.get((empresa_id, outra), 0):
+                    pares[(empresa_id, outra)] = s
+        return sorted(((s, a, self._nomes[a], b, self._nomes[b]) for (a, b), s in pares.items()), reverse=True)
+
+    def vincular(self):
+        """
+        Resolve as ouvidorias com nome de empresa e sem empresa_id (bancos anteriores ao
+        registro): grava o id e o nome canônico, guardando o nome recebido em empresa_original.
+        Retorna quantas linhas foram atualizadas.
+        """
+        # Os nomes mais frequentes primeiro: são eles que viram o nome canônico
+        nomes = [r[0] for r in self.banco.consultar(
+            "SELECT empresa FROM ouvidorias WHERE empresa_id IS NULL AND empresa IS NOT NULL "
+            "GROUP BY empresa ORDER BY COUNT(*) DESC"
+        )]
+        alteradas = 0
+        for nome in nomes:
+            empresa_id, canonico = self.resolver(nome)
+            if empresa_id is None and nome == canonico:
+                continue
+            with self.banco.transacao() as conn:
+                alteradas += conn.execute(
+                    "UPDATE ouvidorias SET empresa_id = ?, empresa = ?, empresa_original = COALESCE(empresa_original, empresa) "
+                    "WHERE empresa = ? AND empresa_id IS NULL",
+                    (empresa_id, canonico, nome)
+                ).rowcount
+        return alteradas
+
+
+def main():
+    from banco_dados import BancoDados  # import local: banco_dados importa este módulo
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Registro canônico de empresas - MPRJ")
+    parser.add_argument("--listar", action="store_true", help="empresas com o total de ouvidorias e os apelidos")
+    parser.add_argument("--sugerir", action="store_true", help="pares de empresas parecidas (candidatos à união)")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_SUGESTAO, help="semelhança mínima em --sugerir")
+    parser.add_argument("--revisar", action="store_true", help="apelidos unidos por semelhança, ainda não confirmados")
+    parser.add_argument("--confirmar", metavar="APELIDO", help="aceita a união de APELIDO (para desfazer, --separar)")
+    parser.add_argument("--unir", nargs=2, metavar=("ORIGEM", "DESTINO"),
+                        help="funde ORIGEM em DESTINO (id, nome ou apelido), inclusive nas ouvidorias já gravadas")
+    parser.add_argument("--separar", metavar="APELIDO",
+                        help="tira APELIDO da empresa atual (desfaz uma união), com as ouvidorias recebidas com esse nome")
+    parser.add_argument("--destino", help="em --separar, empresa que recebe o apelido (padrão: uma empresa nova)")
+    parser.add_argument("--renomear", nargs=2, metavar=("EMPRESA", "NOME"), help="troca o nome canônico de EMPRESA")
+    parser.add_argument("--vincular", action="store_true", help="resolve as ouvidorias ainda sem empresa_id")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    banco = BancoDados(args.banco)
+    registro = RegistroEmpresas(banco)
+    if args.unir:
+        origem, destino = (registro.localizar(e) for e in args.unir)
+        try:
+            if origem is None or destino is None:
+                raise ValueError(f"Empresa não encontrada: {args.unir[0] if origem is None else args.unir[1]}")
+            nome_origem = registro.nome(origem)
+            alteradas = registro.unir(origem, destino)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ {nome_origem} unida a {registro.nome(destino)} ({alteradas} ouvidorias atualizadas)")
+    elif args.separar:
+        destino = registro.localizar(args.destino) if args.destino else None
+        try:
+            if args.destino and destino is None:
+                raise ValueError(f"Empresa não encontrada: {args.destino}")
+            destino, movidas = registro.separar(args.separar, destino)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ {args.separar} agora pertence a {registro.nome(destino)} ({movidas} ouvidorias movidas)")
+    elif args.renomear:
+        empresa_id = registro.localizar(args.renomear[0])
+        try:
+            if empresa_id is None:
+                raise ValueError(f"Empresa não encontrada: {args.renomear[0]}")
+            alteradas = registro.renomear(empresa_id, args.renomear[1])
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ Empresa renomeada para {registro.nome(empresa_id)} ({alteradas} ouvidorias atualizadas)")
+    elif args.confirmar:
+        try:
+            registro.confirmar(args.confirmar)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ União de {args.confirmar} confirmada")
+    elif args.revisar:
+        pendentes = registro.pendentes_revisao()
+        for apelido, empresa_id, nome in pendentes:
+            print(f"{apelido}  ->  [{empresa_id}] {nome}")
+        if pendentes:
+            print('Confirme com --confirmar "APELIDO" ou desfaça com --separar "APELIDO".')
+        else:
+            print("Nenhuma união pendente de revisão.")
+    elif args.vincular:
+        print(f"✅ {registro.vincular()} ouvidorias vinculadas ao registro de empresas")
+    elif args.sugerir:
+        pares = registro.sugerir(args.limiar)
+        for s, a, nome_a, b, nome_b in pares:
+            print(f"{s:.2f}  [{a}] {nome_a}  ~  [{b}] {nome_b}")
+        if pares:
+            print('Confira cada par e confirme as uniões com --unir "ORIGEM" "DESTINO".')
+        else:
+            print("Nenhum par de empresas parecidas.")
+    elif args.listar:
+        for empresa_id, nome, total, apelidos in registro.listar():
+            print(f"[{empresa_id}] {nome}: {total} ouvidorias | apelidos: {', '.join(apelidos)}")
+    else:
+        parser.print_help()
+    banco.fechar()
+
+if __name__ == "__main__":
+    main()
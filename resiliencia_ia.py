@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Resiliência das Chamadas à IA - MPRJ
+
+Envolve cada chamada à OpenAI com:
+- prazo total (somando as novas tentativas), além do timeout de cada requisição;
+- novas tentativas limitadas, com espera exponencial e variação aleatória
+  (jitter), apenas para erros temporários (429, 5xx, timeout, conexão). Este é
+  o único orçamento de novas tentativas: quem chama não deve repetir por cima;
+- uma pausa compartilhada: a espera pedida pela API (Retry-After) ou a espera
+  exponencial vale para todas as threads, não só para a que recebeu o erro;
+- um disjuntor (circuit breaker): após várias chamadas seguidas sem sucesso
+  (cada uma conta uma vez, mesmo com várias tentativas), as chamadas falham na
+  hora durante um intervalo, em vez de esperar uma API fora do ar. Passado o
+  intervalo, uma única chamada de teste decide se o circuito fecha.
+
+Quem usa decide o que fazer com a falha (ex.: classificação local provisória).
+"""
+
+import random
+import threading
+import time
+
+import openai
+
+ERROS_TEMPORARIOS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+TIMEOUT_REQUISICAO = 20.0       # segundos por requisição
+PRAZO_TOTAL = 45.0              # segundos somando todas as tentativas
+TENTATIVAS = 3
+ESPERA_BASE = 0.5
+ESPERA_MAX = 8.0
+FALHAS_PARA_ABRIR = 5           # chamadas seguidas que esgotaram as tentativas e abrem o circuito
+TEMPO_ABERTO = 30.0             # segundos de falha imediata antes da chamada de teste
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class CircuitoAberto(Exception):
+    """A IA está sendo evitada após falhas seguidas; a chamada nem foi feita"""
+
+
+class ChamadaResiliente:
+    def __init__(self, timeout_requisicao=TIMEOUT_REQUISICAO, tentativas=TENTATIVAS, prazo_total=PRAZO_TOTAL,
+                 espera_base=ESPERA_BASE, espera_max=ESPERA_MAX, falhas_para_abrir=FALHAS_PARA_ABRIR,
+                 tempo_aberto=TEMPO_ABERTO):
+        self.timeout_requisicao = timeout_requisicao
+        self.tentativas = tentativas
+        self.prazo_total = prazo_total
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self._aberto_ate = 0.0
+        self._pausa_ate = 0.0            # nenhuma thread tenta antes disso (Retry-After / espera exponencial)
+        self._teste_em_andamento = False
+        self._ao_recuperar = []
+        self._lock = threading.Lock()
+
+    def ao_recuperar(self, funcao):
+        """Registra uma função chamada quando o circuito volta a fechar (a IA respondeu de novo)"""
+        self._ao_recuperar.append(funcao)
+
+    def disponivel(self):
+        """False enquanto o circuito estiver aberto (para avisos na interface)"""
+        with self._lock:
+            return self.estado == FECHADO or time.monotonic() >= self._aberto_ate
+
+    def _liberar(self):
+        """Decide se a chamada pode ser feita; no estado meio-aberto só passa uma chamada de teste"""
+        with self._lock:
+            if self.estado == FECHADO:
+                return
+            if self.estado == ABERTO and time.monotonic() >= self._aberto_ate:
+                self.estado = MEIO_ABERTO
+            if self.estado == MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return
+            raise CircuitoAberto(f"IA indisponível após {self.falhas_seguidas} falhas seguidas")
+
+    def _registrar_sucesso(self):
+        with self._lock:
+            recuperou = self.estado != FECHADO
+            self.estado = FECHADO
+            self.falhas_seguidas = 0
+            self._teste_em_andamento = False
+        if recuperou:
+            for funcao in self._ao_recuperar:
+                funcao()
+
+    def _registrar_falha(self):
+        with self._lock:
+            self.falhas_seguidas += 1
+            self._teste_em_andamento = False
+            if self.estado == MEIO_ABERTO or self.falhas_seguidas >= self.falhas_para_abrir:
+                self.estado = ABERTO
+                self._aberto_ate = time.monotonic() + self.tempo_aberto
+
+    def _espera(self, erro, tentativa):
+        """Espera exponencial com jitter completo; respeita o Retry-After enviado pela API"""
+        espera = random.uniform(0, min(self.espera_max, self.espera_base * 2 ** tentativa))
+        resposta = getattr(erro, "response", None)
+        if resposta is not None:
+            try:
+                espera = max(espera, float(resposta.headers.get("retry-after")))
+            except (TypeError, ValueError):
+                pass
+        return espera
+
+    def _pausar(self, espera):
+        with self._lock:
+            self._pausa_ate = max(self._pausa_ate, time.monotonic() + espera)
+
+    def _aguardar_pausa(self, prazo):
+        """Respeita a pausa compartilhada (sem passar do prazo), com jitter para as threads não voltarem juntas"""
+        with self._lock:
+            espera = self._pausa_ate - time.monotonic()
+        if espera > 0:
+            espera += random.uniform(0, self.espera_base)
+            time.sleep(max(0.0, min(espera, prazo - time.monotonic())))
+
+    def executar(self, funcao, timeout=None, **kwargs):
+        """
+        Executa funcao(timeout=..., **kwargs) com novas tentativas. O timeout de cada
+        tentativa (padrão: timeout_requisicao) nunca passa do que resta do prazo total.
+        CircuitoAberto se a IA estiver sendo evitada. Para o disjuntor, a chamada conta
+        uma única falha, e só quando as tentativas se esgotam.
+        """
+        timeout = timeout or self.timeout_requisicao
+        # Uma requisição longa (ex.: pacote de denúncias) sempre cabe inteira no prazo
+        prazo = time.monotonic() + max(self.prazo_total, timeout)
+        self._liberar()
+        for tentativa in range(self.tentativas):
+            self._aguardar_pausa(prazo)
+            try:
+                restante = max(1.0, prazo - time.monotonic())
+                resultado = funcao(timeout=min(timeout, restante), **kwargs)
+            except ERROS_TEMPORARIOS as e:
+                espera = self._espera(e, tentativa)
+                # Sem nova tentativa se ela estouraria o prazo total
+                if tentativa == self.tentativas - 1 or time.monotonic() + espera >= prazo:
+                    self._registrar_falha()
+                    raise
+                self._pausar(espera)
+                continue
+            except Exception:
+                # Erro não temporário (requisição inválida etc.): não indica queda da API
+                with self._lock:
+                    self._teste_em_andamento = False
+                raise
+            self._registrar_sucesso()
+            return resultado
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço HTTP de Classificação - MPRJ
+
+Expõe o ClassificadorDenuncias para os outros sistemas do MPRJ (JSON sobre HTTP):
+    POST /classificar           {"endereco", "denuncia", "num_com", "num_mprj", "vencedor", "responsavel"}
+    POST /classificar/lote      {"itens": [{...}, ...]}  (catálogo enviado uma vez por pacote à IA)
+    GET  /promotoria?endereco=  município/promotoria, sem IA e sem gravar (também por POST {"endereco"})
+    GET  /saude                 situação do processo e da IA
+    GET  /metricas              contadores no formato do Prometheus
+
+Modelo de processos (pré-fork, só em Linux/Unix):
+- o processo principal carrega o classificador (bases, autômato de municípios,
+  índice de CEPs, catálogo) e abre a porta; em seguida fecha a sua conexão
+  SQLite e cria os trabalhadores, que herdam tudo já carregado (cópia sob
+  demanda da memória) e atendem conexões na mesma porta, cada um com threads;
+- um único processo gravador recebe as ouvidorias classificadas de todos os
+  trabalhadores e as grava em grupos (uma transação para o que chegou junto),
+  atualizando também o índice de similaridade. Cada trabalhador mantém a
+  própria conexão para cache, contadores e métricas;
+- um processo reclassificador refaz, com a IA disponível, as ouvidorias que
+  foram gravadas com a classificação provisória (gravadas como pendentes).
+Se um processo morrer, o principal cria outro no lugar.
+
+Uso:
+    python3 servico_classificacao.py --porta 8080 --processos 4
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python3 servico_classificacao.py   # com o servidor_ia_falso.py
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from classificador_denuncias import COLUNAS_OUVIDORIA, SQL_INSERIR_OUVIDORIA
+from fila_classificacao import STATUS_DEGRADADO, STATUS_PENDENTE
+
+PROCESSOS = 4
+MAX_CORPO = 4 * 1024 * 1024          # bytes por requisição
+MAX_ITENS_LOTE = 500
+TAMANHO_GRUPO_GRAVACAO = 500         # registros por transação no gravador
+TIMEOUT_GRAVACAO = 30.0              # segundos esperando o gravador confirmar
+INTERVALO_RECLASSIFICACAO = 60.0     # segundos entre as passadas do reclassificador (SARO_INTERVALO_RECLASSIFICACAO)
+CAMPOS_FORMULARIO = ("num_com", "num_mprj", "vencedor", "responsavel")
+# O texto da denúncia não volta na resposta (quem chamou já o tem)
+CAMPOS_RESPOSTA = ("id",) + tuple(c for c in COLUNAS_OUVIDORIA if c != "denuncia")
+
+
+class ErroRequisicao(Exception):
+    """Pedido inválido: vira uma resposta 4xx com a mensagem"""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# ============ GRAVADOR (PROCESSO ÚNICO) ============
+
+def _processo_gravador(db_path, pedidos, respostas):
+    """
+    Laço do gravador: cada pedido é (canal, sequência, [valores]). O que estiver na fila é
+    gravado em uma transação; se ela falhar, cada pedido é refeito sozinho (um registro
+    inválido não derruba os demais). A resposta (sequência, ids, erro) vai para o canal do
+    trabalhador que pediu.
+    """
+    from banco_dados import BancoDados
+    from indice_similaridade import IndiceSimilaridade
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    banco = BancoDados(db_path)
+    indice = IndiceSimilaridade(banco, db_path)
+    encerrar = False
+    while not encerrar:
+        grupo = [pedidos.get()]
+        while len(grupo) < TAMANHO_GRUPO_GRAVACAO:
+            try:
+                grupo.append(pedidos.get_nowait())
+            except queue.Empty:
+                break
+        if None in grupo:
+            # Sinal de encerramento: grava o que já chegou e sai
+            encerrar = True
+            grupo = [p for p in grupo if p is not None]
+        try:
+            with banco.transacao() as conn:
+                resultados = [(p, [conn.execute(SQL_INSERIR_OUVIDORIA, v).lastrowid for v in p[2]], None)
+                              for p in grupo]
+        except Exception:
+            resultados = []
+            for p in grupo:
+                try:
+                    with banco.transacao() as conn:
+                        resultados.append((p, [conn.execute(SQL_INSERIR_OUVIDORIA, v).lastrowid for v in p[2]], None))
+                except Exception as e:
+                    resultados.append((p, None, str(e)))
+        try:
+            indice.atualizar()
+        except Exception:
+            pass
+        for (canal, sequencia, _), ids, erro in resultados:
+            respostas[canal].put((sequencia, ids, erro))
+    banco.fechar()
+
+
+class ClienteGravador:
+    """Lado do trabalhador: envia registros ao gravador e espera os ids (várias threads ao mesmo tempo)"""
+
+    def __init__(self, pedidos, respostas, canal):
+        self.pedidos = pedidos
+        self.respostas = respostas
+        self.canal = canal
+        self._sequencia = itertools.count()
+        self._aguardando = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._receber, daemon=True).start()
+
+    def _receber(self):
+        while True:
+            sequencia, ids, erro = self.respostas.get()
+            with self._lock:
+                futuro = self._aguardando.pop(sequencia, None)
+            if futuro is not None:
+                futuro.set_result((ids, erro))
+
+    def gravar(self, registros):
+        """Ids das linhas gravadas, na ordem dos registros; RuntimeError se o gravador falhar"""
+        futuro = futures.Future()
+        with self._lock:
+            # Com o pid: respostas atrasadas para um trabalhador que morreu não casam com as do substituto
+            sequencia = (os.getpid(), next(self._sequencia))
+            self._aguardando[sequencia] = futuro
+        self.pedidos.put((self.canal, sequencia, [tuple(r[c] for c in COLUNAS_OUVIDORIA) for r in registros]))
+        try:
+            ids, erro = futuro.result(TIMEOUT_GRAVACAO)
+        except futures.TimeoutError:
+            with self._lock:
+                self._aguardando.pop(sequencia, None)
+            raise RuntimeError("O gravador não respondeu a tempo.")
+        if erro:
+            raise RuntimeError(f"Erro no banco: {erro}")
+        return ids
+
+
+# ============ TRABALHADORES (HTTP) ============
+
+class ServicoClassificacao:
+    """Operações do serviço, independentes do HTTP (um objeto por processo trabalhador)"""
+
+    def __init__(self, classificador, gravador):
+        self.classificador = classificador
+        self.gravador = gravador
+
+    @staticmethod
+    def _texto(pedido, campo, obrigatorio=False):
+        if not isinstance(pedido, dict):
+            raise ErroRequisicao("O pedido deve ser um objeto JSON.")
+        valor = pedido.get(campo)
+        if valor is None or valor == "":
+            if obrigatorio:
+                raise ErroRequisicao(f"Campo obrigatório ausente: {campo}")
+            return ""
+        if not isinstance(valor, str):
+            raise ErroRequisicao(f"O campo {campo} deve ser texto.")
+        return valor
+
+    def _formulario(self, pedido):
+        if not isinstance(pedido, dict):
+            raise ErroRequisicao("Cada ouvidoria deve ser um objeto JSON.")
+        return (self._texto(pedido, "endereco", True), self._texto(pedido, "denuncia", True)) + tuple(
+            self._texto(pedido, c) for c in CAMPOS_FORMULARIO
+        )
+
+    def _gravar(self, registros):
+        for registro in registros:
+            # Classificação provisória: a linha fica pendente para o reclassificador (origem 'degradado')
+            if registro["status"] == STATUS_DEGRADADO:
+                registro["status"] = STATUS_PENDENTE
+        with self.classificador.metricas.medir("gravacao"):
+            ids = self.gravador.gravar(registros)
+        # O gravador já acrescentou os vetores: este processo passa a enxergá-los
+        self.classificador.indexar_novas()
+        return [dict({c: r[c] for c in CAMPOS_RESPOSTA if c != "id"}, id=i) for r, i in zip(registros, ids)]
+
+    def classificar(self, pedido):
+        endereco, denuncia, num_com, num_mprj, vencedor, responsavel = self._formulario(pedido)
+        with self.classificador.metricas.medir("total"):
+            dados_ia = self.classificador.classificar_texto(denuncia)
+            registro = self.classificador.montar_registro(endereco, denuncia, num_com, num_mprj, vencedor,
+                                                          responsavel, dados_ia)
+            return self._gravar([registro])[0]
+
+    def classificar_lote(self, pedido):
+        itens = pedido.get("itens") if isinstance(pedido, dict) else None
+        if not isinstance(itens, list) or not itens:
+            raise ErroRequisicao('Envie {"itens": [...]} com ao menos uma ouvidoria.')
+        if len(itens) > MAX_ITENS_LOTE:
+            raise ErroRequisicao(f"No máximo {MAX_ITENS_LOTE} ouvidorias por lote.", 413)
+        formularios = [self._formulario(item) for item in itens]
+        classificacoes = self.classificador.classificar_lote({i: f[1] for i, f in enumerate(formularios)})
+        registros = [self.classificador.montar_registro(*f, classificacoes[i]) for i, f in enumerate(formularios)]
+        return {"resultados": self._gravar(registros)}
+
+    def promotoria(self, pedido):
+        endereco = self._texto(pedido, "endereco", True)
+        local = self.classificador.localizar_municipio(endereco)
+        if not local:
+            return {"identificado": False, "municipio": None, "promotoria": None, "fonte": None}
+        return {"identificado": True, "municipio": local["municipio_oficial"], "promotoria": local["promotoria"],
+                "fonte": local.get("fonte")}
+
+    def saude(self):
+        return {"status": "ok", "processo": os.getpid(),
+                "ia_disponivel": self.classificador.resiliencia.disponivel(),
+                "versao_catalogo": self.classificador.versao_catalogo}
+
+    def metricas(self):
+        return self.classificador.metricas.exposicao_prometheus()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # conexões reaproveitadas (keep-alive) pelos clientes
+    # Cabeçalho e corpo saem em escritas separadas: sem isso, Nagle + ACK atrasado custam ~40 ms por resposta
+    disable_nagle_algorithm = True
+    server_version = "SARO/2.2"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo, tipo="application/json; charset=utf-8"):
+        dados = corpo.encode("utf-8") if isinstance(corpo, str) else json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _ler_json(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho > MAX_CORPO:
+            raise ErroRequisicao(f"Corpo maior que {MAX_CORPO} bytes.", 413)
+        try:
+            return json.loads(self.rfile.read(tamanho) or b"{}")
+        except ValueError:
+            raise ErroRequisicao("O corpo da requisição não é um JSON válido.")
+
+    def _executar(self, operacao, *args):
+        try:
+            self._responder(200, operacao(*args))
+        except ErroRequisicao as e:
+            self._responder(e.status, {"erro": str(e)})
+        except Exception as e:
+            self._responder(503 if isinstance(e, RuntimeError) else 500, {"erro": str(e)})
+
+    def do_GET(self):
+        servico = self.server.servico
+        url = urlsplit(self.path)
+        rota = url.path.rstrip("/")
+        if rota == "/saude":
+            self._executar(servico.saude)
+        elif rota == "/metricas":
+            try:
+                self._responder(200, servico.metricas(), "text/plain; version=0.0.4; charset=utf-8")
+            except Exception as e:
+                self._responder(500, {"erro": str(e)})
+        elif rota == "/promotoria":
+            self._executar(servico.promotoria, {c: v[0] for c, v in parse_qs(url.query).items()})
+        else:
+            self._responder(404, {"erro": "rota inexistente"})
+
+    def do_POST(self):
+        servico = self.server.servico
+        operacoes = {"/classificar": servico.classificar, "/classificar/lote": servico.classificar_lote,
+                     "/promotoria": servico.promotoria}
+        operacao = operacoes.get(urlsplit(self.path).path.rstrip("/"))
+        try:
+            pedido = self._ler_json()
+        except ErroRequisicao as e:
+            # Corpo não lido: a conexão não pode ser reaproveitada
+            self.close_connection = True
+            return self._responder(e.status, {"erro": str(e)})
+        if operacao is None:
+            return self._responder(404, {"erro": "rota inexistente"})
+        self._executar(operacao, pedido)
+
+
+class ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256           # fila de conexões da porta, dividida entre os trabalhadores
+
+
+def _processo_trabalhador(servidor, classificador, pedidos, respostas, canal):
+    """Atende conexões na porta herdada do processo principal até receber SIGTERM"""
+    def encerrar(*_):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    classificador.banco.reabrir()
+    classificador.indice.somente_leitura = True
+    servidor.servico = ServicoClassificacao(classificador, ClienteGravador(pedidos, respostas[canal], canal))
+    try:
+        servidor.serve_forever()
+    finally:
+        classificador.metricas.descarregar()
+
+
+def _processo_reclassificador(classificador):
+    """
+    Reclassifica as ouvidorias com classificação provisória (gravadas enquanto a IA falhava) a
+    cada INTERVALO_RECLASSIFICACAO segundos, quando o disjuntor deste processo permite chamar a
+    IA. Só elas: as pendentes registradas pela interface (classificação ao vivo, fila) ficam
+    com quem as registrou. Grava direto no banco, como a fila da interface; o índice de
+    similaridade não muda.
+    """
+    from fila_classificacao import FilaClassificacao
+
+    def encerrar(*_):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    classificador.banco.reabrir()
+    classificador.indice.somente_leitura = True
+    intervalo = float(os.environ.get("SARO_INTERVALO_RECLASSIFICACAO", INTERVALO_RECLASSIFICACAO))
+    # Ao iniciar, a fila já agenda as provisórias
+    fila = FilaClassificacao(classificador, trabalhadores=1, so_degradadas=True)
+    try:
+        while True:
+            time.sleep(intervalo)
+            if classificador.resiliencia.disponivel():
+                fila.reprocessar_degradados()
+    finally:
+        fila.pool.shutdown(wait=False, cancel_futures=True)
+        classificador.metricas.descarregar()
+
+
+# ============ PROCESSO PRINCIPAL ============
+
+def iniciar(classificador, host="127.0.0.1", porta=8080, processos=PROCESSOS):
+    """
+    Abre a porta, cria o gravador, os trabalhadores e o reclassificador e os mantém de pé até SIGTERM/Ctrl+C.
+    O classificador já deve estar carregado (é herdado pelos filhos).
+    """
+    contexto = multiprocessing.get_context("fork")
+    servidor = ServidorHTTP((host, porta), Handler)
+    # Nenhuma conexão SQLite atravessa o fork: o principal fecha a sua, cada filho abre a própria
+    classificador.metricas.descarregar()
+    classificador.banco.fechar()
+    pedidos = contexto.Queue()
+    respostas = [contexto.Queue() for _ in range(processos)]
+
+    def novo_gravador():
+        processo = contexto.Process(target=_processo_gravador, name="saro-gravador",
+                                    args=(classificador.db_path, pedidos, respostas), daemon=True)
+        processo.start()
+        return processo
+
+    def novo_trabalhador(canal):
+        processo = contexto.Process(target=_processo_trabalhador, name=f"saro-trabalhador-{canal}",
+                                    args=(servidor, classificador, pedidos, respostas, canal), daemon=True)
+        processo.start()
+        return processo
+
+    def novo_reclassificador():
+        processo = contexto.Process(target=_processo_reclassificador, name="saro-reclassificador",
+                                    args=(classificador,), daemon=True)
+        processo.start()
+        return processo
+
+    gravador = novo_gravador()
+    trabalhadores = [novo_trabalhador(canal) for canal in range(processos)]
+    reclassificador = novo_reclassificador()
+    print(f"🌐 Serviço de classificação em http://{host}:{servidor.server_address[1]} "
+          f"({processos} processos, pid {os.getpid()})")
+
+    def parar(*_):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, parar)
+    try:
+        while True:
+            time.sleep(1)
+            if not gravador.is_alive():
+                print(f"⚠️  Gravador encerrado (código {gravador.exitcode}); reiniciando.")
+                gravador = novo_gravador()
+            for canal, processo in enumerate(trabalhadores):
+                if not processo.is_alive():
+                    print(f"⚠️  Trabalhador {canal} encerrado (código {processo.exitcode}); reiniciando.")
+                    trabalhadores[canal] = novo_trabalhador(canal)
+            if not reclassificador.is_alive():
+                print(f"⚠️  Reclassificador encerrado (código {reclassificador.exitcode}); reiniciando.")
+                reclassificador = novo_reclassificador()
+    except KeyboardInterrupt:
+        print("\n⏹️  Encerrando...")
+    finally:
+        for processo in trabalhadores + [reclassificador]:
+            processo.terminate()
+        for processo in trabalhadores + [reclassificador]:
+            processo.join(10)
+        # O gravador termina de gravar o que já recebeu antes de sair
+        pedidos.put(None)
+        gravador.join(30)
+        servidor.server_close()
+
+
+def main():
+    from classificador_denuncias import ClassificadorDenuncias
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Serviço HTTP de classificação de ouvidorias - MPRJ")
+    parser.add_argument("--host", default="127.0.0.1", help="use 0.0.0.0 para aceitar conexões de outras máquinas")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--processos", type=int, default=int(os.environ.get("SARO_PROCESSOS", PROCESSOS)),
+                        help="processos trabalhadores (cada um atende várias conexões)")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    iniciar(ClassificadorDenuncias(args.banco), args.host, args.porta, max(1, args.processos))
+
+if __name__ == "__main__":
+    main()
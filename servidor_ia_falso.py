@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor Falso da IA (chat completions) - MPRJ
+
+Substituto local do endpoint /v1/chat/completions da OpenAI, para medir
+desempenho e testar o sistema sem chamar a API real. Latência, taxa de erro e
+formato da resposta são configuráveis. As respostas usam códigos válidos do
+catálogo (base_temas_subtemas.json), no mesmo formato pedido pelo classificador
+(item único ou {"resultados": [...]} nos pacotes). Pedidos com "stream": true
+recebem a resposta em pedaços (server-sent events), como a API real.
+
+Uso:
+    python3 servidor_ia_falso.py --porta 8765 --latencia-ms 300 --taxa-erro 0.02
+    python3 servidor_ia_falso.py --latencia-ms 400 --intervalo-token-ms 40   # fluxo mais realista
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=falsa streamlit run app_web_v2.py
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from catalogo_temas import CatalogoTemas
+
+FORMATOS = ("valido", "codigo_invalido", "json_malformado", "misto")
+EMPRESAS_FALSAS = ("Claro", "Vivo", "Enel", "Light", "Unimed", "Magazine Luiza", "Supervia", "N/D")
+
+
+class ServidorIAFalso:
+    """
+    Servidor HTTP em uma thread de fundo. latencia_ms é a média de uma latência
+    aleatória (exponencial, com mínimo de 20% da média); taxa_erro é a fração de
+    respostas 500/429. formato:
+    - valido: sempre um código do catálogo;
+    - codigo_invalido: código inexistente (exercita a nova tentativa);
+    - json_malformado: conteúdo que não é JSON;
+    - misto: 90% válido, 5% código inválido, 5% JSON malformado.
+    Em fluxo, latencia_ms é o tempo até o primeiro pedaço e intervalo_token_ms a pausa entre pedaços.
+    """
+
+    def __init__(self, porta=0, latencia_ms=0.0, taxa_erro=0.0, formato="valido", semente=None,
+                 intervalo_token_ms=0.0):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS)})")
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(base_path, "base_temas_subtemas.json"), 'r', encoding='utf-8') as f:
+            self.codigos = list(CatalogoTemas(json.load(f)).por_codigo)
+        self.latencia_ms = latencia_ms
+        self.taxa_erro = taxa_erro
+        self.formato = formato
+        self.intervalo_token_ms = intervalo_token_ms
+        self.aleatorio = random.Random(semente)
+        self.requisicoes = 0
+        self.erros = 0
+        self._lock = threading.Lock()
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", porta), self._criar_handler())
+        self.servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}/v1"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *_):
+        self.parar()
+
+    # ============ RESPOSTAS ============
+
+    def _sortear(self):
+        with self._lock:
+            self.requisicoes += 1
+            atraso = 0.0
+            if self.latencia_ms:
+                atraso = max(0.2 * self.latencia_ms, self.aleatorio.expovariate(1 / self.latencia_ms)) / 1000
+            erro = None
+            if self.aleatorio.random() < self.taxa_erro:
+                self.erros += 1
+                erro = self.aleatorio.choice((429, 500))
+            formato = self.formato
+            if formato == "misto":
+                sorteio = self.aleatorio.random()
+                formato = "valido" if sorteio < 0.9 else "codigo_invalido" if sorteio < 0.95 else "json_malformado"
+            return atraso, erro, formato, self.aleatorio.choice(self.codigos), self.aleatorio.choice(EMPRESAS_FALSAS)
+
+    def conteudo(self, pedido, formato, codigo, empresa):
+        """Texto da resposta do 'modelo' para o pedido recebido"""
+        if formato == "json_malformado":
+            return '{"codigo": "T1.S1", "empresa": '
+        if formato == "codigo_invalido":
+            codigo = "T99.S99"
+        item = {"codigo": codigo, "empresa": empresa, "resumo": "Resumo gerado pelo servidor falso"}
+        ultima = pedido.get("messages", [{}])[-1].get("content", "")
+        if '"resultados"' in ultima:
+            # Pacote: um resultado para cada id da lista enviada
+            ids = re.findall(r'"id": "([^"]*)"', ultima)
+            return json.dumps({"resultados": [dict(item, id=i) for i in ids]}, ensure_ascii=False)
+        return json.dumps(item, ensure_ascii=False)
+
+    def _criar_handler(self):
+        falso = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo, cabecalhos=()):
+                dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                for nome, valor in cabecalhos:
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _responder_em_fluxo(self, base, conteudo, usage, incluir_uso):
+                # Pedaços de ~4 caracteres (ordem de grandeza de um token), no formato de server-sent events
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                pedacos = [{"role": "assistant", "content": ""}] + [
+                    {"content": conteudo[i:i + 4]} for i in range(0, len(conteudo), 4)
+                ]
+                for i, delta in enumerate(pedacos):
+                    if i > 1 and falso.intervalo_token_ms:
+                        time.sleep(falso.intervalo_token_ms / 1000)
+                    fim = "stop" if i == len(pedacos) - 1 else None
+                    self._evento(dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": fim}]))
+                if incluir_uso:
+                    self._evento(dict(base, choices=[], usage=usage))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _evento(self, corpo):
+                self.wfile.write(f"data: {json.dumps(corpo, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                pedido = json.loads(self.rfile.read(tamanho) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._responder(404, {"error": {"message": "rota inexistente"}})
+                atraso, erro, formato, codigo, empresa = falso._sortear()
+                time.sleep(atraso)
+                if erro == 429:
+                    return self._responder(429, {"error": {"message": "limite de taxa (falso)", "type": "rate_limit"}},
+                                           [("Retry-After", "0")])
+                if erro == 500:
+                    return self._responder(500, {"error": {"message": "erro interno (falso)", "type": "server_error"}})
+                conteudo = falso.conteudo(pedido, formato, codigo, empresa)
+                entrada = sum(len(str(m.get("content", ""))) for m in pedido.get("messages", [])) // 3
+                saida = len(conteudo) // 3
+                usage = {"prompt_tokens": entrada, "completion_tokens": saida, "total_tokens": entrada + saida}
+                base = {"id": f"chatcmpl-falso-{falso.requisicoes}", "created": int(time.time()),
+                        "model": pedido.get("model", "falso")}
+                if pedido.get("stream"):
+                    incluir_uso = bool((pedido.get("stream_options") or {}).get("include_usage"))
+                    return self._responder_em_fluxo(dict(base, object="chat.completion.chunk"), conteudo, usage,
+                                                    incluir_uso)
+                self._responder(200, dict(
+                    base, object="chat.completion",
+                    choices=[{"index": 0, "message": {"role": "assistant", "content": conteudo}, "finish_reason": "stop"}],
+                    usage=usage,
+                ))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso da IA (chat completions) - MPRJ")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=300.0, help="latência média por requisição")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 429/500 (0 a 1)")
+    parser.add_argument("--formato", choices=FORMATOS, default="valido")
+    parser.add_argument("--intervalo-token-ms", type=float, default=0.0,
+                        help="pausa entre os pedaços das respostas em fluxo (stream)")
+    args = parser.parse_args()
+
+    servidor = ServidorIAFalso(args.porta, args.latencia_ms, args.taxa_erro, args.formato,
+                               intervalo_token_ms=args.intervalo_token_ms)
+    print(f"🤖 Servidor falso da IA em {servidor.url_base} (Ctrl+C para encerrar)")
+    try:
+        servidor.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.servidor.server_close()
+
+if __name__ == "__main__":
+    main()
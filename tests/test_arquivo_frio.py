@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+
+import pytest
+
+from arquivo_frio import arquivar, comprimir, descomprimir
+from banco_dados import BancoDados
+
+TEXTO = "A internet da operadora caiu no bairro inteiro e o atendimento não resolve. " * 20
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoDados(str(tmp_path / "saro.db"))
+    yield banco
+    banco.fechar()
+
+
+def gravar(banco, denuncia, resumo, data_iso="2020-01-10T10:00"):
+    return banco.executar(
+        "INSERT INTO ouvidorias (denuncia, resumo, empresa, data_iso, status) VALUES (?, ?, 'Claro', ?, 'concluido')",
+        (denuncia, resumo, data_iso)
+    ).lastrowid
+
+
+def busca(banco, termo):
+    return [r["id"] for r in banco.buscar_historico(termo)]
+
+
+def indice_integro(banco):
+    """O índice mantido pelos gatilhos é igual ao reconstruído a partir da tabela ouvidorias"""
+    banco.executar("CREATE VIRTUAL TABLE IF NOT EXISTS temp.vocabulario USING fts5vocab(main, ouvidorias_fts, instance)")
+    termos = lambda: banco.consultar("SELECT term, doc, col, offset FROM temp.vocabulario ORDER BY 1, 2, 3, 4")
+    mantido = termos()
+    banco.executar("INSERT INTO ouvidorias_fts (ouvidorias_fts) VALUES ('rebuild')")
+    return mantido == termos()
+
+
+def test_compressao_ida_e_volta():
+    assert descomprimir(comprimir(TEXTO)) == TEXTO
+    assert len(comprimir(TEXTO)) < len(TEXTO.encode("utf-8"))
+    assert descomprimir(None) is None
+
+
+def test_arquivar_e_ler(banco):
+    antiga = gravar(banco, TEXTO + " parabólica", "Internet fora do ar")
+    recente = gravar(banco, "Conta de luz alta", "Conta alta", data_iso="2999-01-01T10:00")
+
+    assert arquivar(banco, dias=30)["linhas"] == 1
+    assert banco.consultar_um("SELECT denuncia FROM ouvidorias WHERE id = ?", (antiga,)) == (None,)
+    assert banco.obter_denuncia(antiga) == TEXTO + " parabólica"
+    assert banco.obter_denuncia(recente) == "Conta de luz alta"
+    # O texto arquivado sai da busca; resumo e empresa continuam indexados
+    assert busca(banco, "parabolica") == []
+    assert busca(banco, "fora do ar") == [antiga]
+    assert busca(banco, "luz") == [recente]
+    assert indice_integro(banco)
+
+
+def test_alterar_e_excluir_arquivada_sem_a_funcao_sql(banco):
+    antiga = gravar(banco, TEXTO + " parabólica", "Internet fora do ar")
+    outra = gravar(banco, TEXTO + " satélite", "Sem sinal")
+    arquivar(banco, dias=30)
+
+    # Outro programa, sem descomprimir_denuncia registrada
+    conn = sqlite3.connect(banco.db_path)
+    with conn:
+        conn.execute("UPDATE ouvidorias SET resumo = 'Queda de conexão' WHERE id = ?", (antiga,))
+        conn.execute("DELETE FROM ouvidorias WHERE id = ?", (outra,))
+    conn.close()
+
+    assert busca(banco, "queda conexao") == [antiga]
+    assert busca(banco, "sem sinal") == []
+    assert banco.consultar_um("SELECT COUNT(*) FROM ouvidorias_arquivo WHERE id = ?", (outra,)) == (0,)
+    assert indice_integro(banco)
+
+
+def test_fts_nao_guarda_copia_do_texto(banco):
+    gravar(banco, TEXTO, "Internet fora do ar")
+    assert banco.consultar_um("SELECT COUNT(*) FROM sqlite_master WHERE name = 'ouvidorias_fts_content'") == (0,)
+
+
+def test_migracao_do_fts_com_copia_do_texto(tmp_path):
+    caminho = str(tmp_path / "antigo.db")
+    banco = BancoDados(caminho)
+    antiga = gravar(banco, TEXTO + " parabólica", "Internet fora do ar")
+    arquivar(banco, dias=30)
+    banco.fechar()
+
+    # Índice como era antes (cópia própria do texto, inclusive do arquivado)
+    conn = sqlite3.connect(caminho)
+    with conn:
+        for gatilho in ("ouvidorias_fts_ai", "ouvidorias_fts_ad", "ouvidorias_fts_au"):
+            conn.execute(f"DROP TRIGGER {gatilho}")
+        conn.execute("DROP TABLE ouvidorias_fts")
+        conn.execute("CREATE VIRTUAL TABLE ouvidorias_fts USING fts5(denuncia, resumo, empresa, "
+                     "tokenize='unicode61 remove_diacritics 2')")
+        conn.execute("INSERT INTO ouvidorias_fts (rowid, denuncia, resumo, empresa) VALUES (?, ?, ?, 'Claro')",
+                     (antiga, TEXTO + " parabólica", "Internet fora do ar"))
+        conn.execute("PRAGMA user_version = 4")
+    conn.close()
+
+    banco = BancoDados(caminho)
+    try:
+        assert banco.consultar_um("PRAGMA user_version") == (5,)
+        assert busca(banco, "parabolica") == []
+        assert busca(banco, "fora do ar") == [antiga]
+        assert indice_integro(banco)
+    finally:
+        banco.fechar()
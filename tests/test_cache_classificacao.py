@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import pytest
+
+import cache_classificacao
+from banco_dados import BancoDados
+from cache_classificacao import CacheClassificacao, normalizar_denuncia
+
+DADOS = {"tema": "Telecomunicações", "subtema": "Internet (Conexão)", "empresa": "Claro", "resumo": "Sem internet"}
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoDados(str(tmp_path / "saro.db"))
+    yield banco
+    banco.fechar()
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio controlado pelo teste (cache_classificacao usa time.time)"""
+    agora = SimpleNamespace(valor=1_000_000.0)
+    monkeypatch.setattr(cache_classificacao, "time", SimpleNamespace(time=lambda: agora.valor))
+    return agora
+
+
+def test_normalizacao_ignora_acentos_caixa_e_espacos():
+    assert normalizar_denuncia("  Internet  CAIU\nna Região ") == "internet caiu na regiao"
+    assert normalizar_denuncia(None) == ""
+
+
+def test_chave_depende_do_texto_normalizado_modelo_e_catalogo(banco):
+    cache = CacheClassificacao(banco)
+    chave = cache.gerar_chave("Internet caiu na região", "gpt-4o-mini", "v1")
+    assert cache.gerar_chave("internet  CAIU na regiao", "gpt-4o-mini", "v1") == chave
+    assert cache.gerar_chave("Internet caiu na região", "gpt-4o", "v1") != chave
+    assert cache.gerar_chave("Internet caiu na região", "gpt-4o-mini", "v2") != chave
+
+
+def test_gravar_e_buscar_conta_acertos(banco):
+    cache = CacheClassificacao(banco)
+    chave = cache.gerar_chave("Internet caiu", "modelo", "v1")
+    assert cache.buscar(chave) is None
+
+    cache.gravar(chave, dict(DADOS, origem="ia"))
+    assert cache.buscar(chave) == DADOS
+    assert cache.buscar(chave) == DADOS
+    assert cache.estatisticas() == {"itens": 1, "acertos": 2}
+
+
+def test_item_expirado_e_removido(banco, relogio):
+    cache = CacheClassificacao(banco, ttl_segundos=60)
+    cache.gravar("a", DADOS)
+    relogio.valor += 60
+    assert cache.buscar("a") == DADOS
+
+    relogio.valor += 1
+    assert cache.buscar("a") is None
+    assert cache.estatisticas()["itens"] == 0
+
+
+def test_descarte_lru_mantem_os_acessados_ha_menos_tempo(banco, relogio):
+    cache = CacheClassificacao(banco, max_itens=50)
+    for n in range(100):
+        relogio.valor += 1
+        cache.gravar(f"k{n}", DADOS)
+    relogio.valor += 1
+    cache.buscar("k0")
+
+    # O descarte roda a cada 100 gravações (na 1ª, 101ª, ...)
+    relogio.valor += 1
+    cache.gravar("k100", DADOS)
+
+    assert cache.estatisticas()["itens"] == 50
+    assert cache.buscar("k0") == DADOS and cache.buscar("k100") == DADOS
+    assert cache.buscar("k1") is None and cache.buscar("k51") is None
+    assert cache.buscar("k52") == DADOS
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from catalogo_temas import CatalogoTemas, diferencas
+
+BASE = {
+    "Telecomunicações": ["Internet (Conexão)", "Telefonia Móvel"],
+    "Serviços": ["Luz", "Água"],
+}
+
+
+def catalogo(**alteracoes):
+    return CatalogoTemas(dict(BASE, **alteracoes))
+
+
+def test_codigos_numerados_e_resolvidos_localmente():
+    cat = CatalogoTemas(BASE)
+    assert cat.texto_compacto == ("T1 Telecomunicações: 1 Internet (Conexão); 2 Telefonia Móvel\n"
+                                  "T2 Serviços: 1 Luz; 2 Água")
+    assert cat.resolver(" t2.s1 ") == ("Serviços", "Luz")
+    assert cat.resolver("T2.S3") is None and cat.resolver(None) is None
+    assert cat.por_nome[("Telecomunicações", "Telefonia Móvel")] == "T1.S2"
+
+
+def test_dica_de_correcao_lista_os_subtemas_do_tema():
+    cat = CatalogoTemas(BASE)
+    assert "T2.S1 Luz, T2.S2 Água" in cat.dica_correcao("T2.S9")
+    assert "formato T<n>.S<n>" in cat.dica_correcao("T9.S1")
+
+
+def test_versao_muda_so_com_o_conteudo():
+    assert CatalogoTemas(BASE).versao == CatalogoTemas(dict(BASE)).versao
+    assert catalogo(Serviços=["Luz", "Água", "Gás"]).versao != CatalogoTemas(BASE).versao
+
+
+def test_catalogo_igual_mantem_tudo():
+    diff = diferencas(CatalogoTemas(BASE), CatalogoTemas(BASE))
+    assert diff == {"renomeados": {}, "reclassificar": set(),
+                    "mantidos": {(t, s) for t, subtemas in BASE.items() for s in subtemas}}
+
+
+def test_subtema_renomeado():
+    diff = diferencas(CatalogoTemas(BASE), catalogo(Serviços=["Energia Elétrica", "Água"]))
+    assert diff["renomeados"] == {("Serviços", "Luz"): ("Serviços", "Energia Elétrica")}
+    assert ("Serviços", "Água") in diff["mantidos"]
+    assert diff["reclassificar"] == set()
+
+
+def test_tema_renomeado_na_mesma_posicao():
+    novo = CatalogoTemas({"Telecomunicações": BASE["Telecomunicações"], "Serviços Essenciais": ["Luz", "Água"]})
+    diff = diferencas(CatalogoTemas(BASE), novo)
+    assert diff["renomeados"] == {("Serviços", "Luz"): ("Serviços Essenciais", "Luz"),
+                                  ("Serviços", "Água"): ("Serviços Essenciais", "Água")}
+    assert diff["reclassificar"] == set()
+
+
+@pytest.mark.parametrize("servicos", [
+    ["Luz", "Água", "Gás"],                            # tema ganhou subtema: as ouvidorias podem ser dele
+    ["Luz (Falta)", "Luz (Conta)", "Água"],            # subtema dividido
+])
+def test_tema_com_subtemas_novos_e_reclassificado_inteiro(servicos):
+    diff = diferencas(CatalogoTemas(BASE), catalogo(Serviços=servicos))
+    assert diff["reclassificar"] == {("Serviços", "Luz"), ("Serviços", "Água")}
+    assert diff["mantidos"] == {("Telecomunicações", "Internet (Conexão)"), ("Telecomunicações", "Telefonia Móvel")}
+
+
+def test_subtema_removido():
+    diff = diferencas(CatalogoTemas(BASE), catalogo(Serviços=["Água"]))
+    assert diff["reclassificar"] == {("Serviços", "Luz")}
+    assert ("Serviços", "Água") in diff["mantidos"]
+
+
+def test_tema_removido():
+    diff = diferencas(CatalogoTemas(BASE), CatalogoTemas({"Telecomunicações": BASE["Telecomunicações"]}))
+    assert diff["reclassificar"] == {("Serviços", "Luz"), ("Serviços", "Água")}
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from classificador_local import CONFIANCA_REGRA, ClassificadorLocal
+
+LIMIAR = 0.85
+
+CATALOGO = {"Telecomunicações": ["Internet (Conexão)"], "Serviços": ["Luz"]}
+EXEMPLOS = [
+    (f"A internet da Claro caiu de novo, a fibra optica esta sem conexao ha {n} dias", "Telecomunicações",
+     "Internet (Conexão)", "Claro") for n in range(6)
+] + [
+    (f"Falta de luz da Enel no bairro ha {n} dias e a conta de luz veio alta", "Serviços", "Luz", "Enel")
+    for n in range(6)
+]
+
+
+@pytest.fixture
+def sem_modelo(tmp_path):
+    return ClassificadorLocal(str(tmp_path / "modelo_local.json"))
+
+
+@pytest.fixture
+def treinado(tmp_path):
+    local = ClassificadorLocal(str(tmp_path / "modelo_local.json"))
+    local.treinar(EXEMPLOS, CATALOGO)
+    return local
+
+
+@pytest.mark.parametrize("denuncia", [
+    "Comprei uma geladeira pela internet e ela nunca foi entregue.",
+    "Passei mal depois de comer no restaurante da estação do trem.",
+    "Fui atropelado por um ônibus e fiquei três dias no hospital.",
+    "Meu chip clonado foi usado para pedir empréstimos no meu nome.",
+])
+def test_palavra_incidental_nao_dispensa_a_ia(sem_modelo, treinado, denuncia):
+    dados, confianca = sem_modelo.classificar(denuncia)
+    assert dados is not None and confianca == CONFIANCA_REGRA < LIMIAR
+    assert sem_modelo.classificar_se_confiante(denuncia, LIMIAR) is None
+    assert treinado.classificar_se_confiante(denuncia, LIMIAR) is None
+
+
+def test_regra_sozinha_fica_abaixo_do_limiar(sem_modelo):
+    denuncia = "A internet da Claro não funciona, a fibra optica está sem sinal."
+    _, confianca = sem_modelo.classificar(denuncia)
+    assert confianca < LIMIAR
+    assert sem_modelo.classificar_se_confiante(denuncia, LIMIAR) is None
+
+
+def test_dois_termos_e_modelo_concordando(treinado):
+    dados = treinado.classificar_se_confiante("A internet da Claro caiu, a fibra optica está sem conexão.", LIMIAR)
+    assert dados is not None
+    assert (dados["tema"], dados["subtema"], dados["empresa"]) == ("Telecomunicações", "Internet (Conexão)", "Claro")
+
+
+def test_sem_empresa_nunca_dispensa_a_ia(treinado):
+    denuncia = "A internet caiu de novo, a fibra optica está sem conexão."
+    dados, confianca = treinado.classificar(denuncia)
+    assert dados["empresa"] == "N/D" and confianca >= LIMIAR
+    assert treinado.classificar_se_confiante(denuncia, LIMIAR) is None
+
+
+def test_regras_de_assuntos_diferentes(treinado):
+    assert treinado.classificar("Sem internet e com falta de luz da Enel.") == (None, 0.0)
+
+
+def test_extrair_empresa(sem_modelo):
+    assert sem_modelo.extrair_empresa("Reclamação contra a CEDAE pela falta de água") == "Cedae"
+    assert sem_modelo.extrair_empresa("Loja não entregou o produto") == "N/D"
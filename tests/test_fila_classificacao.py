@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from contextlib import nullcontext
+
+import pytest
+
+import fila_classificacao
+from banco_dados import BancoDados
+from classificador_denuncias import ClassificadorDenuncias
+from fila_classificacao import FilaClassificacao, dono_processo
+
+
+class Resiliencia:
+    def ao_recuperar(self, funcao):
+        pass
+
+
+class Metricas:
+    def medir(self, etapa):
+        return nullcontext()
+
+    def descarregar(self):
+        pass
+
+
+class Cliente:
+    def close(self):
+        pass
+
+
+class Empresas:
+    def resolver(self, nome):
+        return None, nome
+
+
+class Classificador:
+    """Só o que a fila usa do ClassificadorDenuncias, sem IA"""
+
+    versao_catalogo = "v1"
+
+    def __init__(self, banco):
+        self.banco = banco
+        self.resiliencia = Resiliencia()
+        self.metricas = Metricas()
+        self.registro_empresas = Empresas()
+        self.client = Cliente()
+        self.classificadas = []
+        self._antes_de_fechar = []
+        self.liberar_ia = threading.Event()
+        self.liberar_ia.set()
+
+    antes_de_fechar = ClassificadorDenuncias.antes_de_fechar
+    fechar = ClassificadorDenuncias.fechar
+
+    def classificar_texto(self, denuncia):
+        self.liberar_ia.wait(5)
+        self.classificadas.append(denuncia)
+        return {"tema": "Telefonia", "subtema": "Internet", "empresa": "Claro", "resumo": "ok", "origem": "ia"}
+
+    def registrar_origem(self, origem):
+        pass
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoDados(str(tmp_path / "saro.db"))
+    yield banco
+    banco.fechar()
+
+
+def em_andamento(banco, denuncia, dono, ha_segundos):
+    return banco.executar(
+        "INSERT INTO ouvidorias (denuncia, status, reservado_por, reservado_em) VALUES (?, 'processando', ?, ?)",
+        (denuncia, dono, time.time() - ha_segundos)
+    ).lastrowid
+
+
+def status(banco, id_ouvidoria):
+    return banco.consultar_um("SELECT status FROM ouvidorias WHERE id = ?", (id_ouvidoria,))[0]
+
+
+def criar_fila(banco):
+    classificador = Classificador(banco)
+    fila = FilaClassificacao(classificador, trabalhadores=1)
+    fila.pool.shutdown(wait=True)
+    return fila, classificador
+
+
+def test_reserva_viva_de_outro_processo_nao_e_retomada(banco):
+    alheia = em_andamento(banco, "internet caiu", "outra-maquina:123", ha_segundos=5)
+
+    _, classificador = criar_fila(banco)
+
+    assert status(banco, alheia) == "processando"
+    assert classificador.classificadas == []
+
+
+def test_reserva_vencida_e_retomada(banco):
+    abandonada = em_andamento(banco, "internet caiu", "outra-maquina:123",
+                              ha_segundos=fila_classificacao.PRAZO_RESERVA + 1)
+
+    _, classificador = criar_fila(banco)
+
+    assert status(banco, abandonada) == "concluido"
+    assert classificador.classificadas == ["internet caiu"]
+    assert banco.consultar_um("SELECT reservado_por FROM ouvidorias WHERE id = ?", (abandonada,))[0] is None
+
+
+def test_reserva_do_proprio_processo_so_e_retomada_se_parada(banco):
+    parada = em_andamento(banco, "sem sinal", dono_processo(), ha_segundos=5)
+    ativa = em_andamento(banco, "conta alta", dono_processo(), ha_segundos=5)
+    fila_classificacao._em_andamento.add(ativa)
+    try:
+        _, classificador = criar_fila(banco)
+    finally:
+        fila_classificacao._em_andamento.discard(ativa)
+
+    assert status(banco, parada) == "concluido"
+    assert status(banco, ativa) == "processando"
+    assert classificador.classificadas == ["sem sinal"]
+
+
+def test_reservar_grava_dono_e_horario(banco):
+    id_ouvidoria = banco.executar("INSERT INTO ouvidorias (denuncia, status) VALUES ('x', 'pendente')").lastrowid
+    fila, _ = criar_fila(banco)
+    banco.executar("UPDATE ouvidorias SET status = 'pendente' WHERE id = ?", (id_ouvidoria,))
+
+    assert fila._reservar(id_ouvidoria) == "x"
+    dono, momento = banco.consultar_um("SELECT reservado_por, reservado_em FROM ouvidorias WHERE id = ?",
+                                       (id_ouvidoria,))
+    fila._liberar(id_ouvidoria)
+    assert dono == dono_processo()
+    assert abs(momento - time.time()) < 5
+    assert fila._reservar(id_ouvidoria) is None
+
+
+def test_classificador_trocado_so_fecha_depois_das_tarefas_em_andamento(tmp_path):
+    banco = BancoDados(str(tmp_path / "saro.db"))
+    classificador = Classificador(banco)
+    fila = FilaClassificacao(classificador, trabalhadores=1)
+    classificador.liberar_ia.clear()
+    id_ouvidoria = banco.executar("INSERT INTO ouvidorias (denuncia, status) VALUES ('x', 'pendente')").lastrowid
+    fila._agendar(id_ouvidoria)
+    while status(banco, id_ouvidoria) != "processando":
+        time.sleep(0.01)
+
+    # Como em _liberar_fila e _liberar_classificador
+    fila.pool.shutdown(wait=False, cancel_futures=True)
+    fechamento = threading.Thread(target=classificador.fechar)
+    fechamento.start()
+    time.sleep(0.2)
+    assert fechamento.is_alive()
+
+    classificador.liberar_ia.set()
+    fechamento.join(5)
+    assert not fechamento.is_alive()
+    assert classificador.classificadas == ["x"]
+    conferencia = BancoDados(str(tmp_path / "saro.db"))
+    assert conferencia.consultar_um("SELECT status FROM ouvidorias WHERE id = ?", (id_ouvidoria,))[0] == "concluido"
+    conferencia.fechar()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from indice_enderecos import ResolvedorEnderecos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def criar_resolvedor():
+    with open(os.path.join(RAIZ, "base_promotorias.json"), encoding="utf-8") as f:
+        base = json.load(f)
+    municipios = {m.upper(): {"municipio_oficial": m, "promotoria": d["promotoria"]}
+                  for d in base.values() for m in d["municipios"]}
+    return ResolvedorEnderecos(municipios, os.path.join(RAIZ, "base_ceps_bairros.json"))
+
+
+@pytest.fixture(scope="module")
+def resolvedor():
+    return criar_resolvedor()
+
+
+def test_base_so_e_lida_na_primeira_consulta():
+    resolvedor = criar_resolvedor()
+    assert resolvedor._dados is None and resolvedor._localizador is None and resolvedor._bairros is None
+
+    resolvedor.localizar("Niterói")
+    assert resolvedor._dados is not None and resolvedor._localizador is not None
+
+
+@pytest.mark.parametrize("endereco, municipio, fonte", [
+    ("Rua Dr. Nilo Peçanha, 100 - CEP 24445-360", "São Gonçalo", "cep"),
+    ("Rua A, 10 - S. Gonçalo", "São Gonçalo", "nome"),
+    ("Rua Miguel de Frias, 10, Icaraí", "Niterói", "bairro"),
+    ("Rua B, 10 - Fonseca", "Niterói", "bairro"),
+])
+def test_localiza_por_cep_nome_e_bairro(resolvedor, endereco, municipio, fonte):
+    local = resolvedor.localizar(endereco)
+    assert local["municipio_oficial"] == municipio
+    assert local["fonte"] == fonte
+
+
+@pytest.mark.parametrize("endereco", ["Rua Tanque 4", "Rua Fonseca, 10", "Av. Barreto, 300", "Travessa Anil 7"])
+def test_bairro_em_nome_de_logradouro_e_ignorado(resolvedor, endereco):
+    assert resolvedor.localizar(endereco) is None
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from localizador_municipios import LocalizadorMunicipios, em_logradouro, normalizar_com_posicoes
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def localizador():
+    with open(os.path.join(RAIZ, "base_promotorias.json"), encoding="utf-8") as f:
+        base = json.load(f)
+    return LocalizadorMunicipios({m.upper(): {"municipio_oficial": m, "promotoria": d["promotoria"]}
+                                  for d in base.values() for m in d["municipios"]})
+
+
+def municipio(localizador, endereco):
+    local = localizador.localizar(endereco)
+    return local and local["municipio_oficial"]
+
+
+@pytest.mark.parametrize("endereco, esperado", [
+    ("Niterói, Rua Rio de Janeiro 10", "Niterói"),
+    ("Rua Rio de Janeiro, 10 - Niterói", "Niterói"),
+    ("Av. São Gonçalo, 200, Centro, Maricá", "Maricá"),
+    ("Niterói - Travessa Maricá, 3", "Niterói"),
+    ("Estrada de Maricá km 3, São Gonçalo", "São Gonçalo"),
+    ("Rua Barão de Niterói, 10 - Maricá", "Maricá"),
+    ("Rua A, 100 Niterói", "Niterói"),
+])
+def test_nome_de_logradouro_nao_e_o_municipio(localizador, endereco, esperado):
+    assert municipio(localizador, endereco) == esperado
+
+
+def test_mais_longa_e_ultima_do_texto(localizador):
+    assert municipio(localizador, "Rua X, Barra do Piraí") == "Barra do Piraí"
+    assert municipio(localizador, "Maricá ou Niterói?") == "Niterói"
+
+
+def test_so_nome_de_logradouro(localizador):
+    # Sem outro município no texto, o nome da rua ainda é o melhor palpite
+    assert municipio(localizador, "Rua Rio de Janeiro, 10") == "Rio de Janeiro"
+    estrito = LocalizadorMunicipios({"NITERÓI": {"municipio_oficial": "Niterói"}}, aceitar_logradouro=False)
+    assert estrito.localizar("Rua Niterói, 10") is None
+    assert estrito.localizar("Rua A, 10 - Niterói")["municipio_oficial"] == "Niterói"
+
+
+def test_posicao_no_endereco_original(localizador):
+    endereco = "Rua Rio de Janeiro, 10 - Niterói"
+    local = localizador.localizar(endereco)
+    assert endereco[local["inicio"]:local["fim"]] == "Niterói"
+
+
+def test_em_logradouro():
+    texto, _ = normalizar_com_posicoes("Niterói, Rua Rio de Janeiro 10")
+    assert em_logradouro(texto, texto.index("RIO DE"))
+    assert not em_logradouro(texto, 0)
+    texto, _ = normalizar_com_posicoes("Rua A 100 Niterói")
+    assert not em_logradouro(texto, texto.index("NITEROI"))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from banco_dados import BancoDados
+from registro_empresas import RegistroEmpresas
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoDados(str(tmp_path / "saro.db"))
+    yield banco
+    banco.fechar()
+
+
+def gravar(banco, registro, nome):
+    """Ouvidoria como a gravação faz: id e nome canônico, mais o nome recebido"""
+    empresa_id, empresa = registro.resolver(nome)
+    return banco.executar(
+        "INSERT INTO ouvidorias (empresa, empresa_id, empresa_original, status) VALUES (?, ?, ?, 'concluido')",
+        (empresa, empresa_id, nome)
+    ).lastrowid
+
+
+def empresa_de(banco, id_ouvidoria):
+    return tuple(banco.consultar_um("SELECT empresa_id, empresa FROM ouvidorias WHERE id = ?", (id_ouvidoria,)))
+
+
+def test_apelido_exato_reaproveita_a_empresa(banco):
+    registro = RegistroEmpresas(banco)
+    claro, nome = registro.resolver("Claro S.A.")
+    assert nome == "Claro"
+    assert registro.resolver("CLARO") == (claro, "Claro")
+    assert registro.resolver("claro ltda.") == (claro, "Claro")
+
+
+def test_marca_com_complemento_une_e_fica_para_revisao(banco):
+    registro = RegistroEmpresas(banco)
+    claro, _ = registro.resolver("Claro")
+    assert registro.resolver("Claro Net") == (claro, "Claro")
+    # Também no sentido contrário: a marca sozinha chega depois do nome completo
+    light, nome = registro.resolver("Light Serviços de Eletricidade S.A.")
+    assert light != claro and registro.resolver("Light") == (light, nome)
+    assert registro.pendentes_revisao() == [("claro net", claro, "Claro"), ("light", light, nome)]
+
+    registro.confirmar("Claro Net")
+    assert [p[0] for p in registro.pendentes_revisao()] == ["light"]
+    with pytest.raises(ValueError):
+        registro.confirmar("Inexistente")
+
+
+def test_variacao_de_grafia_une(banco):
+    registro = RegistroEmpresas(banco)
+    telefonica, _ = registro.resolver("Telefônica Brasil")
+    sabesp, _ = registro.resolver("Sabesp")
+    assert registro.resolver("Telefonica Brazil")[0] == telefonica
+    assert registro.resolver("Sabespe")[0] == sabesp
+
+
+@pytest.mark.parametrize("existente, novo", [
+    ("Claro", "Clara"),                   # grafia parecida, outra empresa
+    ("Oi", "Oi Fibra"),                   # parte comum curta demais
+    ("Banco", "Banco Itaú"),              # parte comum genérica
+    ("Casa Bahia", "Casa Vídeo"),
+    ("Banco Inter", "Banco Itaú"),
+    ("Enel Rio", "Enel Ceará"),
+])
+def test_nome_parecido_sem_regra_vira_empresa_nova(banco, existente, novo):
+    registro = RegistroEmpresas(banco)
+    primeira, _ = registro.resolver(existente)
+    assert registro.resolver(novo)[0] != primeira
+    assert registro.pendentes_revisao() == []
+
+
+def test_apelido_parecido_de_duas_empresas_nao_une(banco):
+    registro = RegistroEmpresas(banco)
+    claro_net, _ = registro.resolver("Claro Net")
+    claro_tv, _ = registro.resolver("Claro TV")
+    assert claro_tv != claro_net
+    assert registro.resolver("Claro")[0] not in (claro_net, claro_tv)
+    # Os parecidos continuam aparecendo como sugestão para revisão
+    assert any({a, b} == {claro_net, claro_tv} for _, a, _, b, _ in registro.sugerir())
+
+
+def test_nao_identificada_fica_sem_empresa(banco):
+    registro = RegistroEmpresas(banco)
+    for nome in ("N/D", "Não identificada", "", None):
+        assert registro.resolver(nome) == (None, "N/D")
+
+
+def test_unir_e_separar(banco):
+    registro = RegistroEmpresas(banco)
+    a = gravar(banco, registro, "Claro")
+    b = gravar(banco, registro, "Net Serviços")
+    claro, net = empresa_de(banco, a)[0], empresa_de(banco, b)[0]
+    assert net != claro
+
+    assert registro.unir(net, claro) == 1
+    assert empresa_de(banco, b) == (claro, "Claro")
+    assert registro.resolver("Net Serviços") == (claro, "Claro")
+
+    nova, movidas = registro.separar("Net Serviços")
+    assert movidas == 1 and nova != claro
+    assert empresa_de(banco, a) == (claro, "Claro")
+    assert empresa_de(banco, b) == (nova, "Net Serviços")
+    assert registro.resolver("net servicos") == (nova, "Net Serviços")
+
+
+def test_separar_desfaz_uniao_por_semelhanca(banco):
+    registro = RegistroEmpresas(banco)
+    claro = empresa_de(banco, gravar(banco, registro, "Claro"))[0]
+    b = gravar(banco, registro, "Claro Net")
+    assert empresa_de(banco, b) == (claro, "Claro")
+
+    nova, movidas = registro.separar("Claro Net")
+    assert movidas == 1
+    assert empresa_de(banco, b) == (nova, "Claro Net")
+    assert registro.pendentes_revisao() == []
+
+
+def test_separar_para_empresa_existente(banco):
+    registro = RegistroEmpresas(banco)
+    gravar(banco, registro, "Oi")
+    b = gravar(banco, registro, "Vivo")
+    oi, vivo = registro.localizar("Oi"), registro.localizar("Vivo")
+    registro.unir(vivo, oi)
+    telefonica, _ = registro.resolver("Telefônica")
+
+    assert registro.separar("Vivo", telefonica) == (telefonica, 1)
+    assert empresa_de(banco, b) == (telefonica, "Telefônica")
+
+
+def test_separar_unico_apelido_exige_renomear(banco):
+    registro = RegistroEmpresas(banco)
+    registro.resolver("Claro")
+    with pytest.raises(ValueError):
+        registro.separar("Claro")
+    with pytest.raises(ValueError):
+        registro.separar("Inexistente")
+
+
+def test_renomear(banco):
+    registro = RegistroEmpresas(banco)
+    a = gravar(banco, registro, "Claro")
+    claro = empresa_de(banco, a)[0]
+    registro.resolver("Vivo")
+
+    assert registro.renomear(claro, "Claro Brasil") == 1
+    assert empresa_de(banco, a) == (claro, "Claro Brasil")
+    assert registro.resolver("claro brasil") == (claro, "Claro Brasil")
+    assert registro.resolver("Claro") == (claro, "Claro Brasil")
+    with pytest.raises(ValueError):
+        registro.renomear(claro, "Vivo")
+
+
+def test_outro_processo_percebe_uniao_e_renomeacao(banco):
+    registro, outro = RegistroEmpresas(banco), RegistroEmpresas(banco)
+    claro, _ = registro.resolver("Claro")
+    net, _ = registro.resolver("Net Serviços")
+    assert outro.resolver("Net Serviços") == (net, "Net Serviços")
+
+    registro.unir(net, claro)
+    registro.renomear(claro, "Claro Brasil")
+    assert outro.resolver("Net Serviços") == (claro, "Claro Brasil")
+
+
+def test_vincular_guarda_nome_recebido(banco):
+    banco.executar("INSERT INTO ouvidorias (empresa, status) VALUES ('Claro S.A.', 'concluido')")
+    assert RegistroEmpresas(banco).vincular() == 1
+    assert banco.consultar_um("SELECT empresa, empresa_original FROM ouvidorias") == ("Claro", "Claro S.A.")
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import openai
+import pytest
+
+from resiliencia_ia import ABERTO, FECHADO, ChamadaResiliente, CircuitoAberto
+
+
+class ErroTemporario(openai.APITimeoutError):
+    def __init__(self):
+        Exception.__init__(self, "timeout")
+
+
+def sempre_falha(timeout):
+    raise ErroTemporario()
+
+
+@pytest.fixture
+def resiliencia():
+    return ChamadaResiliente(tentativas=3, espera_base=0.001, espera_max=0.001, falhas_para_abrir=2, tempo_aberto=60)
+
+
+def test_uma_falha_por_chamada(resiliencia):
+    tentativas = []
+
+    def falha(timeout):
+        tentativas.append(timeout)
+        raise ErroTemporario()
+
+    with pytest.raises(ErroTemporario):
+        resiliencia.executar(falha)
+    assert len(tentativas) == 3
+    assert resiliencia.falhas_seguidas == 1 and resiliencia.estado == FECHADO
+
+
+def test_circuito_abre_e_recusa(resiliencia):
+    for _ in range(2):
+        with pytest.raises(ErroTemporario):
+            resiliencia.executar(sempre_falha)
+    assert resiliencia.estado == ABERTO
+    with pytest.raises(CircuitoAberto):
+        resiliencia.executar(lambda timeout: "ok")
+
+
+def test_nova_tentativa_depois_de_erro_temporario(resiliencia):
+    respostas = iter([ErroTemporario(), "ok"])
+
+    def instavel(timeout):
+        resposta = next(respostas)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return resposta
+
+    assert resiliencia.executar(instavel) == "ok"
+    assert resiliencia.falhas_seguidas == 0
+
+
+def test_pausa_compartilhada(resiliencia, monkeypatch):
+    esperas = []
+    monkeypatch.setattr("resiliencia_ia.time.sleep", esperas.append)
+    resiliencia._pausar(5.0)
+    assert resiliencia.executar(lambda timeout: "ok") == "ok"
+    assert esperas and 4.0 < esperas[0] <= 5.1
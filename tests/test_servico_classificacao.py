@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Serviço HTTP de ponta a ponta (gravador, trabalhadores e reclassificador) contra o servidor_ia_falso"""
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from servidor_ia_falso import ServidorIAFalso
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="o serviço usa processos com fork")
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def pedir(url, corpo=None):
+    dados = None if corpo is None else json.dumps(corpo).encode("utf-8")
+    pedido = urllib.request.Request(url, data=dados, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(pedido, timeout=90) as resposta:
+        return json.loads(resposta.read())
+
+
+def esperar(condicao, prazo=60.0):
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def situacao(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT id, status, origem FROM ouvidorias ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def servico(tmp_path):
+    """Serviço com a IA ainda fora do ar (nada escutando na porta dela)"""
+    porta_ia, porta = porta_livre(), porta_livre()
+    db_path = str(tmp_path / "saro.db")
+    ambiente = dict(os.environ, OPENAI_API_KEY="falsa", OPENAI_BASE_URL=f"http://127.0.0.1:{porta_ia}/v1",
+                    SARO_LIMIAR_LOCAL="9", SARO_LIMIAR_SIMILAR="9", SARO_INTERVALO_RECLASSIFICACAO="1")
+    processo = subprocess.Popen(
+        [sys.executable, "servico_classificacao.py", "--porta", str(porta), "--processos", "2", "--banco", db_path],
+        cwd=RAIZ, env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{porta}"
+
+    def no_ar():
+        try:
+            return pedir(url + "/saude")["status"] == "ok"
+        except OSError:
+            return False
+
+    try:
+        assert esperar(no_ar), "o serviço não subiu"
+        yield url, db_path, lambda: ServidorIAFalso(porta=porta_ia, latencia_ms=10).iniciar()
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        try:
+            processo.wait(30)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def test_provisorias_gravadas_pendentes_e_reclassificadas(servico):
+    url, db_path, subir_ia = servico
+
+    unica = pedir(url + "/classificar", {"endereco": "Rua A, Niterói - RJ", "denuncia": "internet da vivo caiu"})
+    lote = pedir(url + "/classificar/lote", {"itens": [
+        {"endereco": "Maricá - RJ", "denuncia": f"conta de luz {i} muito alta"} for i in range(3)
+    ]})["resultados"]
+
+    # IA fora do ar: classificação provisória na resposta, linha pendente no banco (pelo gravador)
+    assert unica["origem"] == "degradado" and unica["status"] == "pendente"
+    assert unica["municipio"] and unica["promotoria"]
+    assert [r["origem"] for r in lote] == ["degradado"] * 3
+    ids = [unica["id"]] + [r["id"] for r in lote]
+    assert sorted(i for i, _, _ in situacao(db_path)) == sorted(ids)
+    # Pendente registrada pela interface (classificação ao vivo): não é do reclassificador
+    conn = sqlite3.connect(db_path)
+    with conn:
+        ao_vivo = conn.execute("INSERT INTO ouvidorias (denuncia, status) VALUES ('sem sinal', 'pendente')").lastrowid
+    conn.close()
+
+    ia = subir_ia()
+    try:
+        # O reclassificador refaz as provisórias quando a IA volta
+        provisorias = lambda: [(s, o) for i, s, o in situacao(db_path) if i in ids]
+        assert esperar(lambda: provisorias() == [("concluido", "ia")] * len(ids), prazo=90), situacao(db_path)
+        assert dict((i, s) for i, s, _ in situacao(db_path))[ao_vivo] == "pendente"
+        # Os trabalhadores seguem atendendo com a IA de volta
+        nova = pedir(url + "/classificar", {"endereco": "Niterói", "denuncia": "água da cedae cortada há dias"})
+        assert nova["origem"] == "ia" and nova["status"] == "concluido"
+    finally:
+        ia.parar()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from banco_dados import BancoDados
+from catalogo_temas import CatalogoTemas
+from servidor_ia_falso import ServidorIAFalso
+from versoes_catalogo import (MANTER, RECLASSIFICAR, RENOMEAR, a_reclassificar, aplicar, nao_reclassificadas,
+                              planejar, registrar_versao)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+V1 = CatalogoTemas({"Telecomunicações": ["Internet (Conexão)", "Telefonia Móvel"], "Serviços": ["Luz", "Água"]})
+# Internet renomeado, Serviços ganhou "Gás" (reclassifica o tema inteiro), Telefonia Móvel mantido
+V2 = CatalogoTemas({"Telecomunicações": ["Internet (Banda Larga)", "Telefonia Móvel"],
+                    "Serviços": ["Luz", "Água", "Gás"]})
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoDados(str(tmp_path / "saro.db"))
+    yield banco
+    banco.fechar()
+
+
+def gravar(banco, status, denuncia="internet da claro caiu", origem=None):
+    return banco.executar(
+        "INSERT INTO ouvidorias (denuncia, status, origem, data_iso) VALUES (?, ?, ?, '2024-01-01T10:00')",
+        (denuncia, status, origem)
+    ).lastrowid
+
+
+def classificada(banco, tema, subtema, status="concluido"):
+    return banco.executar(
+        "INSERT INTO ouvidorias (denuncia, tema, subtema, status) VALUES ('x', ?, ?, ?)", (tema, subtema, status)
+    ).lastrowid
+
+
+def linha(banco, id_ouvidoria):
+    return banco.consultar_um("SELECT tema, subtema, status, versao_catalogo FROM ouvidorias WHERE id = ?",
+                              (id_ouvidoria,))
+
+
+@pytest.fixture
+def banco_v1(banco):
+    """Ouvidorias classificadas com V1 (a primeira versão registrada marca as antigas sem versão)"""
+    ids = {
+        "internet": classificada(banco, "Telecomunicações", "Internet (Conexão)"),
+        "movel": classificada(banco, "Telecomunicações", "Telefonia Móvel"),
+        "luz": classificada(banco, "Serviços", "Luz"),
+        "outros": classificada(banco, "Outros", "Erro no GPT"),
+        "pendente": classificada(banco, "Serviços", "Luz", status="pendente"),
+    }
+    registrar_versao(banco, V1)
+    registrar_versao(banco, V2)
+    return banco, ids
+
+
+def test_primeira_versao_marca_so_as_concluidas_com_par_valido(banco_v1):
+    banco, ids = banco_v1
+    assert linha(banco, ids["internet"])[3] == V1.versao
+    assert linha(banco, ids["outros"])[3] is None
+    assert linha(banco, ids["pendente"])[3] is None
+
+
+def test_planejar_agrupa_por_versao_e_par(banco_v1):
+    banco, _ = banco_v1
+    plano = {(i["tema"], i["subtema"]): (i["versao"], i["acao"], i["destino"], i["linhas"])
+             for i in planejar(banco, V2)}
+    assert plano == {
+        ("Telecomunicações", "Internet (Conexão)"): (V1.versao, RENOMEAR,
+                                                     ("Telecomunicações", "Internet (Banda Larga)"), 1),
+        ("Telecomunicações", "Telefonia Móvel"): (V1.versao, MANTER, None, 1),
+        ("Serviços", "Luz"): (V1.versao, RECLASSIFICAR, None, 1),
+        # Sem versão e fora do catálogo atual
+        ("Outros", "Erro no GPT"): (None, RECLASSIFICAR, None, 1),
+    }
+
+
+def test_aplicar_so_mexe_no_que_mudou(banco_v1):
+    banco, ids = banco_v1
+
+    assert aplicar(banco, V2, planejar(banco, V2)) == {RENOMEAR: 1, MANTER: 1, RECLASSIFICAR: 2}
+
+    assert linha(banco, ids["internet"]) == ("Telecomunicações", "Internet (Banda Larga)", "concluido", V2.versao)
+    assert linha(banco, ids["movel"]) == ("Telecomunicações", "Telefonia Móvel", "concluido", V2.versao)
+    assert linha(banco, ids["luz"]) == ("Serviços", "Luz", "pendente", V1.versao)
+    assert linha(banco, ids["outros"])[2] == "pendente"
+    # Plano seguinte: nada a fazer (as pendentes ficam com a fila)
+    assert planejar(banco, V2) == []
+
+
+def test_versao_desconhecida_mantem_par_ainda_valido(banco):
+    antiga = classificada(banco, "Serviços", "Água")
+    banco.executar("UPDATE ouvidorias SET versao_catalogo = 'apagada' WHERE id = ?", (antiga,))
+    registrar_versao(banco, V2)
+
+    assert [(i["acao"], i["linhas"]) for i in planejar(banco, V2)] == [(MANTER, 1)]
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def reclassificar(db_path, porta_ia):
+    ambiente = dict(os.environ, OPENAI_API_KEY="falsa", OPENAI_BASE_URL=f"http://127.0.0.1:{porta_ia}/v1",
+                    SARO_LIMIAR_LOCAL="9", SARO_LIMIAR_SIMILAR="9")
+    return subprocess.run([sys.executable, "versoes_catalogo.py", "--banco", db_path, "--trabalhadores", "2"],
+                          cwd=RAIZ, env=ambiente, capture_output=True, text=True, timeout=120)
+
+
+def test_falhas_contadas_so_entre_as_afetadas(banco):
+    pendente = gravar(banco, "pendente")
+    provisoria = gravar(banco, "degradado", origem="degradado")
+    gravar(banco, "concluido")
+    afetadas = a_reclassificar(banco)
+    assert afetadas == {pendente, provisoria}
+
+    banco.executar("UPDATE ouvidorias SET status = 'erro' WHERE id = ?", (pendente,))
+    gravar(banco, "erro")     # falha antiga, fora desta reclassificação
+    assert nao_reclassificadas(banco, afetadas) == {"erro": 1, "degradado": 1}
+
+
+def test_sai_com_erro_enquanto_houver_provisorias(tmp_path):
+    db_path = str(tmp_path / "saro.db")
+    banco = BancoDados(db_path)
+    gravar(banco, "degradado", origem="degradado")
+    gravar(banco, "pendente", denuncia="conta de luz da enel veio alta")
+    banco.fechar()
+    porta_ia = porta_livre()
+
+    # IA fora do ar: as linhas continuam provisórias
+    resultado = reclassificar(db_path, porta_ia)
+    assert resultado.returncode == 1, resultado.stdout + resultado.stderr
+    assert "Provisórias (IA indisponível): 2" in resultado.stdout
+
+    ia = ServidorIAFalso(porta=porta_ia, latencia_ms=10).iniciar()
+    try:
+        resultado = reclassificar(db_path, porta_ia)
+    finally:
+        ia.parar()
+    assert resultado.returncode == 0, resultado.stdout + resultado.stderr
+    assert "Reclassificação concluída: 2 ouvidorias" in resultado.stdout
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Versões do Catálogo e Reclassificação Incremental - MPRJ
+
+Cada ouvidoria guarda a versão do catálogo (base_temas_subtemas.json) com que
+foi classificada, e cada versão usada fica registrada na tabela 'catalogos'.
+Quando o catálogo muda, a diferença entre a versão antiga e a atual decide o
+que fazer com cada par tema/subtema:
+- mantido: só a versão da linha é atualizada;
+- renomeado: tema/subtema trocados direto no SQL, sem chamar a IA;
+- removido, dividido ou tema com subtemas novos: a linha volta para a fila
+  (status 'pendente') e é reclassificada pelos trabalhadores da fila.
+
+O trabalho é proporcional ao que mudou. A reclassificação é retomável: se o
+processo parar, as linhas continuam pendentes e são retomadas na próxima
+execução (ou pela aplicação web, ao subir). Linhas que terminam com
+classificação provisória (IA fora do ar) ou com erro são informadas ao final,
+e o comando sai com código 1; rodar de novo tenta reclassificá-las.
+
+Uso:
+    python3 versoes_catalogo.py --simular            # mostra o plano, sem alterar nada
+    python3 versoes_catalogo.py --trabalhadores 8    # aplica e reclassifica as linhas afetadas
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+from catalogo_temas import CatalogoTemas, diferencas
+
+MANTER = "manter"
+RENOMEAR = "renomear"
+RECLASSIFICAR = "reclassificar"
+
+
+def criar_tabela(banco):
+    banco.executar('''
+        CREATE TABLE IF NOT EXISTS catalogos (
+            versao TEXT PRIMARY KEY,
+            conteudo TEXT,
+            registrado_em TEXT
+        )
+    ''')
+
+
+def registrar_versao(banco, catalogo):
+    """
+    Guarda o conteúdo da versão atual (para comparações futuras). Na primeira versão
+    registrada, as ouvidorias antigas sem versão e com par válido passam a tê-la.
+    """
+    criar_tabela(banco)
+    with banco.transacao() as conn:
+        primeira = conn.execute("SELECT 1 FROM catalogos LIMIT 1").fetchone() is None
+        nova = conn.execute(
+            "INSERT OR IGNORE INTO catalogos (versao, conteudo, registrado_em) VALUES (?, ?, ?)",
+            (catalogo.versao, json.dumps(catalogo.temas_subtemas, ensure_ascii=False),
+             datetime.now().isoformat(timespec="seconds"))
+        ).rowcount
+        if primeira and nova:
+            conn.executemany(
+                "UPDATE ouvidorias SET versao_catalogo = ? "
+                "WHERE versao_catalogo IS NULL AND tema = ? AND subtema = ? AND status = 'concluido'",
+                [(catalogo.versao, tema, subtema) for tema, subtema in catalogo.por_nome]
+            )
+
+
+def carregar_versao(banco, versao):
+    """CatalogoTemas de uma versão registrada, ou None se a versão for desconhecida"""
+    row = banco.consultar_um("SELECT conteudo FROM catalogos WHERE versao = ?", (versao,))
+    return CatalogoTemas(json.loads(row[0])) if row else None
+
+
+def planejar(banco, catalogo):
+    """
+    [{versao, tema, subtema, acao, destino, linhas}] para as ouvidorias concluídas com
+    versão diferente da atual, agrupadas por versão e par tema/subtema
+    """
+    plano = []
+    grupos = banco.consultar(
+        "SELECT versao_catalogo, tema, subtema, COUNT(*) FROM ouvidorias "
+        "WHERE status = 'concluido' AND versao_catalogo IS NOT ? "
+        "GROUP BY versao_catalogo, tema, subtema ORDER BY versao_catalogo, tema, subtema",
+        (catalogo.versao,)
+    )
+    diferencas_por_versao = {}
+    for versao, tema, subtema, linhas in grupos:
+        if versao not in diferencas_por_versao:
+            antigo = carregar_versao(banco, versao) if versao else None
+            diferencas_por_versao[versao] = diferencas(antigo, catalogo) if antigo else None
+        diff = diferencas_por_versao[versao]
+        par = (tema, subtema)
+        destino = None
+        if diff and par in diff["renomeados"]:
+            acao, destino = RENOMEAR, diff["renomeados"][par]
+        elif diff and par in diff["reclassificar"]:
+            acao = RECLASSIFICAR
+        else:
+            # Par mantido, versão desconhecida ou par que nem existia na versão antiga (ex.: "Outros")
+            acao = MANTER if par in catalogo.por_nome else RECLASSIFICAR
+        plano.append({"versao": versao, "tema": tema, "subtema": subtema, "acao": acao,
+                      "destino": destino, "linhas": linhas})
+    return plano
+
+
+def aplicar(banco, catalogo, plano):
+    """Executa o plano em uma transação; retorna {acao: linhas}. As reclassificações ficam pendentes na fila."""
+    filtro = "WHERE versao_catalogo IS ? AND tema IS ? AND subtema IS ? AND status = 'concluido'"
+    totais = Counter()
+    with banco.transacao() as conn:
+        for item in plano:
+            chave = (item["versao"], item["tema"], item["subtema"])
+            if item["acao"] == MANTER:
+                cursor = conn.execute(f"UPDATE ouvidorias SET versao_catalogo = ? {filtro}", (catalogo.versao,) + chave)
+            elif item["acao"] == RENOMEAR:
+                cursor = conn.execute(
+                    f"UPDATE ouvidorias SET tema = ?, subtema = ?, versao_catalogo = ? {filtro}",
+                    item["destino"] + (catalogo.versao,) + chave
+                )
+            else:
+                cursor = conn.execute(f"UPDATE ouvidorias SET status = 'pendente' {filtro}", chave)
+            totais[item["acao"]] += cursor.rowcount
+    return dict(totais)
+
+
+def a_reclassificar(banco):
+    """Ids que a fila vai processar: pendentes, em andamento e provisórias (retomadas ao subir)"""
+    return {r[0] for r in banco.consultar(
+        "SELECT id FROM ouvidorias WHERE status IN ('pendente', 'processando', 'degradado')"
+    )}
+
+
+def nao_reclassificadas(banco, ids):
+    """{status: linhas} das ouvidorias em 'ids' que terminaram provisórias ('degradado') ou com 'erro'"""
+    falhas = Counter()
+    for id_ouvidoria, status in banco.consultar(
+        "SELECT id, status FROM ouvidorias WHERE status IN ('degradado', 'erro')"
+    ):
+        if id_ouvidoria in ids:
+            falhas[status] += 1
+    return dict(falhas)
+
+
+def main():
+    from banco_dados import BancoDados
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Reclassificação incremental após mudanças no catálogo - MPRJ")
+    parser.add_argument("--simular", action="store_true", help="só mostra o que seria feito")
+    parser.add_argument("--trabalhadores", type=int, default=None, help="chamadas simultâneas à IA")
+    parser.add_argument("--banco", default=os.path.join(base_path, "saro_database.db"))
+    args = parser.parse_args()
+
+    with open(os.path.join(base_path, "base_temas_subtemas.json"), 'r', encoding='utf-8') as f:
+        catalogo = CatalogoTemas(json.load(f))
+    banco = BancoDados(args.banco)
+    registrar_versao(banco, catalogo)
+    plano = planejar(banco, catalogo)
+
+    print(f"📚 Catálogo atual: versão {catalogo.versao}")
+    for item in plano:
+        destino = f" -> {item['destino'][0]} / {item['destino'][1]}" if item["destino"] else ""
+        print(f"   [{item['versao'] or 'sem versão'}] {item['tema']} / {item['subtema']}: "
+              f"{item['acao']}{destino} ({item['linhas']} ouvidorias)")
+    if args.simular:
+        return
+    totais = aplicar(banco, catalogo, plano)
+    print(f"✅ Mantidas: {totais.get(MANTER, 0)} | Renomeadas: {totais.get(RENOMEAR, 0)} | "
+          f"Para reclassificar: {totais.get(RECLASSIFICAR, 0)}")
+    afetadas = a_reclassificar(banco)
+    banco.fechar()
+
+    # A fila retoma tudo o que está pendente (inclusive de uma execução anterior interrompida)
+    from classificador_denuncias import ClassificadorDenuncias
+    from fila_classificacao import FilaClassificacao
+
+    fila = FilaClassificacao(ClassificadorDenuncias(args.banco), args.trabalhadores)
+    try:
+        while (restantes := fila.pendentes()) > 0:
+            print(f"⏳ {restantes} ouvidorias aguardando reclassificação...", end="\r")
+            time.sleep(2)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrompido: as ouvidorias restantes continuam pendentes e serão retomadas.")
+        fila.pool.shutdown(wait=False, cancel_futures=True)
+        return
+    fila.pool.shutdown(wait=True)
+    falhas = nao_reclassificadas(fila.banco, afetadas)
+    if falhas:
+        print(f"\n⚠️  Reclassificação incompleta: {len(afetadas) - sum(falhas.values())} de {len(afetadas)} "
+              f"reclassificadas | Provisórias (IA indisponível): {falhas.get('degradado', 0)} | "
+              f"Com erro: {falhas.get('erro', 0)}. Rode novamente para tentar de novo.")
+        raise SystemExit(1)
+    print(f"\n✅ Reclassificação concluída: {len(afetadas)} ouvidorias.")
+
+if __name__ == "__main__":
+    main()